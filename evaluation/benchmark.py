@@ -0,0 +1,414 @@
+"""
+Evaluation Benchmarks
+=====================
+
+Measures throughput (rows/sec) and peak memory of every code-based evaluator
+and of the suite functions in evaluate.py run end to end on generated data,
+with a stub LLM standing in for every judge (the LLM suites need
+azure-ai-evaluation installed). Results are saved as JSON and compared against a
+baseline; the run fails when a case regresses beyond the tolerance.
+
+    python benchmark.py --sizes 1000 100000 --save-baseline benchmarks/baseline.json
+    python benchmark.py --sizes 1000 100000 --baseline benchmarks/baseline.json
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import contextlib
+import argparse
+import platform
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from engine import compile_column_mapping
+from generate_test_data import generate_synthetic_dataset
+from streaming import iter_jsonl_chunks
+from evaluators import registry
+from evaluators.code_based import (
+    ResponseTimeEvaluator,
+    PriceAccuracyEvaluator,
+    RouteOptimalityEvaluator,
+    DataCompletenessEvaluator
+)
+
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000, 10_000_000)
+
+# Evaluator: (dataset, factory, column mapping); mirrors the suites in evaluate.py
+EVALUATOR_CASES = {
+    "response_time": (
+        "customer_support",
+        lambda: ResponseTimeEvaluator(max_response_time=2.0),
+        {"response_time": "${data.response_time_seconds}"}
+    ),
+    "data_completeness": (
+        "customer_support",
+        lambda: DataCompletenessEvaluator(required_fields=["response", "timestamp", "agent_id"]),
+        {"response_data": "${data}"}
+    ),
+    "price_accuracy": (
+        "pricing",
+        lambda: PriceAccuracyEvaluator(margin_percent=5.0),
+        {"calculated_price": "${data.system_calculated_price}", "ground_truth_price": "${data.actual_price}"}
+    ),
+    "route_optimality": (
+        "route_optimization",
+        lambda: RouteOptimalityEvaluator(max_deviation_percent=10.0),
+        {"suggested_distance": "${data.suggested_route_distance_km}",
+         "optimal_distance": "${data.optimal_route_distance_km}"}
+    ),
+}
+
+
+class _StubFlow:
+    """
+    Stand-in for a prompty flow: returns a well-formed judgement instantly
+    (or after `latency_seconds`). Packed calls (a "rows" input) get one entry
+    per row.
+    """
+    
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+    
+    def __call__(self, **inputs):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        if "rows" in inputs:
+            return json.dumps({"results": [
+                {"index": row["index"], "score": self._score(row), "reasoning": "stub judgement"}
+                for row in json.loads(inputs["rows"])
+            ]})
+        return json.dumps({"score": self._score(inputs), "reasoning": "stub judgement"})
+    
+    @staticmethod
+    def _score(inputs: dict):
+        return 1 + sum(len(str(value)) for value in inputs.values()) % 5
+
+
+class _StubJudgeEvaluator:
+    """
+    Stand-in for the SDK's LLM evaluators (RelevanceEvaluator, CoherenceEvaluator).
+    """
+    
+    def __init__(self, metric: str, latency_seconds: float = 0.0):
+        self.metric = metric
+        self.latency_seconds = latency_seconds
+    
+    def __call__(self, *, query: str, response: str, **kwargs):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return {self.metric: 1 + (len(query) + len(response)) % 5, f"{self.metric}_reason": "stub judgement"}
+
+
+# Suite (as named in evaluate.SUITES): dataset
+SUITE_CASES = {
+    "customer_support": "customer_support",
+    "pricing": "pricing",
+    "route_optimization": "route_optimization",
+}
+
+
+def _install_stub_llm(evaluate, latency_seconds: float):
+    # The suites build their evaluators from the registry, so registering stubs
+    # under the suites' own model configuration swaps out only the LLM calls
+    from azure.ai.evaluation import RelevanceEvaluator, CoherenceEvaluator
+    from evaluators.prompt_based import CustomerServiceQualityEvaluator, PricingJustificationEvaluator
+    
+    model_config = evaluate.get_model_config()
+    for evaluator_class in (CustomerServiceQualityEvaluator, PricingJustificationEvaluator):
+        for source in (evaluator_class.PROMPTY_SOURCE, evaluator_class.PACKED_PROMPTY_SOURCE):
+            registry.register_flow(source, model_config, _StubFlow(latency_seconds))
+    registry.register_evaluator(
+        RelevanceEvaluator, model_config, _StubJudgeEvaluator("relevance", latency_seconds)
+    )
+    registry.register_evaluator(
+        CoherenceEvaluator, model_config, _StubJudgeEvaluator("coherence", latency_seconds)
+    )
+
+
+def _time_evaluator(name: str, data_file, chunk_rows: int, min_seconds_per_chunk: float):
+    # Only the vectorized scoring is timed; parsing and column extraction are
+    # not. Each chunk is scored repeatedly for at least `min_seconds_per_chunk`
+    # and the fastest call is kept, since single sub-millisecond timings are
+    # mostly noise.
+    _, factory, column_mapping = EVALUATOR_CASES[name]
+    evaluator = factory()
+    getters = compile_column_mapping(evaluator, column_mapping)
+    
+    seconds = 0.0
+    for chunk in iter_jsonl_chunks(data_file, chunk_rows=chunk_rows):
+        inputs = {param: [getter(row) for row in chunk] for param, getter in getters.items()}
+        fastest = float("inf")
+        spent = 0.0
+        while True:
+            started = time.perf_counter()
+            evaluator.evaluate_batch(**inputs)
+            elapsed = time.perf_counter() - started
+            fastest = min(fastest, elapsed)
+            spent += elapsed
+            if spent >= min_seconds_per_chunk:
+                break
+        seconds += fastest
+    return seconds
+
+
+def _time_suite(name: str, data_file, chunk_rows: int, output_path, latency_seconds: float):
+    # End to end through the suite function in evaluate.py: parsing, the
+    # run_evaluation dispatch, every evaluator and writing the results. Only
+    # the LLM calls are stubbed; the wrappers (packing, dedup, prescreen) run
+    # as configured by EVALUATION_PACK_SIZE, EVALUATION_DEDUP and
+    # EVALUATION_PRESCREEN.
+    import evaluate  # loads .env first, so the overrides below win
+    
+    dataset = SUITE_CASES[name]
+    data_dir = Path(tempfile.mkdtemp(prefix="benchmark_data_"))
+    data_name, runner = next(
+        (data_name, runner) for suite, data_name, runner, _ in evaluate.SUITES if suite == name
+    )
+    (data_dir / data_name).symlink_to(Path(data_file).resolve())
+    
+    os.environ.update({
+        "EVALUATION_DATA_DIR": str(data_dir),
+        "EVALUATION_OUTPUT_PATH": str(output_path),
+        "EVALUATION_CHUNK_ROWS": str(chunk_rows),
+        "EVALUATION_RESULTS_FORMAT": "jsonl",
+        "EVALUATION_CACHE_PATH": "off",
+        "EVALUATION_TELEMETRY": "off",
+        "OPENAI_API_KEY": "benchmark-stub",
+        "OPENAI_BASE_URL": "http://benchmark-stub.invalid/v1",
+    })
+    for variable in ("AZURE_OPENAI_ENDPOINT", "EVALUATION_INCREMENTAL", "EVALUATION_RESUME",
+                     "EVALUATION_SAMPLE_MARGIN", "EVALUATION_SEQUENTIAL",
+                     "EVALUATION_NEAR_DUP_THRESHOLD", "EVALUATION_ROAD_GRAPH"):
+        os.environ.pop(variable, None)
+    if dataset != "route_optimization":
+        _install_stub_llm(evaluate, latency_seconds)
+    
+    try:
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            runner()
+        return time.perf_counter() - started
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def _run_case(kind: str, name: str, data_file, rows: int, chunk_rows: int,
+              output_path, latency_seconds: float):
+    """
+    Run one benchmark case (in a fresh process, so peak memory is its own).
+    """
+    rss_before = _current_rss_mb()
+    if kind == "evaluator":
+        seconds = _time_evaluator(name, data_file, chunk_rows, 0.05 if rows < 1_000_000 else 0.0)
+    else:
+        seconds = _time_suite(name, data_file, chunk_rows, output_path, latency_seconds)
+    peak = _peak_rss_mb()
+    return {
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds > 0 else float("inf"),
+        "peak_rss_mb": peak,
+        "peak_rss_increase_mb": max(0.0, peak - rss_before)
+    }
+
+
+def _current_rss_mb():
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        return _peak_rss_mb()
+
+
+def _peak_rss_mb():
+    import resource
+    
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def ensure_dataset(dataset: str, rows: int, seed: int, data_dir):
+    """
+    Path of a generated benchmark dataset, generating it on first use.
+    """
+    data_file = Path(data_dir) / f"{dataset}_{rows}_seed{seed}.jsonl"
+    if not data_file.exists():
+        generate_synthetic_dataset(
+            dataset, rows, data_file, seed=seed, workers=os.cpu_count() or 1
+        )
+    return data_file
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, evaluators=None, suites=None, seed: int = 42,
+                   data_dir=".cache/benchmark_data", repeat: int = 3, chunk_rows: int = 10_000,
+                   llm_latency_ms: float = 0.0):
+    """
+    Run every benchmark case at every size.
+    
+    Each case runs in a fresh process; cases below 1M rows run `repeat` times
+    and keep the fastest run (and the lowest memory peak).
+    
+    Returns:
+        Dictionary with "environment", "settings" and "results" keyed by
+        "<evaluator|suite>/<name>@<rows>"
+    """
+    evaluators = list(EVALUATOR_CASES) if evaluators is None else evaluators
+    suites = list(SUITE_CASES) if suites is None else suites
+    cases = (
+        [("evaluator", name, EVALUATOR_CASES[name][0]) for name in evaluators]
+        + [("suite", name, SUITE_CASES[name]) for name in suites]
+    )
+    
+    results = {}
+    spawn = multiprocessing.get_context("spawn")
+    output_root = Path(data_dir) / "outputs"
+    for rows in sizes:
+        for kind, name, dataset in cases:
+            data_file = ensure_dataset(dataset, rows, seed, data_dir)
+            runs = []
+            for _ in range(repeat if rows < 1_000_000 else 1):
+                with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+                    runs.append(executor.submit(
+                        _run_case, kind, name, str(data_file), rows, chunk_rows,
+                        str(output_root / name), llm_latency_ms / 1000
+                    ).result())
+            
+            best = max(runs, key=lambda run: run["rows_per_second"])
+            best["peak_rss_mb"] = min(run["peak_rss_mb"] for run in runs)
+            best["peak_rss_increase_mb"] = min(run["peak_rss_increase_mb"] for run in runs)
+            key = f"{kind}/{name}@{rows}"
+            results[key] = best
+            print(f"  {key:<45} {best['rows_per_second']:>14,.0f} rows/s "
+                  f"{best['peak_rss_increase_mb']:>9.1f} MB peak increase")
+    
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "timestamp": datetime.now().isoformat(timespec="seconds")
+        },
+        "settings": {"seed": seed, "chunk_rows": chunk_rows, "llm_latency_ms": llm_latency_ms},
+        "results": results
+    }
+
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float = 0.15,
+                        memory_tolerance: float = 0.15, memory_floor_mb: float = 16.0):
+    """
+    Find cases that regressed against a baseline.
+    
+    A case regresses when its throughput drops by more than `tolerance` or its
+    peak memory increase grows by more than `memory_tolerance` (and by more than
+    `memory_floor_mb`, so small cases are not flagged for allocator noise).
+    Cases missing from the baseline are ignored.
+    
+    Returns:
+        List of human-readable regression descriptions
+    """
+    regressions = []
+    for key, current in results["results"].items():
+        reference = baseline.get("results", {}).get(key)
+        if reference is None:
+            continue
+        
+        change = current["rows_per_second"] / reference["rows_per_second"] - 1
+        if change < -tolerance:
+            regressions.append(
+                f"{key}: {current['rows_per_second']:,.0f} rows/s vs baseline "
+                f"{reference['rows_per_second']:,.0f} ({change:+.1%})"
+            )
+        
+        allowed = max(
+            reference["peak_rss_increase_mb"] * (1 + memory_tolerance),
+            reference["peak_rss_increase_mb"] + memory_floor_mb
+        )
+        if current["peak_rss_increase_mb"] > allowed:
+            regressions.append(
+                f"{key}: peak memory +{current['peak_rss_increase_mb']:.1f} MB vs baseline "
+                f"+{reference['peak_rss_increase_mb']:.1f} MB"
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the evaluation pipeline")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Dataset sizes in rows"
+    )
+    parser.add_argument(
+        "--evaluators", nargs="*", choices=list(EVALUATOR_CASES), default=None,
+        help="Code-based evaluators to benchmark (default: all)"
+    )
+    parser.add_argument(
+        "--suites", nargs="*", choices=list(SUITE_CASES), default=None,
+        help="Suites to benchmark end to end (default: all)"
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the generated data")
+    parser.add_argument(
+        "--data-dir", default=".cache/benchmark_data", help="Where generated datasets are kept"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case below 1M rows")
+    parser.add_argument("--chunk-rows", type=int, default=10_000, help="Rows per evaluated chunk")
+    parser.add_argument(
+        "--llm-latency-ms", type=float, default=0.0, help="Simulated latency of each stub LLM call"
+    )
+    parser.add_argument("--output", default="benchmark_results.json", help="Results JSON file")
+    parser.add_argument("--baseline", help="Baseline results JSON to compare against")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.15,
+        help="Allowed throughput drop against the baseline (fraction)"
+    )
+    parser.add_argument(
+        "--memory-tolerance", type=float, default=0.15,
+        help="Allowed peak memory growth against the baseline (fraction)"
+    )
+    parser.add_argument("--save-baseline", help="Also write the results to this baseline file")
+    args = parser.parse_args(argv)
+    
+    print("\n" + "="*70)
+    print("  NAKL LOGISTICS - EVALUATION BENCHMARKS")
+    print("="*70 + "\n")
+    
+    results = run_benchmarks(
+        sizes=args.sizes, evaluators=args.evaluators, suites=args.suites, seed=args.seed,
+        data_dir=args.data_dir, repeat=args.repeat, chunk_rows=args.chunk_rows,
+        llm_latency_ms=args.llm_latency_ms
+    )
+    
+    for path in filter(None, (args.output, args.save_baseline)):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    print(f"\n📊 Results saved to: {args.output}")
+    
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(
+            results, baseline, tolerance=args.tolerance, memory_tolerance=args.memory_tolerance
+        )
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) against {args.baseline}:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print(f"\n✅ No regressions against {args.baseline}")
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""
+Columnar Result Files
+=====================
+
+Writes per-row evaluation results as typed columnar files (Parquet or Arrow
+IPC) and reads them back memory-mapped, loading only the columns needed.
+Requires `pyarrow`, which is imported lazily so the JSONL output keeps
+working without it.
+"""
+
+import json
+import os
+from pathlib import Path
+
+RESULT_FORMATS = ("jsonl", "parquet", "arrow")
+RESULT_EXTENSIONS = {"jsonl": ".jsonl", "parquet": ".parquet", "arrow": ".arrow"}
+DEFAULT_ROW_GROUP_ROWS = 100_000
+
+
+def results_file_name(results_format: str):
+    """
+    File name of the row-level results for an output format.
+    """
+    if results_format not in RESULT_FORMATS:
+        raise ValueError(f"Unknown results format {results_format!r}; expected one of {RESULT_FORMATS}")
+    return "eval_results" + RESULT_EXTENSIONS[results_format]
+
+
+class ColumnarResultWriter:
+    """
+    Streaming writer of SDK-style row records to a Parquet or Arrow IPC file.
+    
+    Records are buffered into row groups of `row_group_rows` rows, and each
+    row group's column types are inferred from its own values. Nested values
+    (dicts and lists) and columns mixing text with other values are stored as
+    JSON text. When a row group does not fit the schema of the rows written
+    so far, the schema is widened rather than the values coerced: integer
+    columns become float64 once floats appear, columns that were entirely
+    null take the first real type, new columns are added and any other
+    conflict becomes a string column. Rows written under the narrower schema
+    are kept in a part file and cast to the final schema when the writer is
+    closed (only files whose schema changed are rewritten). Parquet files are
+    zstd-compressed with min/max statistics per row group; Arrow IPC files are
+    uncompressed so they can be memory-mapped without copying.
+    """
+    
+    def __init__(self, path, results_format: str = "parquet",
+                 row_group_rows: int = DEFAULT_ROW_GROUP_ROWS):
+        """
+        Initialize the writer.
+        
+        Args:
+            path: Output file
+            results_format: "parquet" or "arrow"
+            row_group_rows: Number of rows per row group (Parquet) or record batch (Arrow)
+        """
+        if results_format not in ("parquet", "arrow"):
+            raise ValueError(f"Columnar results format must be 'parquet' or 'arrow', got {results_format!r}")
+        import pyarrow  # noqa: F401  (fail early when the optional dependency is missing)
+        
+        self.path = Path(path)
+        self.results_format = results_format
+        self.row_group_rows = row_group_rows
+        self.rows_written = 0
+        self._buffer = []
+        self._schema = None
+        self._writer = None
+        self._parts = []
+    
+    def write(self, records: list):
+        """
+        Append row records (e.g. the records of one evaluated chunk).
+        """
+        self._buffer.extend(records)
+        while len(self._buffer) >= self.row_group_rows:
+            self._write_row_group(self._buffer[:self.row_group_rows])
+            del self._buffer[:self.row_group_rows]
+    
+    def close(self):
+        """
+        Flush buffered rows and finish the file.
+        """
+        if self._buffer or self._writer is None:
+            self._write_row_group(self._buffer)
+            self._buffer = []
+        self._writer.close()
+        
+        if len(self._parts) == 1:
+            os.replace(self._parts[0], self.path)
+        else:
+            self._combine_parts()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def _write_row_group(self, records: list):
+        import pyarrow as pa
+        
+        keys = dict.fromkeys(key for record in records for key in record)
+        table = pa.Table.from_arrays(
+            [_to_array([record.get(key) for record in records]) for key in keys],
+            names=list(keys)
+        )
+        
+        schema = table.schema if self._schema is None else _widen_schema(self._schema, table.schema)
+        if schema != self._schema:
+            # Rows already written keep their narrower schema in their own part
+            if self._writer is not None:
+                self._writer.close()
+            self._parts.append(self.path.with_name(f".{self.path.name}.part{len(self._parts)}"))
+            self._schema = schema
+            self._writer = self._open(self._parts[-1], schema)
+        
+        self._write_table(self._writer, _cast_table(table, schema))
+        self.rows_written += len(records)
+    
+    def _combine_parts(self):
+        import pyarrow as pa
+        
+        writer = self._open(self.path, self._schema)
+        try:
+            for part in self._parts:
+                if self.results_format == "parquet":
+                    import pyarrow.parquet as pq
+                    
+                    part_file = pq.ParquetFile(part, memory_map=True)
+                    groups = (part_file.read_row_group(i) for i in range(part_file.num_row_groups))
+                else:
+                    reader = pa.ipc.open_file(pa.memory_map(str(part), "r"))
+                    groups = (pa.Table.from_batches([reader.get_batch(i)])
+                              for i in range(reader.num_record_batches))
+                for table in groups:
+                    self._write_table(writer, _cast_table(table, self._schema))
+        finally:
+            writer.close()
+        for part in self._parts:
+            part.unlink()
+    
+    def _write_table(self, writer, table):
+        if self.results_format == "parquet":
+            writer.write_table(table, row_group_size=max(table.num_rows, 1))
+        else:
+            writer.write_table(table)
+    
+    def _open(self, path, schema):
+        import pyarrow as pa
+        
+        if self.results_format == "parquet":
+            import pyarrow.parquet as pq
+            
+            return pq.ParquetWriter(
+                path, schema, compression="zstd", write_statistics=True
+            )
+        return pa.ipc.new_file(path, schema)
+
+
+def _to_array(values: list):
+    import pyarrow as pa
+    
+    if not any(isinstance(value, (dict, list)) for value in values):
+        try:
+            return pa.array(values)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass
+    return pa.array([_to_text(value) for value in values], type=pa.string())
+
+
+def _to_text(value):
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+def _widen_type(current, new):
+    import pyarrow as pa
+    
+    if current == new or pa.types.is_null(new):
+        return current
+    if pa.types.is_null(current):
+        return new
+    numeric = (pa.types.is_integer, pa.types.is_floating)
+    if any(check(current) for check in numeric) and any(check(new) for check in numeric):
+        return pa.float64()
+    return pa.string()
+
+
+def _widen_schema(schema, new_schema):
+    """
+    Smallest schema holding both schemas' columns without losing values.
+    """
+    import pyarrow as pa
+    
+    fields = [
+        pa.field(field.name, _widen_type(field.type, new_schema.field(field.name).type))
+        if field.name in new_schema.names else field
+        for field in schema
+    ]
+    fields.extend(field for field in new_schema if field.name not in schema.names)
+    return pa.schema(fields)
+
+
+def _cast_table(table, schema):
+    import pyarrow as pa
+    
+    arrays = []
+    for field in schema:
+        if field.name not in table.column_names:
+            arrays.append(pa.nulls(table.num_rows, type=field.type))
+            continue
+        column = table.column(field.name)
+        if column.type == field.type:
+            arrays.append(column)
+        elif pa.types.is_string(field.type) and not pa.types.is_null(column.type):
+            # Same text as values that were mixed within one row group
+            arrays.append(pa.array([_to_text(value) for value in column.to_pylist()], type=pa.string()))
+        else:
+            arrays.append(column.cast(field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def convert_jsonl_results(jsonl_path, output_file, results_format: str = "parquet",
+                          row_group_rows: int = DEFAULT_ROW_GROUP_ROWS):
+    """
+    Convert a row-level `eval_results.jsonl` file to Parquet or Arrow IPC.
+    
+    Returns:
+        Number of rows written
+    """
+    from streaming import iter_jsonl_chunks
+    
+    with ColumnarResultWriter(output_file, results_format, row_group_rows) as writer:
+        for chunk in iter_jsonl_chunks(jsonl_path, chunk_rows=row_group_rows):
+            writer.write(chunk)
+    return writer.rows_written
+
+
+def read_results(path, columns=None, filters=None):
+    """
+    Memory-map a columnar results file and load only the requested columns.
+    
+    Args:
+        path: `.parquet` or `.arrow` results file
+        columns: Column names to load (e.g. ["outputs.price_accuracy.error_percentage"]);
+            None loads every column
+        filters: Optional Parquet predicate, e.g.
+            [("outputs.price_accuracy.is_acceptable", "==", False)]. Row groups
+            whose statistics rule the predicate out are skipped entirely.
+            
+    Returns:
+        pyarrow.Table (use `.to_pandas()` or `.column(name).to_numpy()`)
+    """
+    import pyarrow as pa
+    
+    path = Path(path)
+    if path.suffix == ".arrow":
+        # Zero-copy: column buffers point straight into the mapped file
+        table = pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+        if columns is not None:
+            table = table.select(columns)
+        if filters is not None:
+            import pyarrow.parquet as pq
+            
+            table = table.filter(pq.filters_to_expression(filters))
+        return table
+    
+    import pyarrow.parquet as pq
+    
+    return pq.read_table(path, columns=columns, filters=filters, memory_map=True)
@@ -0,0 +1,173 @@
+"""
+Duplicate Judgement Reuse
+=========================
+
+Support logs repeat the same query/response pairs with only cosmetic
+differences (diacritics, tatweel, letter variants, digit scripts, spacing).
+`DeduplicatingEvaluator` groups rows by their normalized inputs, judges one
+representative per group and copies its result to the rest of the group.
+"""
+
+import hashlib
+import inspect
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from evaluators.arabic_text import normalize_arabic
+
+DEFAULT_MAX_ENTRIES = 200_000
+
+
+def dedup_key(inputs: dict):
+    """
+    Hash of an evaluator's inputs after Arabic normalization of every text value.
+    """
+    normalized = {
+        name: normalize_arabic(value) if isinstance(value, str) else value
+        for name, value in inputs.items()
+    }
+    payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DeduplicatingEvaluator:
+    """
+    Transparent wrapper judging each group of normalized-equal rows once.
+    
+    The first row of a group (or the representative chosen by `prefetch()`)
+    is passed to the wrapped evaluator; concurrent calls for the same group
+    wait for that judgement instead of starting their own, and later calls
+    reuse it. Reused results report zero LLM tokens. Results are kept for the
+    `max_entries` most recently used groups.
+    
+    `inspect.signature()` follows `__wrapped__`, so the SDK still sees the
+    evaluator's own parameters; other attributes are forwarded.
+    """
+    
+    def __init__(self, evaluator, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Initialize the wrapper.
+        
+        Args:
+            evaluator: Evaluator to deduplicate (e.g. CustomerServiceQualityEvaluator)
+            max_entries: Maximum number of group results kept in memory
+        """
+        self._evaluator = evaluator
+        self.__wrapped__ = evaluator
+        self.max_entries = max_entries
+        self._key_fields = _keyword_parameters(evaluator)
+        self.rows = 0
+        self.judged = 0
+        self._results = OrderedDict()
+        self._pending = {}
+        self._representatives = {}
+        self._lock = threading.Lock()
+    
+    def __call__(self, **kwargs):
+        key = self._key(kwargs)
+        with self._lock:
+            self.rows += 1
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                return _reused(result)
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = self._pending[key] = Future()
+                inputs = self._representatives.pop(key, kwargs)
+        
+        if not owner:
+            return _reused(future.result())
+        
+        try:
+            result = self._evaluator(**inputs)
+        except BaseException as error:
+            with self._lock:
+                del self._pending[key]
+            future.set_exception(error)
+            raise
+        
+        with self._lock:
+            self.judged += 1
+            self._results[key] = result
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+            del self._pending[key]
+        future.set_result(result)
+        return dict(result)
+    
+    def prefetch(self, rows, **kwargs):
+        """
+        Forward one representative per new group to the wrapped evaluator's
+        `prefetch()` (packed judging); calls for the group then judge that
+        representative.
+        """
+        representatives = {}
+        with self._lock:
+            for row in rows:
+                key = self._key(row)
+                if key not in self._results and key not in representatives:
+                    representatives[key] = row
+            self._representatives = dict(representatives)
+        if hasattr(self._evaluator, "prefetch"):
+            self._evaluator.prefetch(list(representatives.values()), **kwargs)
+    
+    def _key(self, inputs: dict):
+        # Extra columns passed through **kwargs do not split groups
+        if self._key_fields:
+            inputs = {name: inputs.get(name) for name in self._key_fields}
+        return dedup_key(inputs)
+    
+    def stats(self):
+        """
+        Rows seen, groups judged and the share of rows answered from a group.
+        """
+        with self._lock:
+            rows, judged = self.rows, self.judged
+        return {
+            "rows": rows,
+            "judged": judged,
+            "reused": rows - judged,
+            "dedup_ratio": (rows - judged) / rows if rows else 0.0
+        }
+    
+    def __getstate__(self):
+        # Picklable for evaluation in worker processes; the lock and in-flight
+        # judgements are not carried over (counters kept by copies are not
+        # seen here, see streaming.py)
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["_pending"] = {}
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+    
+    def __getattr__(self, name):
+        evaluator = self.__dict__.get("_evaluator")
+        if evaluator is None or name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(evaluator, name)
+
+
+def _keyword_parameters(evaluator):
+    try:
+        parameters = inspect.signature(evaluator).parameters.values()
+    except (TypeError, ValueError):
+        return ()
+    return tuple(
+        parameter.name for parameter in parameters
+        if parameter.kind in (inspect.Parameter.KEYWORD_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD)
+    )
+
+
+def _reused(result):
+    # The judgement was paid for once; copies cost no tokens
+    return {
+        key: 0 if key.endswith(("_prompt_tokens", "_completion_tokens", "_total_tokens")) else value
+        for key, value in result.items()
+    }
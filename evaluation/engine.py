@@ -0,0 +1,299 @@
+"""
+Fused Evaluation Engine
+=======================
+
+Runs any number of deterministic (code-based) evaluators over a JSONL
+dataset in a single pass: every chunk of rows is read and parsed once and
+then handed to all evaluators, using their vectorized `evaluate_batch()`
+when available.
+"""
+
+import inspect
+import json
+import math
+import re
+import time
+from pathlib import Path
+
+import numpy as np
+
+from columnar import ColumnarResultWriter, results_file_name
+from streaming import iter_jsonl_chunks
+from telemetry import get_telemetry
+
+
+class FusedEvaluationEngine:
+    """
+    Single-pass runner for code-based evaluators.
+
+    Produces the same per-row outputs (`inputs.<column>` and
+    `outputs.<evaluator>.<metric>`) and aggregate metrics (mean of every
+    numeric output, `<evaluator>.<metric>`) as `azure.ai.evaluation.evaluate`.
+    """
+
+    def __init__(self, evaluators: dict, evaluator_config: dict = None, chunk_size: int = 10_000):
+        """
+        Initialize the engine.
+
+        Args:
+            evaluators: Mapping of evaluator name to evaluator instance
+            evaluator_config: Optional per-evaluator config with "column_mapping",
+                in the same format as `azure.ai.evaluation.evaluate`
+            chunk_size: Number of rows parsed and evaluated per batch
+        """
+        evaluator_config = evaluator_config or {}
+        self.evaluators = evaluators
+        self.chunk_size = chunk_size
+        self._inputs = {
+            name: compile_column_mapping(
+                evaluator,
+                evaluator_config.get(name, {}).get("column_mapping", {})
+            )
+            for name, evaluator in evaluators.items()
+        }
+
+    def run(self, data, rows_sink=None):
+        """
+        Evaluate a JSONL file with every evaluator in one pass.
+
+        Args:
+            data: Path to the JSONL dataset
+            rows_sink: Optional callable receiving the list of per-row result
+                records of each chunk (e.g. to write them to disk)
+
+        Returns:
+            Dictionary with "metrics" (aggregates) and "rows_evaluated"
+        """
+        for evaluator in self.evaluators.values():
+            if hasattr(evaluator, "reset"):
+                evaluator.reset()
+
+        totals = {}
+        rows_evaluated = 0
+        for chunk in iter_jsonl_chunks(data, chunk_rows=self.chunk_size):
+            outputs = self.evaluate_chunk(chunk)
+            rows_evaluated += len(chunk)
+
+            for name, columns in outputs.items():
+                skip = getattr(self.evaluators[name], "NON_METRIC_OUTPUTS", ())
+                for metric, values in columns.items():
+                    if metric not in skip:
+                        _accumulate_mean(totals, f"{name}.{metric}", values)
+
+            if rows_sink is not None:
+                rows_sink(_to_row_records(chunk, outputs))
+
+        metrics = {
+            key: total / count for key, (total, count) in totals.items() if count
+        }
+        for name, evaluator in self.evaluators.items():
+            if hasattr(evaluator, "aggregate"):
+                metrics.update(flatten_metrics(evaluator.aggregate(), prefix=name))
+
+        return {"metrics": metrics, "rows_evaluated": rows_evaluated}
+
+    def evaluate_chunk(self, rows: list):
+        """
+        Run every evaluator over one chunk of parsed rows.
+
+        Args:
+            rows: List of row dictionaries
+
+        Returns:
+            Mapping of evaluator name to its outputs as columns (one entry per row)
+        """
+        telemetry = get_telemetry()
+        outputs = {}
+        for name, evaluator in self.evaluators.items():
+            label = type(evaluator).__name__
+            inputs = {
+                param: [getter(row) for row in rows]
+                for param, getter in self._inputs[name].items()
+            }
+            with telemetry.span("evaluator.batch", evaluator=label, rows=len(rows)):
+                if hasattr(evaluator, "evaluate_batch"):
+                    started = time.perf_counter()
+                    try:
+                        outputs[name] = evaluator.evaluate_batch(**inputs)
+                    except Exception as error:
+                        telemetry.record(label, "batch", time.perf_counter() - started, len(rows), error)
+                        raise
+                    telemetry.record(label, "batch", time.perf_counter() - started, len(rows))
+                else:
+                    results = [
+                        _timed_call(telemetry, label, evaluator,
+                                    {param: values[i] for param, values in inputs.items()})
+                        for i in range(len(rows))
+                    ]
+                    keys = dict.fromkeys(key for result in results for key in result)
+                    outputs[name] = {key: [result.get(key) for result in results] for key in keys}
+        return outputs
+
+
+def evaluate_code_only(data, evaluators: dict, evaluator_config: dict = None, output_path=None,
+                       chunk_size: int = 10_000, results_format: str = "jsonl"):
+    """
+    Lightweight replacement for `azure.ai.evaluation.evaluate` for suites made
+    only of deterministic evaluators.
+
+    Streams the dataset through the fused engine without importing the
+    Azure packages. Row records and metric names match the SDK's
+    (`inputs.<column>`, `outputs.<evaluator>.<metric>`), and the output
+    directory has the same layout as SDK suites run through
+    `streaming.evaluate_streaming()`: `eval_results.jsonl` with row-level
+    results and `metrics.json` with aggregates. This is not the single
+    `rows`/`metrics` JSON file that `azure.ai.evaluation.evaluate(output_path=...)`
+    writes. With `results_format` "parquet" or "arrow" the row-level results
+    are written as a typed columnar file instead of JSONL.
+
+    Args:
+        data: Path to the JSONL dataset
+        evaluators: Mapping of evaluator name to code-based evaluator instance
+        evaluator_config: Per-evaluator config with "column_mapping"
+        output_path: Optional output directory
+        chunk_size: Number of rows parsed and evaluated per batch
+        results_format: "jsonl", "parquet" or "arrow"
+
+    Returns:
+        Dictionary with "metrics", "rows_evaluated" and "output_path"
+    """
+    engine = FusedEvaluationEngine(evaluators, evaluator_config, chunk_size=chunk_size)
+
+    if output_path is None:
+        result = engine.run(data)
+    else:
+        output_path = Path(output_path)
+        output_path.mkdir(parents=True, exist_ok=True)
+        results_path = output_path / results_file_name(results_format)
+        if results_format == "jsonl":
+            with open(results_path, "w", encoding="utf-8") as f:
+                def write_rows(records):
+                    f.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+                result = engine.run(data, rows_sink=write_rows)
+        else:
+            with ColumnarResultWriter(results_path, results_format) as writer:
+                result = engine.run(data, rows_sink=writer.write)
+
+        with open(output_path / "metrics.json", "w", encoding="utf-8") as f:
+            json.dump(result["metrics"], f, ensure_ascii=False, indent=2)
+
+    result["output_path"] = str(output_path) if output_path is not None else None
+    return result
+
+
+def _timed_call(telemetry, label: str, evaluator, inputs: dict):
+    started = time.perf_counter()
+    try:
+        result = evaluator(**inputs)
+    except Exception as error:
+        telemetry.record(label, "call", time.perf_counter() - started, error=error)
+        raise
+    telemetry.record(label, "call", time.perf_counter() - started)
+    return result
+
+
+def compile_column_mapping(evaluator, column_mapping: dict):
+    """
+    Compile an evaluator's column mapping into per-parameter row getters.
+
+    Supports "${data}" (the whole row) and "${data.<field>}" with dotted
+    nested fields. Parameters without a mapping read the data column with the
+    same name, as in `azure.ai.evaluation.evaluate`.
+
+    Args:
+        evaluator: Evaluator instance (its keyword-only parameters are inputs)
+        column_mapping: Mapping of parameter name to "${data...}" reference
+
+    Returns:
+        Mapping of parameter name to a function taking a row
+    """
+    parameters = [
+        param.name
+        for param in inspect.signature(evaluator).parameters.values()
+        if param.kind == inspect.Parameter.KEYWORD_ONLY
+    ]
+
+    getters = {}
+    for param in parameters:
+        reference = column_mapping.get(param, f"${{data.{param}}}")
+        match = _DATA_REFERENCE.fullmatch(reference)
+        if not match:
+            raise ValueError(
+                f"Unsupported column mapping for '{param}': {reference} "
+                f"(expected ${{data}} or ${{data.<field>}})"
+            )
+        getters[param] = _field_getter(match.group(1))
+    return getters
+
+
+_DATA_REFERENCE = re.compile(r"\$\{data(?:\.([^}]+))?\}")
+
+
+def _field_getter(path):
+    if path is None:
+        return lambda row: row
+    if "." not in path:
+        return lambda row: row.get(path)
+
+    keys = path.split(".")
+
+    def get(row):
+        value = row
+        for key in keys:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+        return value
+    return get
+
+
+def _accumulate_mean(totals: dict, key: str, values):
+    """
+    Add a column's numeric (non-boolean) values to a running (sum, count).
+    """
+    if isinstance(values, np.ndarray) and values.dtype != object:
+        array = values
+    else:
+        # Python-level outputs: None counts as missing, anything else non-numeric
+        # (text, lists, booleans) means the column is not a metric
+        numbers = []
+        for value in (values.tolist() if isinstance(values, np.ndarray) else values):
+            if isinstance(value, bool) or not isinstance(value, (int, float, type(None))):
+                return
+            if value is not None:
+                numbers.append(value)
+        array = np.asarray(numbers, dtype=np.float64)
+    if array.dtype == bool or not np.issubdtype(array.dtype, np.number):
+        return
+
+    array = array.astype(np.float64, copy=False)
+    valid = array[~np.isnan(array)]
+    total, count = totals.get(key, (0.0, 0))
+    totals[key] = (total + float(valid.sum()), count + int(valid.size))
+
+
+def _to_row_records(rows: list, outputs: dict):
+    """
+    Build SDK-style per-row records from a chunk and its column outputs.
+    """
+    records = [{f"inputs.{key}": value for key, value in row.items()} for row in rows]
+    for name, columns in outputs.items():
+        for metric, values in columns.items():
+            column = values.tolist() if isinstance(values, np.ndarray) else values
+            key = f"outputs.{name}.{metric}"
+            for record, value in zip(records, column):
+                record[key] = value
+    return records
+
+
+def flatten_metrics(values: dict, prefix: str):
+    """
+    Flatten an evaluator's `aggregate()` output into "<prefix>.<key>" metrics.
+    """
+    flat = {}
+    for key, value in values.items():
+        if isinstance(value, dict):
+            flat.update(flatten_metrics(value, f"{prefix}.{key}"))
+        elif value is not None and not (isinstance(value, float) and math.isnan(value)):
+            flat[f"{prefix}.{key}"] = value
+    return flat
@@ -6,29 +6,58 @@ This script runs comprehensive evaluations on the Nakl Logistics system.
 """
 
 import os
+import json
+import time
+import asyncio
+import inspect
+import argparse
+import contextvars
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+import numpy as np
 from dotenv import load_dotenv
-from azure.ai.evaluation import evaluate, RelevanceEvaluator, CoherenceEvaluator
-from azure.ai.evaluation import AzureOpenAIModelConfiguration, OpenAIModelConfiguration
+from columnar import RESULT_FORMATS
+from dedup import DeduplicatingEvaluator
+from engine import evaluate_code_only, flatten_metrics
+from prescreen import PrescreenedEvaluator
+from incremental import WatermarkStore, select_new_rows, merge_metrics, totals_to_means
+from sampling import (
+    DEFAULT_SCORE_STD,
+    DEFAULT_STRATA,
+    StratifiedSample,
+    draw_stratified_sample,
+    estimate_sampled_metrics,
+    required_sample_size
+)
+from sequential import SequentialStopper, write_shuffled
+from streaming import evaluate_streaming, iter_jsonl_chunks
+from telemetry import get_telemetry
 from evaluators.code_based import (
     ResponseTimeEvaluator,
     PriceAccuracyEvaluator,
     RouteOptimalityEvaluator,
-    DataCompletenessEvaluator
-)
-from evaluators.prompt_based import (
-    CustomerServiceQualityEvaluator,
-    PricingJustificationEvaluator
+    DataCompletenessEvaluator,
+    DETERMINISTIC_EVALUATORS
 )
+from evaluators.registry import get_shared_evaluator
+
+# The Azure SDK and promptflow are imported lazily, only by suites that use
+# LLM evaluators, so code-only suites start fast and run without them.
 
 # Load environment variables
 load_dotenv()
 
+@lru_cache(maxsize=None)
 def get_model_config():
     """
     Get model configuration from environment variables.
     Supports both Azure OpenAI and OpenAI.
+    
+    Built once per process and shared by every suite.
     """
+    from azure.ai.evaluation import AzureOpenAIModelConfiguration, OpenAIModelConfiguration
+    
     # Try Azure OpenAI first
     azure_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
     if azure_endpoint:
@@ -48,21 +77,506 @@ def get_model_config():
     )
 
 
+@lru_cache(maxsize=None)
+def get_judgement_cache():
+    """
+    Get the on-disk cache for LLM judge responses (shared by every suite).
+    
+    Configured with EVALUATION_CACHE_PATH; set it to "off" to disable caching.
+    """
+    from evaluators.llm_cache import JudgementCache
+    
+    cache_path = os.getenv("EVALUATION_CACHE_PATH", ".cache/llm_judgements.sqlite")
+    if cache_path.lower() in ("", "off", "none"):
+        return None
+    return JudgementCache(
+        path=cache_path,
+        max_age_seconds=float(os.getenv("EVALUATION_CACHE_MAX_AGE_DAYS", "30")) * 24 * 3600
+    )
+
+
+@lru_cache(maxsize=None)
+def get_near_duplicate_index():
+    """
+    Get the on-disk near-duplicate index of LLM judgements (shared by every suite).
+    
+    Only enabled when EVALUATION_NEAR_DUP_THRESHOLD is set: rows whose masked,
+    normalized text is at least that similar (estimated Jaccard) to an
+    already-judged row reuse its judgement. Stored at EVALUATION_NEAR_DUP_PATH.
+    """
+    threshold = os.getenv("EVALUATION_NEAR_DUP_THRESHOLD", "").lower()
+    if threshold in ("", "off", "none") or float(threshold) == 0:
+        return None
+    
+    from evaluators.near_duplicates import NearDuplicateIndex
+    
+    return NearDuplicateIndex(
+        path=os.getenv("EVALUATION_NEAR_DUP_PATH", ".cache/near_duplicates.sqlite"),
+        threshold=float(threshold)
+    )
+
+
+@lru_cache(maxsize=None)
+def get_router():
+    """
+    Get the offline road router used to fill in optimal route distances.
+    
+    Only enabled when EVALUATION_ROAD_GRAPH points to a road network (an .osm
+    extract or a CSV edge list, with an optional EVALUATION_ROAD_NODES file).
+    Preprocessing is cached in EVALUATION_ROAD_CACHE_DIR.
+    """
+    graph_file = os.getenv("EVALUATION_ROAD_GRAPH", "")
+    if not graph_file:
+        return None
+    
+    from routing import load_router
+    
+    return load_router(
+        graph_file,
+        nodes_file=os.getenv("EVALUATION_ROAD_NODES") or None,
+        cache_dir=os.getenv("EVALUATION_ROAD_CACHE_DIR", ".cache/routing")
+    )
+
+
+def get_data_path(file_name: str):
+    """
+    Path of a dataset file in EVALUATION_DATA_DIR (default ./data).
+    """
+    return Path(os.getenv("EVALUATION_DATA_DIR", "data")) / file_name
+
+
+def print_cache_stats(cache):
+    """
+    Display hit/miss counters of the judgement cache.
+    """
+    if cache is None:
+        return
+    stats = cache.stats()
+    print(f"\n🗄️  Judgement cache: {stats['hits']} hits, {stats['misses']} misses "
+          f"({stats['hit_rate']:.1%} hit rate, {stats['entries']} entries)")
+
+
+def print_near_duplicate_stats(index):
+    """
+    Display how many judgements were reused from near-duplicate rows.
+    """
+    if index is None:
+        return
+    stats = index.stats()
+    if not stats["hits"] + stats["misses"]:
+        return
+    similarity = f", mean similarity {stats['mean_similarity']:.2f}" if stats["hits"] else ""
+    print(f"\n🪞 Near duplicates: {stats['hits']} reused, {stats['misses']} judged "
+          f"({stats['hit_rate']:.1%} reused{similarity}, {stats['entries']} indexed)")
+
+
+def print_dedup_stats(evaluators: dict):
+    """
+    Display how many rows each deduplicating evaluator answered from a group.
+    """
+    # Deduplicating evaluators may themselves be wrapped (e.g. pre-screened)
+    unwrapped = {
+        name: inspect.unwrap(evaluator, stop=lambda wrapper: isinstance(wrapper, DeduplicatingEvaluator))
+        for name, evaluator in evaluators.items()
+    }
+    stats = {
+        name: evaluator.stats() for name, evaluator in unwrapped.items()
+        if isinstance(evaluator, DeduplicatingEvaluator)
+    }
+    if not any(entry["rows"] for entry in stats.values()):
+        return
+    print("\n🧬 Normalized Duplicates:")
+    print("-" * 60)
+    for name, entry in stats.items():
+        print(f"  {name}: {entry['judged']:,} judged for {entry['rows']:,} rows "
+              f"({entry['dedup_ratio']:.1%} reused)")
+
+
+def prescreen(evaluator, field: str):
+    """
+    Put the deterministic pre-screen cascade ahead of a prompt-based judge.
+    
+    Opt-in, since heuristic scores replace LLM judgements: configured with
+    EVALUATION_PRESCREEN (1 enables it) and EVALUATION_PRESCREEN_MIN_CHARS.
+    """
+    if os.getenv("EVALUATION_PRESCREEN", "0") != "1":
+        return evaluator
+    return PrescreenedEvaluator(
+        evaluator,
+        field=field,
+        min_chars=int(os.getenv("EVALUATION_PRESCREEN_MIN_CHARS", "10"))
+    )
+
+
+def print_prescreen_stats(evaluators: dict):
+    """
+    Display how many rows each pre-screen stage scored without an LLM call.
+    """
+    stats = {
+        name: evaluator.stats() for name, evaluator in evaluators.items()
+        if isinstance(evaluator, PrescreenedEvaluator)
+    }
+    if not any(entry["rows"] for entry in stats.values()):
+        return
+    print("\n🚦 Pre-screen:")
+    print("-" * 60)
+    for name, entry in stats.items():
+        stages = ", ".join(f"{stage} {count:,}" for stage, count in entry["stages"].items())
+        print(f"  {name}: {entry['calls_avoided']:,} of {entry['rows']:,} LLM calls avoided "
+              f"({stages}); {entry['llm_rows']:,} judged")
+
+
+def run_evaluation(data, evaluators: dict, evaluator_config: dict, output_path,
+                   suite: str = None, watermark_fields=(), sample_strata=(), sequential_metrics=()):
+    """
+    Run an evaluation suite, bypassing the Azure SDK when possible.
+    
+    Suites made only of deterministic (code-based) evaluators run on the
+    built-in fused engine, which resolves the column mappings itself and writes
+    the same output layout; anything else goes through
+    `azure.ai.evaluation.evaluate`, fed in chunks of EVALUATION_CHUNK_ROWS rows.
+    
+    With EVALUATION_INCREMENTAL=1 (`--incremental`), only rows newer than the
+    suite's stored watermark are evaluated and merged into running aggregates.
+    SDK runs checkpoint after every chunk; with EVALUATION_RESUME=1
+    (`--resume`) an interrupted run continues from its checkpoint.
+    EVALUATION_RESULTS_FORMAT (`--results-format`) selects JSONL, Parquet or
+    Arrow IPC for the row-level results.
+    
+    With EVALUATION_SAMPLE_MARGIN (`--sample-margin`) set, suites passing
+    `sample_strata` run their LLM evaluators on a stratified sample only; with
+    EVALUATION_SEQUENTIAL=1 (`--sequential`), suites passing
+    `sequential_metrics` stop judging once those metrics are settled (see
+    `run_sampled_evaluation()`).
+    
+    Args:
+        data: Path to the JSONL dataset
+        evaluators: Mapping of evaluator name to evaluator instance
+        evaluator_config: Per-evaluator config with "column_mapping"
+        output_path: Where to write the results
+        suite: Suite name, used as the key of its watermark
+        watermark_fields: Row fields ordering new rows (e.g. ("timestamp",));
+            empty for append-only files, which are tracked by line offset
+        sample_strata: Stratum fields for sampled LLM evaluation; empty to
+            always evaluate every row
+        sequential_metrics: LLM metrics (e.g. "relevance.relevance") whose
+            precision or release gate decides when sequential judging stops
+        
+    Returns:
+        Evaluation result (dictionary with "metrics")
+    """
+    if suite is not None and os.getenv("EVALUATION_INCREMENTAL", "0") == "1":
+        return run_incremental_evaluation(
+            data, evaluators, evaluator_config, output_path, suite, watermark_fields
+        )
+    
+    sample_margin = os.getenv("EVALUATION_SAMPLE_MARGIN") if sample_strata else None
+    if os.getenv("EVALUATION_SEQUENTIAL", "0") != "1":
+        sequential_metrics = ()
+    if (sample_margin or sequential_metrics) and not all(
+            isinstance(e, DETERMINISTIC_EVALUATORS) for e in evaluators.values()):
+        return run_sampled_evaluation(
+            data, evaluators, evaluator_config, output_path,
+            strata=sample_strata,
+            margin=float(sample_margin) if sample_margin else None,
+            sequential_metrics=sequential_metrics
+        )
+    
+    chunk_rows = int(os.getenv("EVALUATION_CHUNK_ROWS", "10000"))
+    results_format = os.getenv("EVALUATION_RESULTS_FORMAT", "jsonl")
+    
+    if all(isinstance(e, DETERMINISTIC_EVALUATORS) for e in evaluators.values()):
+        return evaluate_code_only(
+            data=data,
+            evaluators=evaluators,
+            evaluator_config=evaluator_config,
+            output_path=output_path,
+            chunk_size=chunk_rows,
+            results_format=results_format
+        )
+    
+    # The SDK loads its whole input into memory, so feed it one chunk at a time
+    return evaluate_streaming(
+        data=data,
+        evaluators=evaluators,
+        evaluator_config=evaluator_config,
+        output_path=output_path,
+        chunk_rows=chunk_rows,
+        resume=os.getenv("EVALUATION_RESUME", "0") == "1",
+        results_format=results_format
+    )
+
+
+def run_sampled_evaluation(data, evaluators: dict, evaluator_config: dict, output_path,
+                           strata=(), margin: float = None, sequential_metrics=()):
+    """
+    Run deterministic evaluators on every row and LLM evaluators on a sample.
+    
+    With a `margin`, the LLM rows are a stratified sample: the number of rows
+    needed to estimate a 1-5 score within ±`margin` at
+    EVALUATION_SAMPLE_CONFIDENCE (default 0.95), assuming the worst-case
+    spread unless EVALUATION_SAMPLE_STD gives a better one. It is spread over
+    the strata in proportion to their size and drawn with
+    EVALUATION_SAMPLE_SEED.
+    
+    With `sequential_metrics`, the LLM rows (the stratified sample, or every
+    row) are judged in a random order, and judging stops once each of these
+    metrics is narrower than EVALUATION_SEQUENTIAL_CI_WIDTH or confidently
+    above or below its gate in EVALUATION_RELEASE_GATES (see
+    `sequential.SequentialStopper`).
+    
+    LLM metrics are reported as stratified estimates with "<metric>.ci_lower",
+    "<metric>.ci_upper" and "<metric>.margin". Code-based results are written
+    to `output_path` as usual; the judged rows and their LLM results go to
+    `output_path/llm_sample`, the allocation and estimates to
+    `output_path/sampling.json`, and the stopping decisions to
+    `output_path/sequential.json`.
+    
+    Returns:
+        Evaluation result with "metrics", "rows_evaluated" and "rows_sampled",
+        plus "calls_saved" for sequential runs
+    """
+    confidence = float(os.getenv("EVALUATION_SAMPLE_CONFIDENCE", "0.95"))
+    std = float(os.getenv("EVALUATION_SAMPLE_STD", str(DEFAULT_SCORE_STD)))
+    seed = int(os.getenv("EVALUATION_SAMPLE_SEED", "42"))
+    chunk_rows = int(os.getenv("EVALUATION_CHUNK_ROWS", "10000"))
+    output_path = Path(output_path)
+    sample_path = output_path / "llm_sample"
+    sample_path.mkdir(parents=True, exist_ok=True)
+    
+    code_evaluators = {
+        name: evaluator for name, evaluator in evaluators.items()
+        if isinstance(evaluator, DETERMINISTIC_EVALUATORS)
+    }
+    llm_evaluators = {
+        name: evaluator for name, evaluator in evaluators.items() if name not in code_evaluators
+    }
+    
+    metrics = {}
+    if code_evaluators:
+        metrics.update(evaluate_code_only(
+            data=data,
+            evaluators=code_evaluators,
+            evaluator_config={name: evaluator_config[name] for name in code_evaluators if name in evaluator_config},
+            output_path=output_path,
+            chunk_size=chunk_rows,
+            results_format=os.getenv("EVALUATION_RESULTS_FORMAT", "jsonl")
+        )["metrics"])
+    
+    llm_data = data
+    sample = None
+    if margin is not None:
+        llm_data = sample_path / "sample_rows.jsonl"
+        sample = draw_stratified_sample(
+            data, llm_data,
+            sample_size=lambda population: required_sample_size(margin, confidence, std, population),
+            strata=strata,
+            seed=seed,
+            chunk_rows=chunk_rows
+        )
+        print(f"🎯 Judging a stratified sample of {sample.size:,} / {sample.population:,} rows "
+              f"({int((sample.sample_sizes > 0).sum())} of {len(sample.keys)} strata, target ±{margin:g})")
+    
+    stopper = None
+    if sequential_metrics:
+        shuffled = sample_path / "shuffled_rows.jsonl"
+        permutation = write_shuffled(llm_data, shuffled, seed)
+        llm_data = shuffled
+        if sample is None:
+            sample = StratifiedSample.unstratified(len(permutation))
+        stopper = SequentialStopper(
+            sequential_metrics,
+            population=sample.population,
+            ci_width=float(os.environ["EVALUATION_SEQUENTIAL_CI_WIDTH"])
+            if os.getenv("EVALUATION_SEQUENTIAL_CI_WIDTH") else None,
+            gates=parse_release_gates(os.getenv("EVALUATION_RELEASE_GATES", "")),
+            confidence=confidence,
+            pool_rows=len(permutation)
+        )
+        if not stopper.metrics:
+            print("⚠️  Sequential mode has no CI width or release gates; judging every row")
+        # Small chunks so the stopping rule is checked often
+        chunk_rows = min(chunk_rows, stopper.min_rows)
+    
+    # Row results are read back in sample order, so the LLM run stays in JSONL
+    evaluate_streaming(
+        data=str(llm_data),
+        evaluators=llm_evaluators,
+        evaluator_config={name: evaluator_config[name] for name in llm_evaluators if name in evaluator_config},
+        output_path=sample_path,
+        chunk_rows=chunk_rows,
+        resume=os.getenv("EVALUATION_RESUME", "0") == "1",
+        stop_when=stopper
+    )
+    records = [
+        record for chunk in iter_jsonl_chunks(sample_path / "eval_results.jsonl", chunk_rows=chunk_rows)
+        for record in chunk
+    ]
+    if stopper is not None:
+        sample = sample.take(permutation[:len(records)])
+    estimates = estimate_sampled_metrics(records, sample, llm_evaluators, confidence)
+    for name, estimate in estimates.items():
+        if estimate["mean"] is not None:
+            metrics[name] = estimate["mean"]
+            metrics[f"{name}.ci_lower"] = estimate["ci_lower"]
+            metrics[f"{name}.ci_upper"] = estimate["ci_upper"]
+            metrics[f"{name}.margin"] = estimate["margin"]
+    
+    result = {
+        "metrics": metrics,
+        "rows_evaluated": sample.population,
+        "rows_sampled": sample.size,
+        "output_path": str(output_path)
+    }
+    
+    with open(output_path / "metrics.json", "w", encoding="utf-8") as f:
+        json.dump(metrics, f, ensure_ascii=False, indent=2)
+    with open(output_path / "sampling.json", "w", encoding="utf-8") as f:
+        json.dump({
+            "target_margin": margin,
+            "confidence": confidence,
+            "assumed_std": std,
+            "estimates": estimates,
+            "sample": sample.to_dict()
+        }, f, ensure_ascii=False, indent=2)
+    if stopper is not None:
+        report = stopper.report(llm_evaluators=len(llm_evaluators))
+        with open(output_path / "sequential.json", "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"🛑 Judged {report['rows_judged']:,} / {report['rows_available']:,} rows; "
+              f"saved {report['calls_saved']:,} LLM calls")
+        for metric, status in report["metrics"].items():
+            print(f"  {metric}: {status['decision'] or 'undecided'}")
+        result["calls_saved"] = report["calls_saved"]
+    
+    return result
+
+
+def parse_release_gates(value: str):
+    """
+    Parse release gates given as "metric=value,metric=value".
+    
+    Returns:
+        Dictionary mapping metric name (e.g. "relevance.relevance") to its gate
+    """
+    gates = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        metric, separator, gate = item.rpartition("=")
+        if not separator or not metric:
+            raise ValueError(f"Invalid release gate {item!r}; expected <metric>=<value>")
+        gates[metric.strip()] = float(gate)
+    return gates
+
+
+def run_incremental_evaluation(data, evaluators: dict, evaluator_config: dict, output_path,
+                               suite: str, watermark_fields=()):
+    """
+    Evaluate only the rows added since the suite's last run.
+    
+    New rows are selected against the watermark stored in
+    `<EVALUATION_OUTPUT_PATH>/watermarks.json`, evaluated as usual, and their
+    metrics merged into the stored running aggregates. `eval_results.jsonl`
+    holds this run's rows; `metrics.json` holds the cumulative aggregates.
+    
+    Returns:
+        Evaluation result with cumulative "metrics", plus "rows_evaluated" (this
+        run) and "rows_total" (all runs)
+    """
+    output_path = Path(output_path)
+    output_path.mkdir(parents=True, exist_ok=True)
+    store = WatermarkStore(output_path.parent / "watermarks.json")
+    state = store.get(suite)
+    
+    new_rows_file = output_path / "new_rows.jsonl"
+    try:
+        new_rows, watermark, watermark_rows, lines_seen = select_new_rows(
+            data, new_rows_file, state, watermark_fields,
+            chunk_rows=int(os.getenv("EVALUATION_CHUNK_ROWS", "10000"))
+        )
+        print(f"🔖 Incremental run: {new_rows} new row(s) since watermark {state.get('watermark')}")
+        
+        run_metrics = {}
+        if new_rows:
+            run_metrics = run_evaluation(
+                str(new_rows_file), evaluators, evaluator_config, output_path
+            )["metrics"]
+    finally:
+        new_rows_file.unlink(missing_ok=True)
+    
+    count_metrics = [
+        f"{name}.{key}" for name, evaluator in evaluators.items()
+        for key in getattr(evaluator, "COUNT_METRICS", ())
+    ]
+    totals = merge_metrics(state.get("metrics", {}), run_metrics, new_rows, count_metrics)
+    metrics = totals_to_means(totals)
+    
+    # Evaluators with mergeable state (e.g. latency sketches) report
+    # cumulative aggregates rather than means of per-run values
+    evaluator_states = dict(state.get("evaluator_states", {}))
+    for name, evaluator in evaluators.items():
+        if hasattr(evaluator, "state_dict"):
+            if name in evaluator_states:
+                evaluator.load_state_dict(evaluator_states[name])
+            evaluator_states[name] = evaluator.state_dict()
+            metrics.update(flatten_metrics(evaluator.aggregate(), prefix=name))
+    
+    with open(output_path / "metrics.json", "w", encoding="utf-8") as f:
+        json.dump(metrics, f, ensure_ascii=False, indent=2)
+    
+    rows_total = state.get("rows_evaluated", 0) + new_rows
+    store.update(suite, {
+        "key_fields": list(watermark_fields),
+        "watermark": watermark,
+        "watermark_rows": watermark_rows,
+        "lines_seen": lines_seen,
+        "rows_evaluated": rows_total,
+        "metrics": totals,
+        "evaluator_states": evaluator_states
+    })
+    
+    return {
+        "metrics": metrics,
+        "rows_evaluated": new_rows,
+        "rows_total": rows_total,
+        "output_path": str(output_path)
+    }
+
+
+def print_metrics(result):
+    """
+    Display the aggregate metrics of an evaluation result.
+    """
+    metrics = result.get("metrics", {}) if isinstance(result, dict) else getattr(result, "metrics", {})
+    for metric_name, value in metrics.items():
+        if isinstance(value, (int, float)):
+            print(f"  {metric_name}: {value:.3f}")
+        else:
+            print(f"  {metric_name}: {value}")
+
+
 def evaluate_customer_support():
     """
     Evaluate customer support responses.
     """
+    from azure.ai.evaluation import RelevanceEvaluator, CoherenceEvaluator
+    from evaluators.prompt_based import CustomerServiceQualityEvaluator
+    
     print("\n" + "="*60)
     print("EVALUATING CUSTOMER SUPPORT RESPONSES")
     print("="*60 + "\n")
     
     model_config = get_model_config()
+    cache = get_judgement_cache()
+    near_duplicates = get_near_duplicate_index()
+    
+    # Opt-in: rows whose query and response match after Arabic normalization are judged once
+    dedup = DeduplicatingEvaluator if os.getenv("EVALUATION_DEDUP", "0") == "1" else (lambda evaluator: evaluator)
     
     # Initialize evaluators
     evaluators = {
         # Built-in evaluators
-        "relevance": RelevanceEvaluator(model_config=model_config),
-        "coherence": CoherenceEvaluator(model_config=model_config),
+        "relevance": dedup(get_shared_evaluator(RelevanceEvaluator, model_config)),
+        "coherence": get_shared_evaluator(CoherenceEvaluator, model_config),
         
         # Custom code-based evaluators
         "response_time": ResponseTimeEvaluator(max_response_time=2.0),
@@ -71,7 +585,12 @@ def evaluate_customer_support():
         ),
         
         # Custom prompt-based evaluators
-        "service_quality": CustomerServiceQualityEvaluator(model_config=model_config)
+        "service_quality": prescreen(dedup(CustomerServiceQualityEvaluator(
+            model_config=model_config,
+            cache=cache,
+            pack_size=int(os.getenv("EVALUATION_PACK_SIZE", "1")),
+            near_duplicates=near_duplicates
+        )), field="response")
     }
     
     # Configure column mappings
@@ -110,11 +629,19 @@ def evaluate_customer_support():
     output_path = Path(os.getenv("EVALUATION_OUTPUT_PATH", "./evaluation_results"))
     output_path.mkdir(parents=True, exist_ok=True)
     
-    result = evaluate(
-        data="data/customer_support_samples.jsonl",
+    result = run_evaluation(
+        data=str(get_data_path("customer_support_samples.jsonl")),
         evaluators=evaluators,
         evaluator_config=evaluator_config,
-        output_path=str(output_path / "customer_support_evaluation")
+        output_path=str(output_path / "customer_support_evaluation"),
+        suite="customer_support",
+        watermark_fields=("timestamp",),
+        sample_strata=DEFAULT_STRATA,
+        sequential_metrics=(
+            "relevance.relevance",
+            "coherence.coherence",
+            "service_quality.customer_service_quality_score"
+        )
     )
     
     print("\n✅ Customer Support Evaluation Complete!")
@@ -123,12 +650,32 @@ def evaluate_customer_support():
     print("-" * 60)
     
     # Display metrics
-    if hasattr(result, 'metrics'):
-        for metric_name, value in result.metrics.items():
-            if isinstance(value, (int, float)):
-                print(f"  {metric_name}: {value:.3f}")
-            else:
-                print(f"  {metric_name}: {value}")
+    print_metrics(result)
+    
+    print_cache_stats(cache)
+    print_near_duplicate_stats(near_duplicates)
+    print_prescreen_stats(evaluators)
+    print_dedup_stats(evaluators)
+    
+    latency = evaluators["response_time"].aggregate()
+    if latency["rows_evaluated"]:
+        print("\n⏱️  Response Time:")
+        print("-" * 60)
+        print(f"  pass rate (≤ {evaluators['response_time'].max_response_time}s): "
+              f"{latency['pass_rate']:.1%}")
+        for key in ("p50_ms", "p95_ms", "p99_ms", "p99_9_ms"):
+            print(f"  {key}: {latency[key]:.1f}")
+        
+        # Keep the mergeable sketch so shards and later runs can be combined
+        with open(output_path / "customer_support_latency.json", "w", encoding="utf-8") as f:
+            json.dump(evaluators["response_time"].state_dict(), f)
+    
+    completeness = evaluators["data_completeness"].aggregate()
+    if completeness["rows_evaluated"]:
+        print("\n🧩 Missing Fields:")
+        print("-" * 60)
+        for field, count in completeness["missing_counts"].items():
+            print(f"  {field}: {count} / {completeness['rows_evaluated']}")
     
     return result
 
@@ -137,11 +684,15 @@ def evaluate_pricing_system():
     """
     Evaluate pricing calculation and explanation system.
     """
+    from evaluators.prompt_based import PricingJustificationEvaluator
+    
     print("\n" + "="*60)
     print("EVALUATING PRICING SYSTEM")
     print("="*60 + "\n")
     
     model_config = get_model_config()
+    cache = get_judgement_cache()
+    near_duplicates = get_near_duplicate_index()
     
     # Initialize evaluators
     evaluators = {
@@ -149,7 +700,12 @@ def evaluate_pricing_system():
         "price_accuracy": PriceAccuracyEvaluator(margin_percent=5.0),
         
         # Custom prompt-based evaluators
-        "pricing_justification": PricingJustificationEvaluator(model_config=model_config)
+        "pricing_justification": prescreen(PricingJustificationEvaluator(
+            model_config=model_config,
+            cache=cache,
+            pack_size=int(os.getenv("EVALUATION_PACK_SIZE", "1")),
+            near_duplicates=near_duplicates
+        ), field="price_explanation")
     }
     
     # Configure column mappings
@@ -172,11 +728,14 @@ def evaluate_pricing_system():
     output_path = Path(os.getenv("EVALUATION_OUTPUT_PATH", "./evaluation_results"))
     output_path.mkdir(parents=True, exist_ok=True)
     
-    result = evaluate(
-        data="data/pricing_samples.jsonl",
+    result = run_evaluation(
+        data=str(get_data_path("pricing_samples.jsonl")),
         evaluators=evaluators,
         evaluator_config=evaluator_config,
-        output_path=str(output_path / "pricing_evaluation")
+        output_path=str(output_path / "pricing_evaluation"),
+        suite="pricing",
+        watermark_fields=(),
+        sequential_metrics=("pricing_justification.pricing_justification_score",)
     )
     
     print("\n✅ Pricing System Evaluation Complete!")
@@ -185,12 +744,10 @@ def evaluate_pricing_system():
     print("-" * 60)
     
     # Display metrics
-    if hasattr(result, 'metrics'):
-        for metric_name, value in result.metrics.items():
-            if isinstance(value, (int, float)):
-                print(f"  {metric_name}: {value:.3f}")
-            else:
-                print(f"  {metric_name}: {value}")
+    print_metrics(result)
+    print_cache_stats(cache)
+    print_near_duplicate_stats(near_duplicates)
+    print_prescreen_stats(evaluators)
     
     return result
 
@@ -203,6 +760,26 @@ def evaluate_route_optimization():
     print("EVALUATING ROUTE OPTIMIZATION")
     print("="*60 + "\n")
     
+    output_path = Path(os.getenv("EVALUATION_OUTPUT_PATH", "./evaluation_results"))
+    output_path.mkdir(parents=True, exist_ok=True)
+    data = str(get_data_path("route_optimization_samples.jsonl"))
+    
+    # Fill in optimal distances from the local road network when one is configured
+    router = get_router()
+    if router is not None:
+        from routing import fill_route_distances
+        
+        routed_data = output_path / "route_optimization_routed.jsonl"
+        routing = fill_route_distances(
+            data, routed_data, router, overwrite=os.getenv("EVALUATION_ROAD_OVERWRITE", "0") == "1"
+        )
+        counts = router.stats()
+        print(f"🗺️  Road network: {routing['filled']:,} optimal distances filled, "
+              f"{routing['kept']:,} kept from the data, {routing['unresolved']:,} unresolved "
+              f"({counts['table']:,} from the place table, {counts['hub_row']:,} from hub rows, "
+              f"{counts['one_to_many']:,} from one-to-many searches, {counts['astar']:,} A* searches)")
+        data = str(routed_data)
+    
     # Initialize evaluators
     evaluators = {
         "route_optimality": RouteOptimalityEvaluator(max_deviation_percent=10.0)
@@ -219,70 +796,347 @@ def evaluate_route_optimization():
     }
     
     # Run evaluation
-    output_path = Path(os.getenv("EVALUATION_OUTPUT_PATH", "./evaluation_results"))
-    output_path.mkdir(parents=True, exist_ok=True)
-    
-    result = evaluate(
-        data="data/route_optimization_samples.jsonl",
+    result = run_evaluation(
+        data=data,
         evaluators=evaluators,
         evaluator_config=evaluator_config,
-        output_path=str(output_path / "route_optimization_evaluation")
+        output_path=str(output_path / "route_optimization_evaluation"),
+        suite="route_optimization",
+        watermark_fields=("order_id",)
+    )
+    
+    # Per-lane and per-route aggregates, streamed from the file in chunks
+    lane_report = write_route_lane_report(
+        data=data,
+        evaluator=evaluators["route_optimality"],
+        output_file=output_path / "route_optimization_lanes.json"
     )
     
     print("\n✅ Route Optimization Evaluation Complete!")
     print(f"📊 Results saved to: {output_path / 'route_optimization_evaluation'}")
+    if lane_report is not None:
+        print(f"🛣️  Lane aggregates saved to: {output_path / 'route_optimization_lanes.json'}")
+    if lane_report and "lane" in lane_report:
+        print("\n🚨 Worst Lanes (share over threshold):")
+        print("-" * 60)
+        for lane in lane_report["lane"][:5]:
+            origin, destination = lane["group"]
+            print(f"  {origin} → {destination}: {lane['over_threshold_share']:.1%} "
+                  f"(p95 deviation {lane['p95_deviation_percentage']}%, {lane['count']} orders)")
     print("\n📈 Aggregate Metrics:")
     print("-" * 60)
     
     # Display metrics
-    if hasattr(result, 'metrics'):
-        for metric_name, value in result.metrics.items():
-            if isinstance(value, (int, float)):
-                print(f"  {metric_name}: {value:.3f}")
-            else:
-                print(f"  {metric_name}: {value}")
+    print_metrics(result)
     
     return result
 
 
-def main():
+def write_route_lane_report(data, evaluator: RouteOptimalityEvaluator, output_file,
+                            chunk_rows: int = 50_000):
+    """
+    Aggregate route deviations per (origin, destination) lane and per route name.
+    
+    The file is read in chunks and only the distance and key columns are
+    kept, so memory grows with a handful of values per row rather than with
+    whole rows. A grouping is left out when its key columns never appear in
+    the data; without distance columns or any grouping no report is written.
+    
+    Args:
+        data: Path to the route optimization JSONL file
+        evaluator: Configured RouteOptimalityEvaluator (provides the threshold)
+        output_file: Where to write the JSON report
+        chunk_rows: Rows parsed at a time
+        
+    Returns:
+        Dictionary with "lane" and/or "route_name" aggregates, or None when
+        the data has none of the columns the report needs
+    """
+    groupings = {"lane": ("origin", "destination"), "route_name": ("route_name",)}
+    fields = ("suggested_route_distance_km", "optimal_route_distance_km", "origin", "destination", "route_name")
+    columns = {field: [] for field in fields}
+    seen = set()
+    for chunk in iter_jsonl_chunks(data, chunk_rows=chunk_rows):
+        for row in chunk:
+            seen.update(field for field in fields if row.get(field) is not None)
+        for field, values in columns.items():
+            values.extend(row.get(field) for row in chunk)
+    
+    available = {name: keys for name, keys in groupings.items() if seen.issuperset(keys)}
+    missing = {"suggested_route_distance_km", "optimal_route_distance_km"} - seen
+    if missing or not available:
+        absent = [field for field in fields if field not in seen]
+        print(f"⚠️  Lane report skipped: the data has no {', '.join(absent)} values")
+        return None
+    
+    report = evaluator.aggregate_by_group(
+        suggested_distance=np.array(columns["suggested_route_distance_km"], dtype=float),
+        optimal_distance=np.array(columns["optimal_route_distance_km"], dtype=float),
+        group_by={
+            name: tuple(columns[key] for key in keys) if len(keys) > 1 else columns[keys[0]]
+            for name, keys in available.items()
+        }
+    )
+    
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    
+    return report
+
+
+# Evaluation suites: (name, data file in EVALUATION_DATA_DIR, runner, needs LLM access)
+SUITES = [
+    ("customer_support", "customer_support_samples.jsonl", evaluate_customer_support, True),
+    ("pricing", "pricing_samples.jsonl", evaluate_pricing_system, True),
+    ("route_optimization", "route_optimization_samples.jsonl", evaluate_route_optimization, False),
+]
+
+
+def run_suites_parallel(suites, max_workers: int = 3):
+    """
+    Run independent evaluation suites at the same time.
+    
+    LLM-judged suites are I/O bound and run on threads driven by one shared
+    asyncio loop; code-only suites are CPU bound and run in a process pool.
+    Wall-clock time is close to the slowest suite rather than the sum.
+    
+    Args:
+        suites: List of (name, runner, needs LLM access) tuples
+        max_workers: Maximum number of suites running at once per pool
+        
+    Returns:
+        Dictionary mapping suite name to (result, seconds); failed suites map
+        to (exception, seconds)
+    """
+    telemetry = get_telemetry()
+    
+    async def run_all():
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=max_workers) as processes, \
+                ThreadPoolExecutor(max_workers=max_workers) as threads:
+            futures = [
+                loop.run_in_executor(threads, contextvars.copy_context().run, _timed_run, runner, name)
+                if needs_llm else
+                loop.run_in_executor(processes, _timed_run_in_process, runner, name,
+                                     telemetry.current_traceparent())
+                for name, runner, needs_llm in suites
+            ]
+            outcomes = await asyncio.gather(*futures, return_exceptions=True)
+        
+        results = {}
+        for (name, _, needs_llm), outcome in zip(suites, outcomes):
+            if isinstance(outcome, BaseException):
+                # The pool itself failed (e.g. a worker process died), so the
+                # suite's own time is unknown; record the time until then
+                results[name] = (outcome, time.perf_counter() - started)
+            elif needs_llm:
+                results[name] = outcome
+            else:
+                # Worker processes send back their evaluator statistics
+                result, seconds, stats = outcome
+                telemetry.merge(stats)
+                results[name] = (result, seconds)
+        return results
+    
+    return asyncio.run(run_all())
+
+
+def run_suites_serial(suites):
+    """
+    Run evaluation suites one after another.
+    
+    A failing suite does not stop the others; like `run_suites_parallel()`,
+    failed suites map to (exception, seconds).
+    """
+    return {name: _timed_run(runner, name) for name, runner, _ in suites}
+
+
+def _timed_run(runner, suite: str = None):
+    # Module-level so it can be sent to worker processes. A failure is
+    # returned in place of the result, with the time it took to fail.
+    started = time.perf_counter()
+    try:
+        with get_telemetry().span("evaluation.suite", suite=suite or runner.__name__):
+            outcome = runner()
+    except Exception as error:
+        outcome = error
+    finally:
+        seconds = time.perf_counter() - started
+    return outcome, seconds
+
+
+def _timed_run_in_process(runner, suite: str, traceparent: str = None):
+    # Suite spans in the worker join the run's trace through TRACEPARENT
+    if traceparent:
+        os.environ["TRACEPARENT"] = traceparent
+    telemetry = get_telemetry()
+    result, seconds = _timed_run(runner, suite)
+    telemetry.flush()
+    return result, seconds, telemetry.snapshot(reset=True)
+
+
+def print_telemetry(telemetry):
+    """
+    Display per-evaluator call counts, latencies, errors, retries and tokens.
+    """
+    rows = telemetry.summary_rows()
+    if not rows:
+        return
+    print("\n🔬 Evaluator Telemetry (slowest first):")
+    print("-" * 70)
+    for row in rows:
+        tokens = ""
+        if row["prompt_tokens"] or row["completion_tokens"]:
+            tokens = f", tokens {row['prompt_tokens']:,}+{row['completion_tokens']:,}"
+        print(f"  {row['evaluator']}/{row['operation']}: {row['calls']:,} calls, "
+              f"{row['total_seconds']:.2f}s total, p50 ≤{row['p50_ms'] or 0:g}ms, p95 ≤{row['p95_ms'] or 0:g}ms, "
+              f"{row['errors']} errors, {row['retries']} retries{tokens}")
+
+
+def main(argv=None):
     """
     Run all evaluations.
+    
+    Raises the error of the first failed suite after all suites have run.
     """
+    parser = argparse.ArgumentParser(description="Run the Nakl Logistics evaluation suites")
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("EVALUATION_WORKERS", "3")),
+        help="Number of suites to run at the same time (1 runs them one after another)"
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Only evaluate rows added since the last run and merge them into stored aggregates"
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="Continue interrupted runs from their checkpoints, skipping rows already evaluated"
+    )
+    parser.add_argument(
+        "--results-format", choices=RESULT_FORMATS,
+        default=os.getenv("EVALUATION_RESULTS_FORMAT", "jsonl"),
+        help="Format of the row-level results: jsonl, or typed columnar parquet/arrow (needs pyarrow)"
+    )
+    parser.add_argument(
+        "--sample-margin", type=float, default=None,
+        help="Judge LLM metrics on a stratified sample sized for this ±margin (score points) "
+             "instead of every row"
+    )
+    parser.add_argument(
+        "--sample-confidence", type=float, default=None,
+        help="Confidence level of the sampled LLM metrics' intervals (default 0.95)"
+    )
+    parser.add_argument(
+        "--pack-size", type=int, default=None,
+        help="Rows judged per LLM call by the customer service and pricing judges (default 1)"
+    )
+    parser.add_argument(
+        "--near-dup-threshold", type=float, default=None,
+        help="Reuse the judgement of an already-judged row at least this similar "
+             "(0-1, e.g. 0.9) in the customer service and pricing judges"
+    )
+    parser.add_argument(
+        "--road-graph", default=None, metavar="PATH",
+        help="Fill in optimal route distances from a local road network (.osm extract or CSV edge list)"
+    )
+    parser.add_argument(
+        "--sequential", action="store_true",
+        help="Judge LLM rows in random order and stop once the tracked metrics are settled"
+    )
+    parser.add_argument(
+        "--ci-width", type=float, default=None,
+        help="Sequential mode: stop once every tracked metric's confidence interval is this narrow"
+    )
+    parser.add_argument(
+        "--release-gate", action="append", default=[], metavar="METRIC=VALUE",
+        help="Sequential mode: stop once METRIC is confidently above or below VALUE (repeatable)"
+    )
+    args = parser.parse_args(argv)
+    
+    # Passed through the environment so suites running in worker processes see them
+    if args.incremental:
+        os.environ["EVALUATION_INCREMENTAL"] = "1"
+    if args.resume:
+        os.environ["EVALUATION_RESUME"] = "1"
+    os.environ["EVALUATION_RESULTS_FORMAT"] = args.results_format
+    if args.sample_margin is not None:
+        os.environ["EVALUATION_SAMPLE_MARGIN"] = str(args.sample_margin)
+    if args.sample_confidence is not None:
+        os.environ["EVALUATION_SAMPLE_CONFIDENCE"] = str(args.sample_confidence)
+    if args.pack_size is not None:
+        os.environ["EVALUATION_PACK_SIZE"] = str(args.pack_size)
+    if args.near_dup_threshold is not None:
+        if not 0 <= args.near_dup_threshold <= 1:
+            parser.error("--near-dup-threshold must be between 0 and 1")
+        os.environ["EVALUATION_NEAR_DUP_THRESHOLD"] = str(args.near_dup_threshold)
+    if args.road_graph is not None:
+        if not Path(args.road_graph).exists():
+            parser.error(f"road network not found: {args.road_graph}")
+        os.environ["EVALUATION_ROAD_GRAPH"] = args.road_graph
+    if args.sequential:
+        os.environ["EVALUATION_SEQUENTIAL"] = "1"
+    if args.ci_width is not None:
+        os.environ["EVALUATION_SEQUENTIAL_CI_WIDTH"] = str(args.ci_width)
+    if args.release_gate:
+        try:
+            parse_release_gates(",".join(args.release_gate))
+        except ValueError as error:
+            parser.error(str(error))
+        os.environ["EVALUATION_RELEASE_GATES"] = ",".join(args.release_gate)
+    
     print("\n" + "="*70)
     print("  NAKL LOGISTICS - COMPREHENSIVE EVALUATION FRAMEWORK")
     print("="*70)
     
-    # Check environment
-    if not os.getenv("AZURE_OPENAI_ENDPOINT") and not os.getenv("OPENAI_API_KEY"):
+    # Check environment (only LLM-judged suites need API keys)
+    has_llm_access = bool(os.getenv("AZURE_OPENAI_ENDPOINT") or os.getenv("OPENAI_API_KEY"))
+    if not has_llm_access:
         print("\n⚠️  Warning: No API keys configured!")
         print("Please set up your environment variables in .env file")
         print("See .env.example for required variables")
-        return
-    
-    results = {}
+        print("Running code-only evaluations")
     
     # Run evaluations if data files exist
-    if Path("data/customer_support_samples.jsonl").exists():
-        results["customer_support"] = evaluate_customer_support()
-    else:
-        print("\n⚠️  Skipping customer support evaluation (data file not found)")
+    suites = []
+    for name, data_file, runner, needs_llm in SUITES:
+        label = name.replace("_", " ")
+        if needs_llm and not has_llm_access:
+            print(f"\n⚠️  Skipping {label} evaluation (no API keys)")
+        elif not get_data_path(data_file).exists():
+            print(f"\n⚠️  Skipping {label} evaluation (data file not found)")
+        else:
+            suites.append((name, runner, needs_llm))
     
-    if Path("data/pricing_samples.jsonl").exists():
-        results["pricing"] = evaluate_pricing_system()
-    else:
-        print("\n⚠️  Skipping pricing evaluation (data file not found)")
+    telemetry = get_telemetry()
+    started = time.perf_counter()
+    with telemetry.span("evaluation.run", suites=",".join(name for name, _, _ in suites)):
+        if args.workers > 1 and len(suites) > 1:
+            outcomes = run_suites_parallel(suites, max_workers=args.workers)
+        else:
+            outcomes = run_suites_serial(suites)
+    wall_clock = time.perf_counter() - started
     
-    if Path("data/route_optimization_samples.jsonl").exists():
-        results["route_optimization"] = evaluate_route_optimization()
-    else:
-        print("\n⚠️  Skipping route optimization evaluation (data file not found)")
+    results = {
+        name: result for name, (result, _) in outcomes.items()
+        if not isinstance(result, BaseException)
+    }
     
     # Summary
     print("\n" + "="*70)
     print("  EVALUATION SUMMARY")
     print("="*70)
-    print(f"\n✅ Completed {len(results)} evaluation(s)")
+    print(f"\n✅ Completed {len(results)} evaluation(s) in {wall_clock:.1f}s")
+    for name, (result, seconds) in outcomes.items():
+        if isinstance(result, BaseException):
+            print(f"   ❌ {name}: failed after {seconds:.1f}s ({result})")
+        else:
+            print(f"   ✅ {name}: {seconds:.1f}s")
+    print_telemetry(telemetry)
+    summary_path = telemetry.write_summary()
+    telemetry.shutdown()
+    if summary_path is not None:
+        print(f"\n📡 Telemetry summary: {summary_path}")
     print(f"📁 Results directory: {os.getenv('EVALUATION_OUTPUT_PATH', './evaluation_results')}")
     print("\n💡 Tip: Review the detailed results in the output directory")
     print("   Each evaluation includes:")
@@ -290,6 +1144,14 @@ def main():
     print("   - Aggregate metrics and statistics")
     print("   - Visualizations and charts")
     print("\n" + "="*70 + "\n")
+    
+    # A failed suite fails the run (non-zero exit status) once every suite
+    # has finished and the summary is written, in serial and parallel runs
+    failures = [result for result, _ in outcomes.values() if isinstance(result, BaseException)]
+    if failures:
+        raise failures[0]
+    
+    return results
 
 
 if __name__ == "__main__":
@@ -0,0 +1,56 @@
+"""
+Arabic Text Normalization
+=========================
+
+Canonical form of Arabic support text, so that spellings which differ only
+in diacritics, tatweel, letter variants, digit scripts or whitespace compare
+equal.
+"""
+
+import re
+import unicodedata
+
+# Harakat, tanween, shadda, sukun, superscript alef and Quranic annotation marks
+ARABIC_DIACRITICS = (
+    [chr(code) for code in range(0x0610, 0x061B)]
+    + [chr(code) for code in range(0x064B, 0x0660)]
+    + ["ٰ"]
+    + [chr(code) for code in range(0x06D6, 0x06EE)]
+)
+TATWEEL = "ـ"
+
+_TRANSLATION = str.maketrans({
+    **{mark: None for mark in ARABIC_DIACRITICS},
+    TATWEEL: None,
+    # Alef with hamza above/below, madda and wasla -> bare alef
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    # Alef maqsura -> ya, ta marbuta -> ha
+    "ى": "ي", "ة": "ه",
+    # Arabic-Indic and Eastern Arabic-Indic digits -> ASCII digits
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},
+    **{chr(0x06F0 + digit): str(digit) for digit in range(10)},
+    # Arabic decimal and thousands separators, Arabic comma
+    "٫": ".", "٬": ",", "،": ",",
+})
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_arabic(text):
+    """
+    Normalize Arabic text for matching.
+    
+    Applies NFKC (folding presentation forms), removes diacritics and
+    tatweel, unifies alef, ya and ta marbuta variants, converts Arabic-Indic
+    digits and separators to ASCII, case-folds Latin letters and collapses
+    whitespace.
+    
+    Args:
+        text: Text to normalize (None is treated as empty)
+        
+    Returns:
+        Normalized text
+    """
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKC", str(text)).translate(_TRANSLATION).casefold()
+    return _WHITESPACE.sub(" ", text).strip()
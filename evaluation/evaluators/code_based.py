@@ -6,21 +6,42 @@ These evaluators use deterministic logic to evaluate specific aspects
 of the system's responses.
 """
 
+import math
+import threading
+
+import numpy as np
+import pandas as pd
+
+from evaluators.sketches import QuantileSketch
+
+
 class ResponseTimeEvaluator:
     """
     Evaluates if API response time is within acceptable limits.
     
     Business Rule: Response time should be < 2 seconds for good UX
+    
+    Every evaluated response time is also added to a fixed-memory quantile
+    sketch, so tail latencies (p50/p95/p99/p99.9) can be reported next to
+    the threshold pass rate for streams of any size.
     """
     
-    def __init__(self, max_response_time: float = 2.0):
+    PERCENTILES = (50, 95, 99, 99.9)
+    # `aggregate()` keys holding counts, which add up across runs
+    COUNT_METRICS = ("rows_evaluated",)
+    
+    def __init__(self, max_response_time: float = 2.0, relative_accuracy: float = 0.01):
         """
         Initialize the evaluator.
         
         Args:
             max_response_time: Maximum acceptable response time in seconds
+            relative_accuracy: Relative error bound of reported latency percentiles
         """
         self.max_response_time = max_response_time
+        self.latency_sketch = QuantileSketch(relative_accuracy=relative_accuracy)
+        self._lock = threading.Lock()
+        self._acceptable_count = 0
     
     def __call__(self, *, response_time: float, **kwargs):
         """
@@ -32,15 +53,133 @@ class ResponseTimeEvaluator:
         Returns:
             Dictionary with evaluation results
         """
-        is_acceptable = response_time <= self.max_response_time
+        # Non-finite times (NaN for missing, ±inf) are not measurements: they
+        # score 0 and are left out of the pass rate and percentiles alike
+        is_acceptable = bool(math.isfinite(response_time) and response_time <= self.max_response_time)
         score = 1.0 if is_acceptable else 0.0
         
+        self.latency_sketch.add(response_time)
+        if is_acceptable:
+            with self._lock:
+                self._acceptable_count += 1
+        
         return {
             "response_time_score": score,
             "response_time_ms": response_time * 1000,
             "is_acceptable": is_acceptable,
             "threshold_ms": self.max_response_time * 1000
         }
+    
+    def evaluate_batch(self, *, response_time, **kwargs):
+        """
+        Evaluate response times for a whole column at once.
+        
+        Args:
+            response_time: Array-like of response times in seconds
+            
+        Returns:
+            Dictionary of arrays (one entry per row) with evaluation results
+        """
+        response_time = np.atleast_1d(np.asarray(response_time, dtype=np.float64))
+        finite = np.isfinite(response_time)
+        is_acceptable = finite & (response_time <= self.max_response_time)
+        
+        self.latency_sketch.add_batch(response_time[finite])
+        with self._lock:
+            self._acceptable_count += int(is_acceptable.sum())
+        
+        return {
+            "response_time_score": is_acceptable.astype(np.float64),
+            "response_time_ms": response_time * 1000,
+            "is_acceptable": is_acceptable,
+            "threshold_ms": np.full(response_time.shape, self.max_response_time * 1000)
+        }
+    
+    def update_from_results(self, results: dict):
+        """
+        Accumulate statistics from row results made elsewhere (e.g. the SDK's
+        row outputs, which may come from evaluator copies in other processes).
+        
+        Args:
+            results: Result columns keyed like the `__call__()` result, one
+                entry per row (None for rows whose evaluation failed)
+        """
+        response_time_ms = np.asarray(
+            [np.nan if value is None else value for value in results.get("response_time_ms", ())],
+            dtype=np.float64
+        )
+        finite = np.isfinite(response_time_ms)
+        self.latency_sketch.add_batch(response_time_ms[finite] / 1000)
+        acceptable = sum(
+            value == 1 for value, measured in zip(results.get("is_acceptable", ()), finite) if measured
+        )
+        with self._lock:
+            self._acceptable_count += int(acceptable)
+    
+    def aggregate(self):
+        """
+        Latency percentiles and pass rate accumulated since the last `reset()`.
+        
+        Returns:
+            Dictionary with pass rate and p50/p95/p99/p99.9 latency in milliseconds
+        """
+        sketch = self.latency_sketch
+        result = {
+            "rows_evaluated": sketch.count,
+            "pass_rate": self._acceptable_count / sketch.count if sketch.count else None,
+            "mean_ms": sketch.sum / sketch.count * 1000 if sketch.count else None,
+            "max_ms": sketch.max * 1000 if sketch.count else None
+        }
+        for p in self.PERCENTILES:
+            value = sketch.quantile(p / 100)
+            result[f"p{p:g}_ms".replace(".", "_")] = value * 1000 if value is not None else None
+        return result
+    
+    def merge(self, other: "ResponseTimeEvaluator"):
+        """
+        Merge latency statistics from another evaluator (e.g. another shard).
+        """
+        self.latency_sketch.merge(other.latency_sketch)
+        with self._lock:
+            self._acceptable_count += other._acceptable_count
+    
+    def state_dict(self):
+        """
+        Serialize accumulated statistics so they can be merged in a later run.
+        """
+        return {
+            "max_response_time": self.max_response_time,
+            "acceptable_count": self._acceptable_count,
+            "latency_sketch": self.latency_sketch.to_dict()
+        }
+    
+    def load_state_dict(self, state: dict):
+        """
+        Merge statistics previously saved with `state_dict()`.
+        """
+        if state["max_response_time"] != self.max_response_time:
+            raise ValueError("Cannot merge statistics recorded with a different threshold")
+        self.latency_sketch.merge(QuantileSketch.from_dict(state["latency_sketch"]))
+        with self._lock:
+            self._acceptable_count += state["acceptable_count"]
+    
+    def reset(self):
+        """
+        Clear accumulated statistics.
+        """
+        self.latency_sketch.clear()
+        with self._lock:
+            self._acceptable_count = 0
+    
+    def __getstate__(self):
+        # Picklable for evaluation in worker processes; the lock is recreated there
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
 
 
 class PriceAccuracyEvaluator:
@@ -93,6 +232,53 @@ class PriceAccuracyEvaluator:
             "is_accurate": is_accurate,
             "margin_threshold": self.margin_percent
         }
+    
+    def evaluate_batch(self, *, calculated_price, ground_truth_price, **kwargs):
+        """
+        Evaluate price accuracy for whole columns at once.
+        
+        Gives the same results as calling the evaluator row by row, but works
+        on NumPy arrays / pandas Series. Rows with a zero ground truth price
+        are handled through a mask instead of an early return.
+        
+        Args:
+            calculated_price: Array-like of prices calculated by the system
+            ground_truth_price: Array-like of actual/correct prices
+            
+        Returns:
+            Dictionary of arrays (one entry per row) with evaluation results
+        """
+        calculated = np.atleast_1d(np.asarray(calculated_price, dtype=np.float64))
+        ground_truth = np.atleast_1d(np.asarray(ground_truth_price, dtype=np.float64))
+        if calculated.shape != ground_truth.shape:
+            raise ValueError(
+                f"calculated_price and ground_truth_price must have the same length "
+                f"({calculated.size} != {ground_truth.size})"
+            )
+        
+        is_zero = ground_truth == 0
+        safe_ground_truth = np.where(is_zero, 1.0, ground_truth)
+        
+        error_percentage = np.abs(calculated - ground_truth) / safe_ground_truth * 100
+        error_percentage = np.where(is_zero, 100.0, error_percentage)
+        is_accurate = (error_percentage <= self.margin_percent) & ~is_zero
+        
+        # Same linear decay as the scalar path (fmax scores NaN prices 0.0,
+        # like max() does); zero ground truth scores 0.0
+        score = np.fmax(0.0, 1.0 - error_percentage / 100.0)
+        score[is_zero] = 0.0
+        
+        error_message = np.where(is_zero, "Ground truth price is zero", None)
+        
+        return {
+            "price_accuracy_score": score,
+            "calculated_price": calculated,
+            "ground_truth_price": ground_truth,
+            "error_percentage": np.round(error_percentage, 2),
+            "is_accurate": is_accurate,
+            "margin_threshold": np.full(calculated.shape, self.margin_percent),
+            "error_message": error_message
+        }
 
 
 class RouteOptimalityEvaluator:
@@ -148,6 +334,160 @@ class RouteOptimalityEvaluator:
             "is_optimal": is_optimal,
             "threshold_percentage": self.max_deviation_percent
         }
+    
+    def evaluate_batch(self, *, suggested_distance, optimal_distance, **kwargs):
+        """
+        Evaluate route optimality for whole columns at once.
+        
+        Gives the same results as calling the evaluator row by row, with
+        zero optimal distances handled through a mask.
+        
+        Args:
+            suggested_distance: Array-like of suggested route distances in km
+            optimal_distance: Array-like of optimal route distances in km
+            
+        Returns:
+            Dictionary of arrays (one entry per row) with evaluation results
+        """
+        suggested = np.atleast_1d(np.asarray(suggested_distance, dtype=np.float64))
+        optimal = np.atleast_1d(np.asarray(optimal_distance, dtype=np.float64))
+        if suggested.shape != optimal.shape:
+            raise ValueError(
+                f"suggested_distance and optimal_distance must have the same length "
+                f"({suggested.size} != {optimal.size})"
+            )
+        
+        is_zero = optimal == 0
+        safe_optimal = np.where(is_zero, 1.0, optimal)
+        
+        deviation = suggested - optimal
+        deviation_percentage = np.where(is_zero, 100.0, deviation / safe_optimal * 100)
+        is_optimal = (deviation_percentage <= self.max_deviation_percent) & ~is_zero
+        
+        # Suggested routes that are shorter or equal score 1.0; fmax scores
+        # NaN distances 0.0, like max() does
+        score = np.where(
+            deviation <= 0,
+            1.0,
+            np.fmax(0.0, 1.0 - deviation_percentage / 100.0)
+        )
+        score[is_zero] = 0.0
+        
+        return {
+            "route_optimality_score": score,
+            "suggested_distance_km": suggested,
+            "optimal_distance_km": optimal,
+            "deviation_percentage": np.round(deviation_percentage, 2),
+            "is_optimal": is_optimal,
+            "threshold_percentage": np.full(suggested.shape, self.max_deviation_percent),
+            "error_message": np.where(is_zero, "Optimal distance is zero", None)
+        }
+    
+    def aggregate_by_group(self, *, suggested_distance, optimal_distance, group_by: dict,
+                           percentiles=(50, 90, 95, 99)):
+        """
+        Score a whole route file and aggregate deviations per group.
+        
+        Every grouping is computed with one hash-aggregation pass (keys are
+        factorized once, then all groups are reduced together), so a file with
+        thousands of lanes costs the same as one with a handful.
+        
+        Args:
+            suggested_distance: Array-like of suggested route distances in km
+            optimal_distance: Array-like of optimal route distances in km
+            group_by: Mapping of grouping name to a key column or a tuple of key
+                columns, e.g. {"lane": (origins, destinations), "route_name": names}
+            percentiles: Deviation percentiles to report for every group
+            
+        Returns:
+            Dictionary mapping each grouping name to a list of per-group results,
+            sorted by share of routes over the deviation threshold (worst first)
+        """
+        results = self.evaluate_batch(
+            suggested_distance=suggested_distance,
+            optimal_distance=optimal_distance
+        )
+        deviation = results["deviation_percentage"]
+        over_threshold = ~results["is_optimal"]
+        
+        aggregates = {}
+        for name, keys in group_by.items():
+            if not isinstance(keys, tuple):
+                keys = (keys,)
+            codes, uniques = _factorize_keys(keys, len(deviation))
+            aggregates[name] = _grouped_deviation_stats(
+                codes, uniques, deviation, over_threshold, percentiles
+            )
+        return aggregates
+
+
+def _factorize_keys(keys, n_rows: int):
+    """
+    Map one or more key columns to dense integer group codes.
+    
+    Returns:
+        Tuple of (codes per row, list of key tuples per group code)
+    """
+    combined = np.zeros(n_rows, dtype=np.int64)
+    key_uniques = []
+    for key in keys:
+        key_codes, uniques = pd.factorize(np.asarray(key, dtype=object), use_na_sentinel=False)
+        if len(key_codes) != n_rows:
+            raise ValueError(f"Group key has {len(key_codes)} rows, expected {n_rows}")
+        combined = combined * len(uniques) + key_codes
+        key_uniques.append(uniques)
+    
+    codes, combined_uniques = pd.factorize(combined)
+    
+    # Decode the mixed-radix group codes back to their key values
+    group_keys = []
+    for value in combined_uniques:
+        parts = []
+        for uniques in reversed(key_uniques):
+            value, index = divmod(int(value), len(uniques))
+            part = uniques[index]
+            parts.append(None if pd.isna(part) else part)
+        group_keys.append(tuple(reversed(parts)))
+    return codes, group_keys
+
+
+def _grouped_deviation_stats(codes, group_keys, deviation, over_threshold, percentiles):
+    """
+    Reduce deviations to per-group counts, means, percentiles and threshold share.
+    """
+    n_groups = len(group_keys)
+    counts = np.bincount(codes, minlength=n_groups)
+    mean_deviation = np.bincount(codes, weights=deviation, minlength=n_groups) / counts
+    over_share = np.bincount(codes, weights=over_threshold, minlength=n_groups) / counts
+    
+    # Sort once by (group, deviation); each group is then a contiguous run
+    # and every percentile is a linear interpolation inside that run.
+    sorted_deviation = deviation[np.lexsort((deviation, codes))]
+    starts = np.cumsum(counts) - counts
+    group_percentiles = {}
+    for q in percentiles:
+        position = starts + (counts - 1) * (q / 100.0)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.ceil(position).astype(np.int64)
+        fraction = position - lower
+        group_percentiles[q] = (
+            sorted_deviation[lower] * (1 - fraction) + sorted_deviation[upper] * fraction
+        )
+    
+    stats = []
+    for i, key in enumerate(group_keys):
+        row = {
+            "group": list(key),
+            "count": int(counts[i]),
+            "mean_deviation_percentage": round(float(mean_deviation[i]), 2),
+        }
+        for q in percentiles:
+            row[f"p{q:g}_deviation_percentage"] = round(float(group_percentiles[q][i]), 2)
+        row["over_threshold_share"] = round(float(over_share[i]), 4)
+        stats.append(row)
+    
+    stats.sort(key=lambda row: (-row["over_threshold_share"], -row["mean_deviation_percentage"]))
+    return stats
 
 
 class DataCompletenessEvaluator:
@@ -155,16 +495,29 @@ class DataCompletenessEvaluator:
     Evaluates if required fields are present in the response.
     
     Business Rule: All required fields must be present
+    
+    Field specs are compiled once. Besides flat keys they support dotted
+    nested paths ("customer.id"), list indexes ("items[0].sku") and list
+    wildcards ("items[*].sku", every element must have the field).
     """
     
+    # Bit i of a presence bitmask is set when required field i is present
+    MAX_BITMASK_FIELDS = 64
+    NON_METRIC_OUTPUTS = ("presence_bitmask",)
+    # `aggregate()` keys holding counts, which add up across runs
+    COUNT_METRICS = ("rows_evaluated", "missing_counts")
+    
     def __init__(self, required_fields: list[str]):
         """
         Initialize the evaluator.
         
         Args:
-            required_fields: List of required field names
+            required_fields: List of required field names or nested field paths
         """
         self.required_fields = required_fields
+        self._checks = [_compile_field_path(field) for field in required_fields]
+        self._lock = threading.Lock()
+        self.reset()
     
     def __call__(self, *, response_data: dict, **kwargs):
         """
@@ -176,22 +529,230 @@ class DataCompletenessEvaluator:
         Returns:
             Dictionary with evaluation results
         """
-        missing_fields = []
-        present_fields = []
+        missing_indexes = [
+            i for i, check in enumerate(self._checks) if not check(response_data)
+        ]
+        missing_fields = [self.required_fields[i] for i in missing_indexes]
+        present_count = len(self.required_fields) - len(missing_fields)
         
-        for field in self.required_fields:
-            if field in response_data and response_data[field] is not None:
-                present_fields.append(field)
-            else:
-                missing_fields.append(field)
+        with self._lock:
+            self._rows_evaluated += 1
+            self._missing_counts[missing_indexes] += 1
         
-        completeness_ratio = len(present_fields) / len(self.required_fields)
+        completeness_ratio = present_count / len(self.required_fields)
         
         return {
             "data_completeness_score": completeness_ratio,
             "total_required_fields": len(self.required_fields),
-            "present_fields_count": len(present_fields),
+            "present_fields_count": present_count,
             "missing_fields_count": len(missing_fields),
             "missing_fields": missing_fields,
             "is_complete": len(missing_fields) == 0
         }
+    
+    def evaluate_batch(self, *, response_data, **kwargs):
+        """
+        Evaluate data completeness for a chunk of rows.
+        
+        Presence is returned as one bitmask per row (bit i set when required
+        field i is present); per-field missing counts are accumulated on the
+        evaluator and reported by `aggregate()`.
+        
+        Args:
+            response_data: Sequence of row dictionaries
+            
+        Returns:
+            Dictionary of arrays (one entry per row) with evaluation results
+        """
+        n_fields = len(self.required_fields)
+        if n_fields > self.MAX_BITMASK_FIELDS:
+            raise ValueError(
+                f"Batch mode supports at most {self.MAX_BITMASK_FIELDS} required fields, "
+                f"got {n_fields}"
+            )
+        
+        bits = [(1 << i, check) for i, check in enumerate(self._checks)]
+        masks = np.fromiter(
+            (sum(bit for bit, check in bits if check(row)) for row in response_data),
+            dtype=np.uint64
+        )
+        
+        # Expand bitmasks to a (rows, fields) presence matrix for counting
+        presence = np.unpackbits(
+            masks.astype("<u8").view(np.uint8).reshape(-1, 8), axis=1, bitorder="little"
+        )[:, :n_fields].astype(bool)
+        present_count = presence.sum(axis=1)
+        
+        with self._lock:
+            self._rows_evaluated += len(masks)
+            self._missing_counts += len(masks) - presence.sum(axis=0)
+        
+        full_mask = (1 << n_fields) - 1
+        missing_fields = [
+            [] if mask == full_mask else
+            [field for i, field in enumerate(self.required_fields) if not (mask >> i) & 1]
+            for mask in masks.tolist()
+        ]
+        
+        return {
+            "data_completeness_score": present_count / n_fields,
+            "total_required_fields": np.full(len(masks), n_fields),
+            "present_fields_count": present_count,
+            "missing_fields_count": n_fields - present_count,
+            "missing_fields": missing_fields,
+            "is_complete": present_count == n_fields,
+            "presence_bitmask": masks
+        }
+    
+    def update_from_results(self, results: dict):
+        """
+        Accumulate statistics from row results made elsewhere (e.g. the SDK's
+        row outputs, which may come from evaluator copies in other processes).
+        
+        Args:
+            results: Result columns keyed like the `__call__()` result, one
+                entry per row (None for rows whose evaluation failed)
+        """
+        indexes = {field: i for i, field in enumerate(self.required_fields)}
+        rows = 0
+        missing_counts = np.zeros(len(self.required_fields), dtype=np.int64)
+        for missing_fields in results.get("missing_fields", ()):
+            if not isinstance(missing_fields, (list, tuple)):
+                continue
+            rows += 1
+            for field in missing_fields:
+                if field in indexes:
+                    missing_counts[indexes[field]] += 1
+        
+        with self._lock:
+            self._rows_evaluated += rows
+            self._missing_counts += missing_counts
+    
+    def scan(self, rows, chunk_size: int = 100_000):
+        """
+        Evaluate an iterable of rows chunk by chunk.
+        
+        Only one chunk is held in memory at a time, so datasets of any size can
+        be scanned; call `aggregate()` afterwards for dataset-wide counts.
+        
+        Args:
+            rows: Iterable of row dictionaries (e.g. a streaming JSONL reader)
+            chunk_size: Number of rows evaluated per batch
+            
+        Yields:
+            Batch results for each chunk, as returned by `evaluate_batch()`
+        """
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield self.evaluate_batch(response_data=chunk)
+                chunk = []
+        if chunk:
+            yield self.evaluate_batch(response_data=chunk)
+    
+    def aggregate(self):
+        """
+        Dataset-wide completeness statistics accumulated since the last `reset()`.
+        
+        Returns:
+            Dictionary with row count and missing count per required field
+        """
+        return {
+            "rows_evaluated": self._rows_evaluated,
+            "missing_counts": dict(zip(self.required_fields, self._missing_counts.tolist()))
+        }
+    
+    def state_dict(self):
+        """
+        Serialize accumulated statistics so they can be merged in a later run.
+        """
+        return {
+            "required_fields": self.required_fields,
+            "rows_evaluated": self._rows_evaluated,
+            "missing_counts": self._missing_counts.tolist()
+        }
+    
+    def load_state_dict(self, state: dict):
+        """
+        Merge statistics previously saved with `state_dict()`.
+        """
+        if state["required_fields"] != self.required_fields:
+            raise ValueError("Cannot merge statistics recorded for different required fields")
+        with self._lock:
+            self._rows_evaluated += state["rows_evaluated"]
+            self._missing_counts += np.asarray(state["missing_counts"], dtype=np.int64)
+    
+    def reset(self):
+        """
+        Clear accumulated statistics.
+        """
+        self._rows_evaluated = 0
+        self._missing_counts = np.zeros(len(self.required_fields), dtype=np.int64)
+    
+    def __getstate__(self):
+        # Picklable for evaluation in worker processes; the lock and the
+        # compiled field checks are recreated there
+        state = self.__dict__.copy()
+        del state["_lock"], state["_checks"]
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._checks = [_compile_field_path(field) for field in self.required_fields]
+        self._lock = threading.Lock()
+
+
+def _compile_field_path(path: str):
+    """
+    Compile a required-field spec into a presence check.
+    
+    Args:
+        path: Field spec such as "agent_id", "customer.id" or "items[*].sku"
+        
+    Returns:
+        Function taking a row and returning True when the field is present
+    """
+    steps = []
+    for part in path.replace("[", ".[").split("."):
+        if part == "[*]" or part == "*":
+            steps.append(_WILDCARD)
+        elif part.startswith("[") and part.endswith("]"):
+            steps.append(int(part[1:-1]))
+        elif part:
+            steps.append(part)
+    
+    if len(steps) == 1 and isinstance(steps[0], str):
+        key = steps[0]
+        return lambda row: row.get(key) is not None
+    
+    def resolve(value, index):
+        if index == len(steps):
+            return value is not None
+        step = steps[index]
+        if step is _WILDCARD:
+            return (
+                isinstance(value, list) and len(value) > 0
+                and all(resolve(item, index + 1) for item in value)
+            )
+        if isinstance(step, int):
+            return (
+                isinstance(value, list) and -len(value) <= step < len(value)
+                and resolve(value[step], index + 1)
+            )
+        return isinstance(value, dict) and resolve(value.get(step), index + 1)
+    
+    # A flat key that happens to contain dots still counts as present
+    return lambda row: row.get(path) is not None or resolve(row, 0)
+
+
+_WILDCARD = object()
+
+
+# Evaluators without LLM calls; suites made only of these can skip the Azure SDK
+DETERMINISTIC_EVALUATORS = (
+    ResponseTimeEvaluator,
+    PriceAccuracyEvaluator,
+    RouteOptimalityEvaluator,
+    DataCompletenessEvaluator
+)
@@ -0,0 +1,181 @@
+"""
+LLM Judgement Cache
+===================
+
+Persistent, content-addressed cache for prompt-based evaluators, so an
+unchanged (prompty, model, inputs) combination is only judged once.
+"""
+
+import hashlib
+import json
+import time
+
+from evaluators import registry
+from evaluators.sqlite_store import SQLiteStore
+
+
+class JudgementCache(SQLiteStore):
+    """
+    SQLite-backed cache of raw LLM judge responses.
+    
+    Entries are keyed by a hash of the prompty file content, the model
+    deployment, any parameter overrides and the evaluator inputs, so editing
+    the prompt or switching models naturally invalidates old judgements.
+    The database uses WAL mode with a busy timeout, so several worker
+    processes (and threads) can read and write it concurrently.
+    """
+    
+    def __init__(self, path: str = ".cache/llm_judgements.sqlite",
+                 max_entries: int = 1_000_000, max_age_seconds: float = 30 * 24 * 3600,
+                 evict_every: int = 1000):
+        """
+        Initialize the cache.
+        
+        Args:
+            path: SQLite database file (created if missing)
+            max_entries: Maximum number of cached judgements; the least recently
+                used entries are evicted beyond this
+            max_age_seconds: Judgements older than this are treated as misses
+                and evicted (None disables age-based eviction)
+            evict_every: Run eviction after this many writes
+        """
+        super().__init__(path)
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.evict_every = evict_every
+        
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS judgements ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS judgements_accessed_at ON judgements (accessed_at)"
+            )
+    
+    @staticmethod
+    def make_key(prompty_source: str, model_config, inputs: dict, parameters: dict = None):
+        """
+        Build the content-addressed key of a judgement.
+        
+        Args:
+            prompty_source: Path of the prompty file (its content is hashed)
+            model_config: Model configuration used for the call
+            inputs: Evaluator inputs passed to the prompty flow
+            parameters: Optional model parameter overrides
+            
+        Returns:
+            Hex digest identifying the judgement
+        """
+        prompty_hash = registry.get_prompty(prompty_source).digest
+        config = dict(model_config or {})
+        payload = {
+            "prompty": prompty_hash,
+            "model": {
+                key: config.get(key)
+                for key in ("type", "azure_endpoint", "azure_deployment", "api_version",
+                            "base_url", "model")
+            },
+            "parameters": parameters or {},
+            "inputs": inputs
+        }
+        encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+    
+    def get(self, key: str, *fallback_keys: str):
+        """
+        Look up a cached judgement.
+        
+        Args:
+            key: Key of the judgement
+            fallback_keys: Keys tried in order when `key` has no live entry;
+                the whole lookup counts as a single hit or miss
+                
+        Returns:
+            The cached raw LLM response, or None on a miss
+        """
+        now = time.time()
+        conn = self._connection()
+        for candidate in (key, *fallback_keys):
+            row = conn.execute(
+                "SELECT value, created_at FROM judgements WHERE key = ?", (candidate,)
+            ).fetchone()
+            if row is not None and not self._is_expired(row[1], now):
+                break
+        else:
+            with self._lock:
+                self.misses += 1
+            return None
+        
+        with conn:
+            conn.execute("UPDATE judgements SET accessed_at = ? WHERE key = ?", (now, candidate))
+        with self._lock:
+            self.hits += 1
+        return row[0]
+    
+    def put(self, key: str, value: str):
+        """
+        Store a raw LLM response.
+        """
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO judgements (key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+        
+        with self._lock:
+            self._writes += 1
+            should_evict = self._writes % self.evict_every == 0
+        if should_evict:
+            self.evict()
+    
+    def evict(self):
+        """
+        Remove expired entries and trim the cache to `max_entries` (LRU).
+        
+        Returns:
+            Number of entries removed
+        """
+        conn = self._connection()
+        removed = 0
+        with conn:
+            if self.max_age_seconds is not None:
+                removed += conn.execute(
+                    "DELETE FROM judgements WHERE created_at < ?",
+                    (time.time() - self.max_age_seconds,)
+                ).rowcount
+            
+            (count,) = conn.execute("SELECT COUNT(*) FROM judgements").fetchone()
+            if count > self.max_entries:
+                removed += conn.execute(
+                    "DELETE FROM judgements WHERE key IN ("
+                    " SELECT key FROM judgements ORDER BY accessed_at LIMIT ?)",
+                    (count - self.max_entries,)
+                ).rowcount
+        return removed
+    
+    def stats(self):
+        """
+        Hit/miss counters of this process and the current cache size.
+        """
+        (entries,) = self._connection().execute("SELECT COUNT(*) FROM judgements").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries
+        }
+    
+    def _is_expired(self, created_at: float, now: float):
+        return self.max_age_seconds is not None and now - created_at > self.max_age_seconds
@@ -0,0 +1,331 @@
+"""
+Near-Duplicate Judgement Reuse
+==============================
+
+Persistent MinHash/LSH index over character shingles of normalized support
+text. Template answers that differ only in order numbers, prices, URLs or
+small edits can reuse a judgement made for an earlier, similar pair instead
+of calling the LLM again. Judges that rate a masked value itself (the
+pricing judge and its prices) pin it, so only rows quoting the same value match.
+"""
+
+import hashlib
+import json
+import re
+import time
+import zlib
+
+import numpy as np
+
+from evaluators.arabic_text import normalize_arabic
+from evaluators.llm_cache import JudgementCache
+from evaluators.sqlite_store import SQLiteStore
+
+DEFAULT_THRESHOLD = 0.9
+SHINGLE_SIZE = 5
+# 16 bands of 8 rows: pairs with a Jaccard similarity of 0.8 become candidates
+# 99.8% of the time, pairs at 0.5 only 6% of the time
+DEFAULT_BANDS = 16
+DEFAULT_ROWS = 8
+MAX_CANDIDATES = 64
+
+# Applied after normalize_arabic(), so digits are ASCII and Latin text is lowercase
+URL = re.compile(r"(?:https?://|www\.)\S+")
+ORDER_NUMBER = re.compile(r"\b[a-z]{2,4}-\d{2,4}-\d+\b")
+PRICE = re.compile(
+    r"\d[\d,]*(?:\.\d+)?\s*(?:جنيه(?: مصري)?|ج\.?م|egp|le\b|£)"
+    r"|(?:egp|£)\s*\d[\d,]*(?:\.\d+)?"
+)
+_WHITESPACE = re.compile(r"\s+")
+
+_MASKS = ((URL, " <url> "), (ORDER_NUMBER, "<order>"), (PRICE, "<price>"))
+MASK_KINDS = {"url": URL, "order": ORDER_NUMBER, "price": PRICE}
+
+
+def mask_text(text):
+    """
+    Normalize Arabic text and replace URLs, order numbers and prices with placeholders.
+    
+    Args:
+        text: Text to mask (None is treated as empty)
+        
+    Returns:
+        Normalized text with "<url>", "<order>" and "<price>" placeholders
+    """
+    text = normalize_arabic(text)
+    for pattern, placeholder in _MASKS:
+        text = pattern.sub(placeholder, text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def masked_values(inputs: dict, kinds):
+    """
+    Values that `mask_text()` replaces with the placeholders of `kinds`.
+    
+    Args:
+        inputs: Evaluator inputs
+        kinds: Mask names from MASK_KINDS ("url", "order", "price")
+        
+    Returns:
+        Sorted list of the normalized values (spacing and thousands
+        separators removed), e.g. ["2800جنيه"]
+    """
+    values = []
+    for value in inputs.values():
+        text = normalize_arabic(value if isinstance(value, str) else json.dumps(value, default=str))
+        for kind in kinds:
+            values.extend(
+                _WHITESPACE.sub("", match.group(0)).replace(",", "")
+                for match in MASK_KINDS[kind].finditer(text)
+            )
+    return sorted(values)
+
+
+def shingle_hashes(inputs: dict, size: int = SHINGLE_SIZE):
+    """
+    32-bit hashes of the character shingles of every masked input value.
+    
+    Shingles are prefixed with their field name, so a query never matches a
+    response.
+    
+    Returns:
+        uint64 array of the distinct 32-bit shingle hashes
+    """
+    hashes = set()
+    for name, value in inputs.items():
+        text = mask_text(value if isinstance(value, str) else json.dumps(value, default=str))
+        prefix = f"{name}\x1f"
+        for start in range(max(1, len(text) - size + 1)):
+            hashes.add(zlib.crc32((prefix + text[start:start + size]).encode("utf-8")))
+    return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+
+
+class MinHasher:
+    """
+    MinHash signatures estimating the Jaccard similarity of shingle sets.
+    
+    Each of the `num_perm` hash functions is a seeded multiply-shift hash, so
+    signatures are stable across processes and runs.
+    """
+    
+    def __init__(self, num_perm: int = DEFAULT_BANDS * DEFAULT_ROWS, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._a = rng.integers(0, 2**64, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2**64, size=num_perm, dtype=np.uint64)
+    
+    def signature(self, hashes):
+        """
+        MinHash signature (uint32 array of length `num_perm`) of a shingle hash array.
+        """
+        if not len(hashes):
+            return np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+        # uint64 products wrap around; the top 32 bits form the hash
+        permuted = (hashes[:, None] * self._a + self._b) >> np.uint64(32)
+        return permuted.min(axis=0).astype(np.uint32)
+    
+    @staticmethod
+    def similarity(first, second):
+        """
+        Estimated Jaccard similarity of two signatures.
+        """
+        return float(np.mean(first == second))
+
+
+class NearDuplicateIndex(SQLiteStore):
+    """
+    SQLite-backed LSH index of judged input pairs.
+    
+    Each judged pair is stored with its MinHash signature, and its signature
+    is split into `bands` bands of `rows` values whose hashes are indexed.
+    A lookup only reads the entries sharing at least one band (at most
+    `MAX_CANDIDATES`, those sharing the most bands first), so its cost does
+    not grow with the size of the index. The best candidate is reused when
+    its estimated similarity is at least `threshold`.
+    
+    Entries are grouped by namespace (see `namespace()`), so judgements are
+    only reused for the same prompty file and model. Like `JudgementCache`,
+    it is a `SQLiteStore` (WAL mode, per-thread connections), so several
+    worker processes and threads can share it.
+    """
+    
+    def __init__(self, path: str = ".cache/near_duplicates.sqlite",
+                 threshold: float = DEFAULT_THRESHOLD, bands: int = DEFAULT_BANDS,
+                 rows: int = DEFAULT_ROWS, max_entries: int = 1_000_000,
+                 evict_every: int = 1000):
+        """
+        Initialize the index.
+        
+        Args:
+            path: SQLite database file (created if missing)
+            threshold: Minimum estimated Jaccard similarity for reusing a judgement
+            bands: Number of LSH bands
+            rows: Signature values per band (more rows make candidates stricter)
+            max_entries: Maximum number of indexed judgements; the least
+                recently used entries are evicted beyond this
+            evict_every: Run eviction after this many writes
+        """
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be between 0 and 1")
+        super().__init__(path)
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self._hasher = MinHasher(bands * rows)
+        
+        self.hits = 0
+        self.misses = 0
+        self._similarity_sum = 0.0
+        self._writes = 0
+        
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " id INTEGER PRIMARY KEY,"
+                " namespace TEXT NOT NULL,"
+                " signature BLOB NOT NULL,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS bands (band_key INTEGER NOT NULL, entry_id INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS bands_band_key ON bands (band_key)")
+            conn.execute("CREATE INDEX IF NOT EXISTS bands_entry_id ON bands (entry_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+    
+    @staticmethod
+    def namespace(prompty_source: str, model_config, pinned=()):
+        """
+        Namespace of the judgements made with a prompty file and model.
+        
+        `pinned` values (see `masked_values()`) become part of the namespace,
+        so judgements are only shared between inputs quoting exactly them.
+        """
+        return JudgementCache.make_key(
+            prompty_source, model_config, {"pinned": list(pinned)} if pinned else {}
+        )
+    
+    def signature(self, inputs: dict):
+        """
+        MinHash signature of an evaluator's inputs.
+        """
+        return self._hasher.signature(shingle_hashes(inputs))
+    
+    def lookup(self, namespace: str, signature):
+        """
+        Find the judgement of the most similar indexed pair.
+        
+        Args:
+            namespace: Namespace from `namespace()`
+            signature: Signature from `signature()`
+            
+        Returns:
+            The stored judgement (parsed JSON), or None when no indexed pair
+            reaches the threshold
+        """
+        band_keys = self._band_keys(namespace, signature)
+        conn = self._connection()
+        candidates = conn.execute(
+            "SELECT e.id, e.signature, e.value FROM entries e JOIN ("
+            "  SELECT entry_id, COUNT(*) AS shared FROM bands"
+            f"  WHERE band_key IN ({','.join('?' * len(band_keys))})"
+            "  GROUP BY entry_id ORDER BY shared DESC LIMIT ?"
+            ") c ON c.entry_id = e.id WHERE e.namespace = ?",
+            (*band_keys, MAX_CANDIDATES, namespace)
+        ).fetchall()
+        
+        best_id, best_value, best_similarity = None, None, 0.0
+        for entry_id, stored, value in candidates:
+            similarity = self._hasher.similarity(signature, np.frombuffer(stored, dtype=np.uint32))
+            if similarity > best_similarity:
+                best_id, best_value, best_similarity = entry_id, value, similarity
+        
+        if best_id is None or best_similarity < self.threshold:
+            with self._lock:
+                self.misses += 1
+            return None
+        
+        with conn:
+            conn.execute("UPDATE entries SET accessed_at = ? WHERE id = ?", (time.time(), best_id))
+        with self._lock:
+            self.hits += 1
+            self._similarity_sum += best_similarity
+        return json.loads(best_value)
+    
+    def add(self, namespace: str, signature, judgement: dict):
+        """
+        Index a judgement made by the LLM.
+        """
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            entry_id = conn.execute(
+                "INSERT INTO entries (namespace, signature, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (namespace, signature.astype(np.uint32).tobytes(),
+                 json.dumps(judgement, ensure_ascii=False), now, now)
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO bands (band_key, entry_id) VALUES (?, ?)",
+                [(band_key, entry_id) for band_key in self._band_keys(namespace, signature)]
+            )
+        
+        with self._lock:
+            self._writes += 1
+            should_evict = self._writes % self.evict_every == 0
+        if should_evict:
+            self.evict()
+    
+    def evict(self):
+        """
+        Trim the index to `max_entries` (LRU).
+        
+        Returns:
+            Number of entries removed
+        """
+        conn = self._connection()
+        with conn:
+            (count,) = conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+            if count <= self.max_entries:
+                return 0
+            stale = [
+                (entry_id,) for (entry_id,) in conn.execute(
+                    "SELECT id FROM entries ORDER BY accessed_at LIMIT ?", (count - self.max_entries,)
+                )
+            ]
+            conn.executemany("DELETE FROM bands WHERE entry_id = ?", stale)
+            conn.executemany("DELETE FROM entries WHERE id = ?", stale)
+        return len(stale)
+    
+    def stats(self):
+        """
+        Hit/miss counters of this process, the mean similarity of reused pairs
+        and the current index size.
+        """
+        (entries,) = self._connection().execute("SELECT COUNT(*) FROM entries").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "mean_similarity": self._similarity_sum / self.hits if self.hits else None,
+            "entries": entries
+        }
+    
+    def _band_keys(self, namespace: str, signature):
+        # Signed 64-bit hashes of each band, also covering the namespace and
+        # band layout, so other prompts and layouts never collide
+        signature = signature.astype(np.uint32)
+        salt = hashlib.blake2b(namespace.encode("utf-8"), digest_size=16).digest()
+        keys = []
+        for band in range(self.bands):
+            digest = hashlib.blake2b(
+                signature[band * self.rows:(band + 1) * self.rows].tobytes(),
+                digest_size=8, salt=salt, person=f"{band}:{self.rows}".encode("utf-8")
+            ).digest()
+            keys.append(int.from_bytes(digest, "little", signed=True))
+        return keys
@@ -6,27 +6,356 @@ These evaluators use LLMs to evaluate subjective aspects
 of the system's responses.
 """
 
+import asyncio
+import contextvars
 import json
-from promptflow.client import load_flow
+import time
+from concurrent.futures import ThreadPoolExecutor
 
+from evaluators import registry
+from evaluators.near_duplicates import masked_values
+from evaluators.rate_limit import estimate_tokens
+from telemetry import get_telemetry
 
-class CustomerServiceQualityEvaluator:
+# Set by `aevaluate_batch()` in its worker threads so they wait for the rate
+# limiter right before hitting the LLM (cache hits never wait).
+_before_llm_call = contextvars.ContextVar("before_llm_call", default=None)
+
+
+class _PromptyEvaluator:
     """
-    Evaluates the quality of customer service responses in Arabic.
-    Uses LLM to assess professionalism, clarity, completeness, accuracy, and language.
+    Shared plumbing for evaluators backed by a `.prompty` judge.
+    
+    Subclasses set `PROMPTY_SOURCE`, `METRIC_PREFIX` and `INPUTS` and call
+    `_judge()` with the prompty inputs. With a `PACKED_PROMPTY_SOURCE`, rows
+    can also be judged several per LLM call (see `prefetch()`).
     """
     
-    def __init__(self, model_config):
+    PROMPTY_SOURCE = None
+    PACKED_PROMPTY_SOURCE = None
+    METRIC_PREFIX = None
+    INPUTS = ()
+    # Masked values (see near_duplicates.MASK_KINDS) a near-duplicate must
+    # quote exactly for its judgement to be reused
+    NEAR_DUPLICATE_PINNED = ()
+    MAX_RETRIES = 2
+    RETRY_BACKOFF_SECONDS = 1.0
+    
+    def __init__(self, model_config, cache=None, pack_size: int = 1, near_duplicates=None):
         """
         Initialize the evaluator with model configuration.
         
         Args:
             model_config: OpenAIModelConfiguration or AzureOpenAIModelConfiguration
+            cache: Optional JudgementCache; unchanged (prompty, model, inputs)
+                combinations are then answered without calling the LLM
+            pack_size: Rows judged per LLM call by `prefetch()` and
+                `aevaluate_batch()` (1 judges every row on its own)
+            near_duplicates: Optional NearDuplicateIndex; rows similar enough
+                to an already-judged row reuse its judgement
+        """
+        self._model_config = model_config
+        self._cache = cache
+        self._near_duplicates = near_duplicates
+        self.pack_size = max(1, pack_size) if self.PACKED_PROMPTY_SOURCE else 1
+        self._prefetched = {}
+    
+    def _flow(self, source: str):
+        # Loaded on first use and shared with every evaluator using the same
+        # prompty file and model configuration
+        return registry.get_flow(source, self._model_config)
+    
+    @property
+    def _base_call_tokens(self):
+        # Fixed per-call token cost (prompt template plus completion budget)
+        # used for tokens/minute pacing
+        prompty = registry.get_prompty(self.PROMPTY_SOURCE)
+        return estimate_tokens(prompty.text) + prompty.max_tokens
+    
+    async def aevaluate_batch(self, rows, *, max_concurrency: int = 8, rate_limiter=None):
+        """
+        Evaluate many rows concurrently, keeping a bounded number of LLM calls in flight.
+        
+        Rows run on a pool of `max_concurrency` worker threads through the regular
+        synchronous path (so the judgement cache still applies); `rate_limiter`
+        paces the actual LLM calls. With `pack_size` > 1, each worker judges a
+        pack of rows per call instead (see `prefetch()`).
+        A row whose call fails gets no score (None) and a `<prefix>_error`
+        field instead of failing the whole batch, so it is left out of the
+        suite means and sampled estimates rather than counted as a 0.
+        
+        Args:
+            rows: Sequence of keyword-argument dictionaries, one per row
+                (the same arguments `__call__` takes)
+            max_concurrency: Maximum number of rows evaluated at the same time
+            rate_limiter: Optional TokenBucketRateLimiter for requests/tokens quotas
+            
+        Returns:
+            List of evaluation results in input order
         """
-        self._flow = load_flow(
-            source="evaluators/customer_service_quality.prompty",
-            model={"configuration": model_config}
-        )
+        loop = asyncio.get_running_loop()
+        
+        def wait_for_quota(inputs):
+            tokens = self._base_call_tokens + estimate_tokens(
+                "".join(str(value) for value in inputs.values())
+            )
+            asyncio.run_coroutine_threadsafe(rate_limiter.acquire(tokens), loop).result()
+        
+        def evaluate_row(row):
+            gate = _before_llm_call.set(wait_for_quota if rate_limiter is not None else None)
+            try:
+                return self(**row)
+            except Exception as error:
+                return self._format_result(_failed_judgement(f"LLM call failed: {error}"))
+            finally:
+                _before_llm_call.reset(gate)
+        
+        def evaluate_pack(pack):
+            gate = _before_llm_call.set(wait_for_quota if rate_limiter is not None else None)
+            try:
+                judgements = self._judge_pack([self._prompty_inputs(row) for row in pack])
+            finally:
+                _before_llm_call.reset(gate)
+            return [
+                self._format_result(judgement) if judgement is not None else evaluate_row(row)
+                for row, judgement in zip(pack, judgements)
+            ]
+        
+        # One worker thread per in-flight call bounds the concurrency; each row
+        # runs in a copy of the caller's context so its spans nest under the caller's
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            if self.pack_size <= 1:
+                return await asyncio.gather(
+                    *(loop.run_in_executor(executor, contextvars.copy_context().run, evaluate_row, row)
+                      for row in rows)
+                )
+            rows = list(rows)
+            packs = await asyncio.gather(
+                *(loop.run_in_executor(executor, contextvars.copy_context().run, evaluate_pack,
+                                       rows[start:start + self.pack_size])
+                  for start in range(0, len(rows), self.pack_size))
+            )
+            return [result for pack in packs for result in pack]
+    
+    def prefetch(self, rows, max_concurrency: int = 8):
+        """
+        Judge rows ahead of time, `pack_size` rows per LLM call.
+        
+        The judgements are kept in memory until the next `prefetch()`, so the
+        row-by-row calls that follow (e.g. from `azure.ai.evaluation.evaluate`)
+        are answered without calling the LLM. Rows whose entry in the packed
+        response is missing or malformed are not kept and are judged on their
+        own when called. Does nothing when `pack_size` is 1.
+        
+        Args:
+            rows: Sequence of keyword-argument dictionaries, one per row
+            max_concurrency: Maximum number of packed calls in flight
+        """
+        if self.pack_size <= 1:
+            return
+        rows = [self._prompty_inputs(row) for row in rows]
+        packs = [rows[start:start + self.pack_size] for start in range(0, len(rows), self.pack_size)]
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, self._judge_pack, pack)
+                for pack in packs
+            ]
+            judgements = [judgement for future in futures for judgement in future.result()]
+        
+        self._prefetched = {
+            _inputs_key(inputs): judgement
+            for inputs, judgement in zip(rows, judgements)
+            if judgement is not None
+        }
+    
+    def _near_duplicate_namespace(self, inputs: dict):
+        # Judgements are only shared between rows judged by the same prompt
+        # and model (packed judgements count as single-row ones) and quoting
+        # the same pinned values
+        pinned = masked_values(inputs, self.NEAR_DUPLICATE_PINNED) if self.NEAR_DUPLICATE_PINNED else ()
+        return self._near_duplicates.namespace(self.PROMPTY_SOURCE, self._model_config, pinned)
+    
+    def _prompty_inputs(self, row: dict):
+        return {name: row.get(name) for name in self.INPUTS}
+    
+    def _judge(self, **inputs):
+        """
+        Run the prompty judge (or reuse a cached judgement) and parse its JSON.
+        
+        Returns:
+            Dictionary with "score" and "reasoning"
+        """
+        judgement = self._prefetched.get(_inputs_key(inputs))
+        if judgement is not None:
+            return judgement
+        
+        telemetry = get_telemetry()
+        label = type(self).__name__
+        with telemetry.span("llm.judge", evaluator=label) as span:
+            key = None
+            llm_response = None
+            if self._cache is not None:
+                key = self._cache.make_key(self.PROMPTY_SOURCE, self._model_config, inputs)
+                llm_response = self._cache.get(key)
+            
+            from_cache = llm_response is not None
+            span.set_attribute("cache_hit", from_cache)
+            signature = None
+            if not from_cache and self._near_duplicates is not None:
+                signature = self._near_duplicates.signature(inputs)
+                reused = self._near_duplicates.lookup(self._near_duplicate_namespace(inputs), signature)
+                span.set_attribute("near_duplicate_hit", reused is not None)
+                if reused is not None:
+                    return reused
+            if not from_cache:
+                llm_response = self._call_llm(inputs, telemetry, label, self.PROMPTY_SOURCE)
+            
+            started = time.perf_counter()
+            try:
+                result = json.loads(llm_response)
+            except json.JSONDecodeError as error:
+                telemetry.record(label, "parse", time.perf_counter() - started, error=error)
+                return _failed_judgement(f"Failed to parse LLM response: {llm_response}")
+            telemetry.record(label, "parse", time.perf_counter() - started)
+            
+            # Only well-formed judgements are cached, so parse failures are retried
+            if key is not None and not from_cache:
+                self._cache.put(key, llm_response)
+            if signature is not None and isinstance(result, dict):
+                self._near_duplicates.add(self._near_duplicate_namespace(inputs), signature, result)
+            return result
+    
+    def _judge_pack(self, pack: list):
+        """
+        Judge several rows with one call of the packed prompty.
+        
+        Each row is sent with its position as "index" and the response's
+        entries are mapped back by index; rows with a cached packed or
+        single-row judgement, or a near-duplicate judgement, are not sent.
+        
+        Returns:
+            List with one {"score", "reasoning"} dictionary per row, or None for
+            rows whose entry was missing or malformed (or whose call failed)
+        """
+        telemetry = get_telemetry()
+        label = type(self).__name__
+        with telemetry.span("llm.judge_pack", evaluator=label, rows=len(pack)) as span:
+            judgements = [None] * len(pack)
+            keys = [None] * len(pack)
+            if self._cache is not None:
+                for index, inputs in enumerate(pack):
+                    keys[index] = self._cache.make_key(self.PACKED_PROMPTY_SOURCE, self._model_config, inputs)
+                    # Rows judged on their own before (e.g. earlier fallbacks) count too
+                    cached = self._cache.get(
+                        keys[index], self._cache.make_key(self.PROMPTY_SOURCE, self._model_config, inputs)
+                    )
+                    if cached is not None:
+                        judgements[index] = json.loads(cached)
+            
+            pending = [index for index, judgement in enumerate(judgements) if judgement is None]
+            span.set_attribute("cache_hits", len(pack) - len(pending))
+            signatures = {}
+            if self._near_duplicates is not None:
+                for index in pending:
+                    signatures[index] = self._near_duplicates.signature(pack[index])
+                    judgements[index] = self._near_duplicates.lookup(
+                        self._near_duplicate_namespace(pack[index]), signatures[index]
+                    )
+                reused = sum(judgements[index] is not None for index in pending)
+                span.set_attribute("near_duplicate_hits", reused)
+                pending = [index for index in pending if judgements[index] is None]
+            if not pending:
+                return judgements
+            
+            packed_inputs = {
+                "rows": json.dumps(
+                    [{"index": position, **pack[index]} for position, index in enumerate(pending)],
+                    ensure_ascii=False, default=str
+                )
+            }
+            try:
+                llm_response = self._call_llm(
+                    packed_inputs, telemetry, label, self.PACKED_PROMPTY_SOURCE, rows=len(pending)
+                )
+            except Exception:
+                # Already recorded; every pending row falls back to its own call
+                span.set_attribute("fallback_rows", len(pending))
+                return judgements
+            
+            started = time.perf_counter()
+            entries = _parse_packed_response(llm_response, len(pending))
+            missing = len(pending) - len(entries)
+            telemetry.record(
+                label, "parse", time.perf_counter() - started, rows=len(pending),
+                error=ValueError(f"{missing} packed entries missing or malformed") if missing else None
+            )
+            for position, index in enumerate(pending):
+                judgement = entries.get(position)
+                if judgement is not None:
+                    judgements[index] = judgement
+                    if keys[index] is not None:
+                        self._cache.put(keys[index], json.dumps(judgement, ensure_ascii=False))
+                    if index in signatures:
+                        self._near_duplicates.add(
+                            self._near_duplicate_namespace(pack[index]), signatures[index], judgement
+                        )
+            span.set_attribute("fallback_rows", missing)
+            return judgements
+    
+    def _call_llm(self, inputs: dict, telemetry, label: str, source: str, rows: int = 1):
+        """
+        Call a prompty flow, retrying failed calls with exponential backoff.
+        """
+        attempt = 0
+        while True:
+            before_call = _before_llm_call.get()
+            if before_call is not None:
+                before_call(inputs)
+            
+            started = time.perf_counter()
+            try:
+                llm_response = self._flow(source)(**inputs)
+            except Exception as error:
+                telemetry.record(label, "llm", time.perf_counter() - started, rows=rows, error=error)
+                if attempt >= self.MAX_RETRIES:
+                    raise
+                telemetry.record_retry(label)
+                time.sleep(self.RETRY_BACKOFF_SECONDS * 2 ** attempt)
+                attempt += 1
+                continue
+            
+            telemetry.record(label, "llm", time.perf_counter() - started, rows=rows)
+            # The flow returns only the completion text, so usage is estimated
+            telemetry.record_tokens(
+                label,
+                prompt_tokens=estimate_tokens(
+                    registry.get_prompty(source).text
+                    + "".join(str(value) for value in inputs.values())
+                ),
+                completion_tokens=estimate_tokens(str(llm_response))
+            )
+            return llm_response
+    
+    def _format_result(self, result: dict):
+        formatted = {
+            f"{self.METRIC_PREFIX}_score": result.get("score"),
+            f"{self.METRIC_PREFIX}_reasoning": result.get("reasoning", "")
+        }
+        if result.get("error"):
+            formatted[f"{self.METRIC_PREFIX}_error"] = result["error"]
+        return formatted
+
+
+class CustomerServiceQualityEvaluator(_PromptyEvaluator):
+    """
+    Evaluates the quality of customer service responses in Arabic.
+    Uses LLM to assess professionalism, clarity, completeness, accuracy, and language.
+    """
+    
+    PROMPTY_SOURCE = "evaluators/customer_service_quality.prompty"
+    PACKED_PROMPTY_SOURCE = "evaluators/customer_service_quality_packed.prompty"
+    METRIC_PREFIX = "customer_service_quality"
+    INPUTS = ("query", "response")
     
     def __call__(self, *, query: str, response: str, **kwargs):
         """
@@ -39,39 +368,24 @@ class CustomerServiceQualityEvaluator:
         Returns:
             Dictionary with evaluation results
         """
-        llm_response = self._flow(query=query, response=response)
-        
-        try:
-            result = json.loads(llm_response)
-        except json.JSONDecodeError:
-            result = {
-                "score": 0,
-                "reasoning": f"Failed to parse LLM response: {llm_response}"
-            }
+        result = self._judge(query=query, response=response)
         
-        return {
-            "customer_service_quality_score": result.get("score", 0),
-            "customer_service_quality_reasoning": result.get("reasoning", "")
-        }
+        return self._format_result(result)
 
 
-class PricingJustificationEvaluator:
+class PricingJustificationEvaluator(_PromptyEvaluator):
     """
     Evaluates if pricing explanations are clear and well-justified.
     Uses LLM to assess transparency and customer-friendliness.
     """
     
-    def __init__(self, model_config):
-        """
-        Initialize the evaluator with model configuration.
-        
-        Args:
-            model_config: OpenAIModelConfiguration or AzureOpenAIModelConfiguration
-        """
-        self._flow = load_flow(
-            source="evaluators/pricing_justification.prompty",
-            model={"configuration": model_config}
-        )
+    PROMPTY_SOURCE = "evaluators/pricing_justification.prompty"
+    PACKED_PROMPTY_SOURCE = "evaluators/pricing_justification_packed.prompty"
+    METRIC_PREFIX = "pricing_justification"
+    INPUTS = ("query", "price_explanation")
+    # The quoted price is part of what is judged: explanations that differ
+    # only in their price are not duplicates
+    NEAR_DUPLICATE_PINNED = ("price",)
     
     def __call__(self, *, query: str, price_explanation: str, **kwargs):
         """
@@ -84,17 +398,50 @@ class PricingJustificationEvaluator:
         Returns:
             Dictionary with evaluation results
         """
-        llm_response = self._flow(query=query, price_explanation=price_explanation)
+        result = self._judge(query=query, price_explanation=price_explanation)
         
-        try:
-            result = json.loads(llm_response)
-        except json.JSONDecodeError:
-            result = {
-                "score": 0,
-                "reasoning": f"Failed to parse LLM response: {llm_response}"
-            }
-        
-        return {
-            "pricing_justification_score": result.get("score", 0),
-            "pricing_justification_reasoning": result.get("reasoning", "")
-        }
+        return self._format_result(result)
+
+
+def _failed_judgement(message: str):
+    # No score rather than 0, which is not on the 1-5 rubric and would drag
+    # the means down; aggregations skip missing scores
+    return {"score": None, "reasoning": message, "error": message}
+
+
+def _inputs_key(inputs: dict):
+    return json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def _parse_packed_response(llm_response, count: int):
+    """
+    Valid entries of a packed judge response, keyed by row position.
+    
+    The response is {"results": [{"index", "score", "reasoning"}, ...]} (a
+    bare array is accepted too). Entries with an unknown or repeated index, or
+    without a score from 1 to 5, are dropped so their rows can be re-judged.
+    """
+    try:
+        payload = json.loads(llm_response)
+    except (json.JSONDecodeError, TypeError):
+        return {}
+    entries = payload.get("results") if isinstance(payload, dict) else payload
+    if not isinstance(entries, list):
+        return {}
+    
+    parsed = {}
+    repeated = set()
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        index, score = entry.get("index"), entry.get("score")
+        if isinstance(index, bool) or not isinstance(index, int) or not 0 <= index < count:
+            continue
+        if isinstance(score, bool) or not isinstance(score, (int, float)) or not 1 <= score <= 5:
+            continue
+        if index in parsed:
+            repeated.add(index)
+        parsed[index] = {"score": score, "reasoning": str(entry.get("reasoning", ""))}
+    for index in repeated:
+        del parsed[index]
+    return parsed
@@ -0,0 +1,98 @@
+"""
+LLM Rate Limiting
+=================
+
+Token-bucket pacing for LLM judge calls, so batch evaluation stays within
+the deployment's requests-per-minute and tokens-per-minute quotas.
+"""
+
+import asyncio
+import time
+import weakref
+
+
+class TokenBucketRateLimiter:
+    """
+    Async rate limiter enforcing requests/minute and tokens/minute quotas.
+    
+    Each quota is a token bucket that refills continuously; a call waits
+    until both buckets can cover it. Bursts up to one minute of quota are
+    allowed, matching how Azure OpenAI enforces its limits.
+    
+    The buckets are shared by every event loop using the limiter (e.g. one
+    `asyncio.run()` per batch); each loop gets its own lock, since asyncio
+    locks only work within one loop.
+    """
+    
+    def __init__(self, requests_per_minute: float = None, tokens_per_minute: float = None):
+        """
+        Initialize the rate limiter.
+        
+        Args:
+            requests_per_minute: Request quota (None for unlimited)
+            tokens_per_minute: Token quota, prompt plus completion (None for unlimited)
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        
+        self._requests = requests_per_minute
+        self._tokens = tokens_per_minute
+        self._updated_at = time.monotonic()
+        self._locks = weakref.WeakKeyDictionary()
+    
+    async def acquire(self, tokens: int = 0):
+        """
+        Wait until a request costing `tokens` tokens fits in both quotas.
+        """
+        loop = asyncio.get_running_loop()
+        lock = self._locks.get(loop)
+        if lock is None:
+            lock = self._locks[loop] = asyncio.Lock()
+        
+        # Requests larger than the whole per-minute budget would never fit
+        if self.tokens_per_minute is not None:
+            tokens = min(tokens, self.tokens_per_minute)
+        
+        async with lock:
+            while True:
+                self._refill()
+                wait = max(
+                    _wait_time(self._requests, 1, self.requests_per_minute),
+                    _wait_time(self._tokens, tokens, self.tokens_per_minute)
+                )
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            
+            if self._requests is not None:
+                self._requests -= 1
+            if self._tokens is not None:
+                self._tokens -= tokens
+    
+    def _refill(self):
+        now = time.monotonic()
+        elapsed_minutes = (now - self._updated_at) / 60
+        self._updated_at = now
+        if self._requests is not None:
+            self._requests = min(
+                self.requests_per_minute,
+                self._requests + elapsed_minutes * self.requests_per_minute
+            )
+        if self._tokens is not None:
+            self._tokens = min(
+                self.tokens_per_minute,
+                self._tokens + elapsed_minutes * self.tokens_per_minute
+            )
+
+
+def _wait_time(available, needed, per_minute):
+    if available is None or available >= needed:
+        return 0.0
+    return (needed - available) / per_minute * 60
+
+
+def estimate_tokens(text: str):
+    """
+    Rough token count of a prompt (Arabic text averages ~3 characters per token).
+    """
+    return len(text) // 3 + 1
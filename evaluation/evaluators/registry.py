@@ -0,0 +1,131 @@
+"""
+Shared Prompty and Model Registry
+=================================
+
+Process-wide registry so prompty files are parsed once, flows are loaded
+lazily on first use, and flows/evaluators built for the same model
+configuration are shared across evaluators and suites.
+"""
+
+import hashlib
+import json
+import re
+import threading
+from pathlib import Path
+
+_lock = threading.RLock()
+_prompties = {}
+_flows = {}
+_evaluators = {}
+
+
+class PromptySpec:
+    """
+    Parsed metadata of a `.prompty` file.
+    """
+    
+    def __init__(self, source: str, text: str):
+        self.source = source
+        self.text = text
+        self.digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        
+        max_tokens = re.search(r"max_tokens:\s*(\d+)", text)
+        self.max_tokens = int(max_tokens.group(1)) if max_tokens else 0
+
+
+def get_prompty(source: str):
+    """
+    Read and parse a prompty file, once per process.
+    
+    Args:
+        source: Path of the prompty file
+        
+    Returns:
+        PromptySpec with the file text, content digest and model parameters
+    """
+    key = str(Path(source).resolve())
+    with _lock:
+        spec = _prompties.get(key)
+        if spec is None:
+            spec = PromptySpec(source, Path(source).read_text(encoding="utf-8"))
+            _prompties[key] = spec
+        return spec
+
+
+def get_flow(source: str, model_config):
+    """
+    Get the promptflow flow for a prompty file and model configuration.
+    
+    The flow (and the LLM client it creates) is loaded on first use and then
+    shared by every evaluator using the same prompty and configuration.
+    """
+    key = (str(Path(source).resolve()), model_config_key(model_config))
+    with _lock:
+        flow = _flows.get(key)
+        if flow is None:
+            from promptflow.client import load_flow
+            
+            flow = load_flow(source=source, model={"configuration": model_config})
+            _flows[key] = flow
+        return flow
+
+
+def register_flow(source: str, model_config, flow):
+    """
+    Use `flow` for a prompty file and model configuration instead of loading it
+    (e.g. a stub LLM for benchmarks and offline runs).
+    """
+    key = (str(Path(source).resolve()), model_config_key(model_config))
+    with _lock:
+        _flows[key] = flow
+
+
+def get_shared_evaluator(evaluator_class, model_config, **kwargs):
+    """
+    Get a shared instance of an LLM evaluator (e.g. the SDK's RelevanceEvaluator).
+    
+    Instances are keyed by class, model configuration and keyword arguments,
+    so suites running in the same process reuse one evaluator and its client.
+    """
+    key = _evaluator_key(evaluator_class, model_config, kwargs)
+    with _lock:
+        evaluator = _evaluators.get(key)
+        if evaluator is None:
+            evaluator = evaluator_class(model_config=model_config, **kwargs)
+            _evaluators[key] = evaluator
+        return evaluator
+
+
+def register_evaluator(evaluator_class, model_config, evaluator, **kwargs):
+    """
+    Use `evaluator` wherever `get_shared_evaluator()` is asked for this class,
+    model configuration and keyword arguments (e.g. a stub LLM judge for
+    benchmarks).
+    """
+    with _lock:
+        _evaluators[_evaluator_key(evaluator_class, model_config, kwargs)] = evaluator
+
+
+def _evaluator_key(evaluator_class, model_config, kwargs: dict):
+    return (
+        f"{evaluator_class.__module__}.{evaluator_class.__qualname__}",
+        model_config_key(model_config),
+        json.dumps(kwargs, sort_keys=True, default=str)
+    )
+
+
+def model_config_key(model_config):
+    """
+    Stable, hashable key for a model configuration (a dict-like object).
+    """
+    return json.dumps(dict(model_config or {}), sort_keys=True, default=str)
+
+
+def clear():
+    """
+    Drop all registered prompties, flows and evaluators.
+    """
+    with _lock:
+        _prompties.clear()
+        _flows.clear()
+        _evaluators.clear()
@@ -0,0 +1,194 @@
+"""
+Streaming Quantile Sketches
+===========================
+
+Fixed-memory, mergeable summaries used by the code-based evaluators to
+report percentiles over arbitrarily large data streams.
+"""
+
+import math
+import threading
+
+import numpy as np
+
+
+class QuantileSketch:
+    """
+    Log-bucketed histogram with a bounded relative error (HDR/DDSketch style).
+
+    Values are counted in logarithmically spaced buckets between `min_value`
+    and `max_value`, so memory is fixed by the configured range and accuracy,
+    never by the number of values added. Any quantile is reported within
+    `relative_accuracy` of the true value. Sketches with the same settings can
+    be merged, e.g. across shards or nightly runs.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01,
+                 min_value: float = 1e-4, max_value: float = 3600.0):
+        """
+        Initialize an empty sketch.
+
+        Args:
+            relative_accuracy: Maximum relative error of reported quantiles
+            min_value: Smallest value tracked precisely (smaller positive values
+                are counted in the first bucket)
+            max_value: Largest value tracked precisely (larger values are
+                counted in the last bucket)
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        if not 0 < min_value < max_value:
+            raise ValueError("min_value must be positive and smaller than max_value")
+
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.max_value = max_value
+
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._n_buckets = int(math.ceil(math.log(max_value / min_value) / self._log_gamma)) + 1
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """
+        Remove all values from the sketch.
+        """
+        self._counts = np.zeros(self._n_buckets, dtype=np.int64)
+        self._zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        """
+        Add a single value (NaN and infinite values are skipped).
+        """
+        value = float(value)
+        if not math.isfinite(value):
+            return
+        with self._lock:
+            if value <= 0:
+                self._zero_count += 1
+            else:
+                self._counts[self._bucket_index(value)] += 1
+            self._record(1, value, value, value)
+
+    def add_batch(self, values):
+        """
+        Add an array of values in one vectorized update (NaN and infinite
+        values are skipped).
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return
+
+        positive = values[values > 0]
+        ratio = np.clip(positive / self.min_value, 1.0, None)
+        indexes = np.minimum(
+            np.ceil(np.log(ratio) / self._log_gamma).astype(np.int64),
+            self._n_buckets - 1
+        )
+        counts = np.bincount(indexes, minlength=self._n_buckets)
+
+        with self._lock:
+            self._counts += counts
+            self._zero_count += int(values.size - positive.size)
+            self._record(values.size, float(values.sum()), float(values.min()), float(values.max()))
+
+    def quantile(self, q: float):
+        """
+        Estimate the q-quantile (0 <= q <= 1) of the values added so far.
+
+        Returns:
+            Estimated value, or None when the sketch is empty
+        """
+        if not 0 <= q <= 1:
+            raise ValueError("q must be between 0 and 1")
+        if self.count == 0:
+            return None
+
+        rank = q * (self.count - 1)
+        if rank < self._zero_count:
+            return min(max(0.0, self.min), self.max)
+
+        cumulative = np.cumsum(self._counts) + self._zero_count
+        index = int(np.searchsorted(cumulative, rank, side="right"))
+        estimate = self.min_value * 2 * self._gamma ** index / (self._gamma + 1)
+
+        # Exact extremes are known; never report beyond them
+        return min(max(estimate, self.min), self.max)
+
+    def merge(self, other: "QuantileSketch"):
+        """
+        Merge another sketch with identical settings into this one.
+        """
+        if (other.relative_accuracy, other.min_value, other.max_value) != (
+                self.relative_accuracy, self.min_value, self.max_value):
+            raise ValueError("Cannot merge sketches with different settings")
+
+        with self._lock:
+            self._counts += other._counts
+            self._zero_count += other._zero_count
+            self._record(other.count, other.sum, other.min, other.max)
+
+    def to_dict(self):
+        """
+        Serialize the sketch to a JSON-compatible dictionary (sparse buckets).
+        """
+        nonzero = np.flatnonzero(self._counts)
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "min_value": self.min_value,
+            "max_value": self.max_value,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "zero_count": self._zero_count,
+            "buckets": dict(zip(map(str, nonzero.tolist()), self._counts[nonzero].tolist()))
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """
+        Rebuild a sketch serialized with `to_dict()`.
+        """
+        sketch = cls(
+            relative_accuracy=data["relative_accuracy"],
+            min_value=data["min_value"],
+            max_value=data["max_value"]
+        )
+        for index, count in data["buckets"].items():
+            sketch._counts[int(index)] = count
+        sketch._zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.sum = data["sum"]
+        if data["count"]:
+            sketch.min = data["min"]
+            sketch.max = data["max"]
+        return sketch
+
+    def __getstate__(self):
+        # Picklable for evaluation in worker processes; the lock is recreated there
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _bucket_index(self, value: float):
+        if value <= self.min_value:
+            return 0
+        index = int(math.ceil(math.log(value / self.min_value) / self._log_gamma))
+        return min(index, self._n_buckets - 1)
+
+    def _record(self, count, total, low, high):
+        self.count += count
+        self.sum += total
+        self.min = min(self.min, low)
+        self.max = max(self.max, high)
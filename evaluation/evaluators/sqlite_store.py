@@ -0,0 +1,56 @@
+"""
+Shared SQLite Stores
+====================
+
+Base class of the on-disk stores (judgement cache, near-duplicate index)
+that several threads and worker processes read and write at the same time.
+"""
+
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+
+class SQLiteStore:
+    """
+    SQLite database opened in WAL mode with a busy timeout, with one
+    connection per thread of each process.
+    
+    sqlite3 connections must not be shared across threads (or forked
+    processes), so `_connection()` opens one per thread and reopens it after
+    a fork. Stores pickle without their connections and lock, so they can be
+    sent to worker processes, which reconnect on first use.
+    """
+    
+    def __init__(self, path):
+        """
+        Initialize the store.
+        
+        Args:
+            path: SQLite database file (its directory is created if missing)
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+    
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"], state["_local"]
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._local = threading.local()
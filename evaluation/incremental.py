@@ -0,0 +1,221 @@
+"""
+Incremental Evaluation
+======================
+
+Watermark bookkeeping so a nightly run only evaluates rows added since the
+previous run and merges their results into stored running aggregates.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+from streaming import iter_jsonl_chunks
+
+
+class WatermarkStore:
+    """
+    JSON file holding, per suite, the last processed position and the running
+    aggregates of every run so far.
+    
+    A suite's state looks like:
+        {
+            "key_fields": ["timestamp"],      # or [] for line-offset watermarks
+            "watermark": ["2024-01-15T14:20:00"],
+            "watermark_rows": {"<row hash>": 1, ...},  # rows already read at the watermark
+            "lines_seen": 1200,              # rows read from the file so far
+            "rows_evaluated": 1200,
+            "metrics": {"<metric>": [sum, weight], "<count metric>": [sum, null], ...},
+            "evaluator_states": {"<evaluator>": {...}, ...}
+        }
+    """
+    
+    def __init__(self, path):
+        """
+        Initialize the store.
+        
+        Args:
+            path: JSON file of the store (created on first save)
+        """
+        self.path = Path(path)
+        self._suites = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._suites = json.load(f)
+    
+    def get(self, suite: str):
+        """
+        State of a suite, or an empty dictionary before its first run.
+        """
+        return self._suites.get(suite, {})
+    
+    def update(self, suite: str, state: dict):
+        """
+        Replace a suite's state and save the store atomically.
+        """
+        self._suites[suite] = state
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._suites, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def select_new_rows(data, output_file, state: dict, key_fields=(), chunk_rows: int = 10_000):
+    """
+    Copy the rows not covered by a suite's watermark to a new JSONL file.
+    
+    With `key_fields` (e.g. ("timestamp",) or ("order_id",)), a row is new when
+    its key is greater than or equal to the stored watermark and it is not one
+    of the rows already read at the watermark (rows sharing the watermark key
+    can arrive after a run). Keys are compared by type: numbers by value, ISO
+    timestamps by instant, and other strings with digit runs compared as
+    numbers, so "WO-2024-10" comes after "WO-2024-9". Rows missing a key field
+    cannot be placed against the watermark; they are new when they lie after
+    the previous run's line offset, which assumes keyless rows are appended.
+    Without key fields the whole file is treated as append-only that way.
+    
+    Args:
+        data: Path to the full JSONL dataset
+        output_file: Where to write the new rows
+        state: Current suite state from the WatermarkStore
+        key_fields: Row fields forming the watermark key
+        chunk_rows: Number of rows read per chunk
+        
+    Returns:
+        Tuple of (number of new rows, updated watermark, row hashes read at the
+        updated watermark, lines read)
+    """
+    key_fields = list(key_fields)
+    same_keys = state.get("key_fields") == key_fields
+    watermark = state.get("watermark") if same_keys else None
+    watermark_key = _watermark_key(watermark) if watermark is not None else None
+    seen_at_watermark = Counter(state.get("watermark_rows", {}) if same_keys else {})
+    lines_before = state.get("lines_seen", 0) if same_keys else 0
+    
+    new_rows = 0
+    lines_seen = 0
+    new_watermark, new_watermark_key = watermark, watermark_key
+    at_new_watermark = Counter()
+    with open(output_file, "w", encoding="utf-8") as out:
+        for chunk in iter_jsonl_chunks(data, chunk_rows=chunk_rows):
+            for row in chunk:
+                lines_seen += 1
+                key = [row.get(field) for field in key_fields]
+                if not key_fields or any(value is None for value in key):
+                    is_new = lines_seen > lines_before
+                else:
+                    row_key = _watermark_key(key)
+                    if watermark_key is None or row_key > watermark_key:
+                        is_new = True
+                    elif row_key == watermark_key:
+                        digest = _row_hash(row)
+                        is_new = seen_at_watermark[digest] == 0
+                        if not is_new:
+                            seen_at_watermark[digest] -= 1
+                    else:
+                        is_new = False
+                    
+                    if new_watermark_key is None or row_key > new_watermark_key:
+                        new_watermark, new_watermark_key = key, row_key
+                        at_new_watermark = Counter()
+                    if row_key == new_watermark_key:
+                        at_new_watermark[_row_hash(row)] += 1
+                
+                if is_new:
+                    out.write(json.dumps(row, ensure_ascii=False) + "\n")
+                    new_rows += 1
+    
+    return new_rows, new_watermark, dict(at_new_watermark), lines_seen
+
+
+_DIGIT_RUNS = re.compile(r"(\d+)")
+
+
+def _watermark_key(values):
+    """
+    Typed ordering key of a watermark: numbers (and numeric strings) by value,
+    ISO timestamps by instant (naive ones taken as UTC), other strings by
+    text with digit runs compared as numbers.
+    """
+    key = []
+    for value in values:
+        text = str(value)
+        try:
+            key.append((0, float(value)))
+            continue
+        except (TypeError, ValueError):
+            pass
+        try:
+            stamp = datetime.fromisoformat(text)
+        except ValueError:
+            key.append((2, tuple(
+                (0, int(part)) if part.isdigit() else (1, part) for part in _DIGIT_RUNS.split(text) if part
+            )))
+            continue
+        if stamp.tzinfo is not None:
+            stamp = stamp.astimezone(timezone.utc).replace(tzinfo=None)
+        key.append((1, stamp))
+    return key
+
+
+def _row_hash(row: dict):
+    """
+    Content hash identifying a row read at the watermark.
+    """
+    payload = json.dumps(row, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def merge_metrics(totals: dict, metrics: dict, rows: int, count_metrics=()):
+    """
+    Merge a run's metrics into running totals.
+    
+    Mean metrics are kept as row-weighted (sum, weight) totals. Count metrics
+    (e.g. the missing-field counts of `DataCompletenessEvaluator.aggregate()`)
+    are summed and kept as (sum, None).
+    
+    Args:
+        totals: Running totals from earlier runs
+        metrics: This run's metrics
+        rows: Number of rows this run evaluated
+        count_metrics: Names of count metrics; a name also covers the metrics
+            nested under it (e.g. "data_completeness.missing_counts")
+            
+    Returns:
+        Updated totals
+    """
+    totals = {name: list(value) for name, value in totals.items()}
+    for name, value in metrics.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or math.isnan(value):
+            continue
+        if is_count_metric(name, count_metrics):
+            total, _ = totals.get(name, [0, None])
+            totals[name] = [total + value, None]
+        else:
+            total, weight = totals.get(name, [0.0, 0])
+            totals[name] = [total + value * rows, weight + rows]
+    return totals
+
+
+def totals_to_means(totals: dict):
+    """
+    Convert running totals back to metrics: means for (sum, weight) totals,
+    sums for count totals.
+    """
+    return {
+        name: total if weight is None else total / weight
+        for name, (total, weight) in totals.items() if weight is None or weight
+    }
+
+
+def is_count_metric(name: str, count_metrics):
+    """
+    Whether a metric is one of `count_metrics` or nested under one of them.
+    """
+    return any(name == count or name.startswith(count + ".") for count in count_metrics)
@@ -0,0 +1,206 @@
+"""
+Deterministic Pre-screen Cascade
+================================
+
+Many responses can be scored without an LLM: empty replies, replies not
+written in Arabic script, replies cut off mid-sentence and replies too short
+to answer anything. `PrescreenedEvaluator` runs cheap vectorized text
+heuristics ahead of a prompt-based judge, gives clear-cut rows a definitive
+score and only sends the remaining rows to the LLM.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MIN_CHARS = 10
+DEFAULT_MIN_ARABIC_SHARE = 0.3
+
+# Stages in the order they are checked, with the score and reasoning given to
+# rows they catch (scores follow the judges' 1-5 rubrics)
+STAGES = {
+    "empty": (1, "Pre-screen: the response is empty."),
+    "not_arabic": (1, "Pre-screen: the response is not written in Arabic script."),
+    "truncated": (2, "Pre-screen: the response is cut off mid-sentence."),
+    "too_short": (1, "Pre-screen: the response is too short to answer the query."),
+}
+
+_ARABIC_LETTERS = r"[ء-يٮ-ۓۺ-ۿ]"
+_LATIN_LETTERS = r"[A-Za-z]"
+# A trailing comma, colon, dash or opening bracket, or a trailing conjunction
+# or preposition, means the text stops in the middle of a sentence
+_TRUNCATED_ENDING = (
+    r"(?:[,،:;\-–(\[]|(?:^|\s)(?:و|أو|او|ثم|في|من|إلى|الى|على|عن|مع|لكن|حتى|and|or|to|the|of|with))$"
+)
+
+
+def screen_texts(texts, min_chars: int = DEFAULT_MIN_CHARS,
+                 min_arabic_share: float = DEFAULT_MIN_ARABIC_SHARE):
+    """
+    Run the cascade over many texts at once.
+    
+    Args:
+        texts: Sequence of response texts (None counts as empty)
+        min_chars: Texts shorter than this (after stripping) are "too_short"
+        min_arabic_share: Texts whose letters are less than this share Arabic
+            (or that have no letters at all) are "not_arabic"
+            
+    Returns:
+        Object array with the first stage catching each text, or None for
+        texts the LLM has to judge
+    """
+    text = pd.Series(texts, dtype=object).fillna("").astype(str).str.strip()
+    length = text.str.len().to_numpy()
+    arabic = text.str.count(_ARABIC_LETTERS).to_numpy()
+    latin = text.str.count(_LATIN_LETTERS).to_numpy()
+    letters = arabic + latin
+    
+    empty = length == 0
+    not_arabic = ~empty & ((letters == 0) | (arabic < min_arabic_share * letters))
+    truncated = (
+        text.str.contains(_TRUNCATED_ENDING, regex=True).to_numpy()
+        | (text.str.count(r"\(").to_numpy() > text.str.count(r"\)").to_numpy())
+    )
+    too_short = length < min_chars
+    
+    stages = np.full(len(text), None, dtype=object)
+    # Later stages only apply to rows no earlier stage caught
+    for name, caught in reversed(list(zip(STAGES, (empty, not_arabic, truncated, too_short)))):
+        stages[caught] = name
+    return stages
+
+
+class PrescreenedEvaluator:
+    """
+    Transparent wrapper scoring clear-cut rows of a prompt-based judge without the LLM.
+    
+    The text in `field` (e.g. "response") is checked by `screen_texts()`;
+    rows caught by a stage get that stage's score and reasoning, the rest
+    are passed to the wrapped evaluator. Every result carries
+    `<prefix>_prescreened` (1.0 or 0.0), so the share of screened rows is
+    reported next to the score. `prefetch()` screens a whole chunk
+    in one vectorized pass and forwards only the remaining rows to the
+    wrapped evaluator's `prefetch()` (packed judging).
+    
+    `inspect.signature()` follows `__wrapped__`, so the SDK still sees the
+    evaluator's own parameters; other attributes are forwarded.
+    """
+    
+    def __init__(self, evaluator, field: str, min_chars: int = DEFAULT_MIN_CHARS,
+                 min_arabic_share: float = DEFAULT_MIN_ARABIC_SHARE):
+        """
+        Initialize the wrapper.
+        
+        Args:
+            evaluator: Prompt-based evaluator (or a wrapper around one) with a
+                METRIC_PREFIX
+            field: Keyword argument holding the text to screen
+            min_chars: Minimum response length, see `screen_texts()`
+            min_arabic_share: Minimum share of Arabic letters, see `screen_texts()`
+        """
+        self._evaluator = evaluator
+        self.__wrapped__ = evaluator
+        self.field = field
+        self.min_chars = min_chars
+        self.min_arabic_share = min_arabic_share
+        self.rows = 0
+        self.stage_counts = dict.fromkeys(STAGES, 0)
+        self._screened = {}
+        self._lock = threading.Lock()
+    
+    def __call__(self, **kwargs):
+        text = kwargs.get(self.field)
+        key = text if isinstance(text, str) else None
+        if key in self._screened:
+            stage = self._screened[key]
+        else:
+            stage = self._screen([text])[0]
+        
+        with self._lock:
+            self.rows += 1
+            if stage is not None:
+                self.stage_counts[stage] += 1
+        if stage is None:
+            return self._judged(self._evaluator(**kwargs))
+        return self._result(stage)
+    
+    def prefetch(self, rows, **kwargs):
+        """
+        Screen a chunk of rows and forward the rows left for the LLM to the
+        wrapped evaluator's `prefetch()`.
+        """
+        rows = list(rows)
+        texts = [row.get(self.field) for row in rows]
+        stages = self._screen(texts)
+        self._screened = {
+            text: stage for text, stage in zip(texts, stages) if isinstance(text, str)
+        }
+        if getattr(self._evaluator, "pack_size", 1) > 1:
+            self._evaluator.prefetch(
+                [row for row, stage in zip(rows, stages) if stage is None], **kwargs
+            )
+    
+    async def aevaluate_batch(self, rows, **kwargs):
+        """
+        Screen rows in one pass and judge only the remaining ones with the
+        wrapped evaluator's `aevaluate_batch()`.
+        """
+        rows = list(rows)
+        stages = self._screen([row.get(self.field) for row in rows])
+        pending = [index for index, stage in enumerate(stages) if stage is None]
+        judged = await self._evaluator.aevaluate_batch([rows[index] for index in pending], **kwargs)
+        
+        results = [None if stage is None else self._result(stage) for stage in stages]
+        for index, result in zip(pending, judged):
+            results[index] = self._judged(result)
+        with self._lock:
+            self.rows += len(rows)
+            for stage in stages:
+                if stage is not None:
+                    self.stage_counts[stage] += 1
+        return results
+    
+    def stats(self):
+        """
+        Rows seen, rows caught per stage and rows left for the LLM.
+        """
+        with self._lock:
+            rows, stage_counts = self.rows, dict(self.stage_counts)
+        avoided = sum(stage_counts.values())
+        return {
+            "rows": rows,
+            "stages": stage_counts,
+            "calls_avoided": avoided,
+            "llm_rows": rows - avoided
+        }
+    
+    def __getstate__(self):
+        # Picklable for evaluation in worker processes; the lock is recreated
+        # there (counters kept by copies are not seen here, see streaming.py)
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+    
+    def _screen(self, texts):
+        return screen_texts(texts, self.min_chars, self.min_arabic_share)
+    
+    def _result(self, stage: str):
+        score, reasoning = STAGES[stage]
+        prefix = self._evaluator.METRIC_PREFIX
+        return {f"{prefix}_score": score, f"{prefix}_reasoning": reasoning, f"{prefix}_prescreened": 1.0}
+    
+    def _judged(self, result):
+        if not isinstance(result, dict):
+            return result
+        return {**result, f"{self._evaluator.METRIC_PREFIX}_prescreened": 0.0}
+    
+    def __getattr__(self, name):
+        evaluator = self.__dict__.get("_evaluator")
+        if evaluator is None or name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(evaluator, name)
@@ -0,0 +1,750 @@
+"""
+Offline Road Routing
+====================
+
+Shortest road distances for the route optimization suite, computed from a
+local road network file (an OpenStreetMap XML extract or a CSV edge list),
+so `optimal_route_distance_km` can be filled in without any online service.
+
+Point-to-point queries use A* with landmark lower bounds (ALT). Distances
+between named places (cities, depots) are kept in an all-pairs table, and
+origins queried for many different destinations get a full single-source
+distance row, so typical lane-based workloads cost one array lookup per row.
+Other origins cost one search per distinct origin in a batch.
+Preprocessing results and the table are cached on disk per network file.
+"""
+
+import csv
+import hashlib
+import heapq
+import json
+import math
+import os
+import xml.etree.ElementTree as ElementTree
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from evaluators.arabic_text import normalize_arabic
+from streaming import iter_jsonl_chunks
+
+DEFAULT_LANDMARKS = 8
+# Origins queried for at least this many distinct destinations in a batch get
+# a full single-source distance row instead of one A* search per destination
+DEFAULT_HUB_MIN_TARGETS = 16
+DEFAULT_MAX_HUB_ROWS = 64
+DEFAULT_MAX_PLACES = 2000
+CACHE_VERSION = 1
+
+# Way types a truck can drive on
+DRIVABLE_HIGHWAYS = {
+    "motorway", "motorway_link", "trunk", "trunk_link", "primary", "primary_link",
+    "secondary", "secondary_link", "tertiary", "tertiary_link", "unclassified",
+    "residential", "living_street", "service", "road"
+}
+PLACE_TYPES = {"city", "town", "village", "suburb"}
+_GRID_DEGREES = 0.05
+_MAX_GRID_RADIUS = 100
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance in km between coordinates (scalars or arrays, degrees).
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=np.float64))
+                              for value in (lat1, lon1, lat2, lon2))
+    return 2 * 6371.0 * np.arcsin(np.sqrt(
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    ))
+
+
+def place_key(name):
+    """
+    Lookup key of a place name (English or Arabic spellings match loosely).
+    """
+    return normalize_arabic(name)
+
+
+class RoadGraph:
+    """
+    Directed road network in compressed sparse row form.
+    
+    Nodes are numbered 0..n-1; `node_ids` keeps their ids in the source file,
+    `lat`/`lon` their coordinates (NaN when unknown) and `places` maps
+    normalized place names to nodes. Edge lengths are in km.
+    """
+    
+    def __init__(self, sources, targets, lengths, node_ids, lat=None, lon=None, places=None):
+        """
+        Build the graph from edge arrays.
+        
+        Args:
+            sources: Start node of every directed edge
+            targets: End node of every directed edge
+            lengths: Length of every edge in km
+            node_ids: Source-file id of every node
+            lat: Optional latitude of every node
+            lon: Optional longitude of every node
+            places: Optional mapping of place name to node
+        """
+        self.node_ids = np.asarray(node_ids)
+        n_nodes = len(self.node_ids)
+        self.lat = np.full(n_nodes, np.nan) if lat is None else np.asarray(lat, dtype=np.float64)
+        self.lon = np.full(n_nodes, np.nan) if lon is None else np.asarray(lon, dtype=np.float64)
+        self.places = {place_key(name): int(node) for name, node in (places or {}).items()}
+        
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        lengths = np.asarray(lengths, dtype=np.float64)
+        if lengths.size and lengths.min() < 0:
+            raise ValueError("Edge lengths must not be negative")
+        self.forward = _csr(sources, targets, lengths, n_nodes)
+        self.reverse = _csr(targets, sources, lengths, n_nodes)
+        self._grid = None
+    
+    @property
+    def n_nodes(self):
+        return len(self.node_ids)
+    
+    @property
+    def n_edges(self):
+        return len(self.forward[1])
+    
+    @classmethod
+    def from_csv(cls, edges_file, nodes_file=None):
+        """
+        Load a network from CSV files.
+        
+        The edges file has `source`, `target` and `distance_km` columns and an
+        optional `oneway` column (1/true/yes; two-way by default). Node ids can
+        be place names (e.g. a city-level network) or ids described by the
+        optional nodes file, with `node`, `lat`, `lon` and optional `name`
+        columns.
+        """
+        index = {}
+        lat, lon, places = [], [], {}
+        
+        def node(node_id):
+            position = index.get(node_id)
+            if position is None:
+                position = index[node_id] = len(index)
+                lat.append(math.nan)
+                lon.append(math.nan)
+            return position
+        
+        if nodes_file is not None:
+            with open(nodes_file, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    position = node(row["node"])
+                    lat[position] = float(row["lat"])
+                    lon[position] = float(row["lon"])
+                    if row.get("name"):
+                        places[row["name"]] = position
+        
+        sources, targets, lengths = [], [], []
+        with open(edges_file, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                source, target = node(row["source"]), node(row["target"])
+                length = float(row["distance_km"])
+                sources.append(source)
+                targets.append(target)
+                lengths.append(length)
+                if str(row.get("oneway") or "").strip().lower() not in ("1", "true", "yes"):
+                    sources.append(target)
+                    targets.append(source)
+                    lengths.append(length)
+        
+        node_ids = list(index)
+        if nodes_file is None:
+            places = {node_id: position for node_id, position in index.items()}
+        return cls(sources, targets, lengths, node_ids, lat, lon, places)
+    
+    @classmethod
+    def from_osm(cls, path):
+        """
+        Load the drivable roads of an OpenStreetMap XML extract (.osm).
+        
+        Ways tagged with a DRIVABLE_HIGHWAYS `highway` value become edges
+        between consecutive nodes (honouring `oneway` and roundabouts). Place
+        nodes (cities, towns, ...) are attached to their nearest road node
+        under both their `name` and `name:en`.
+        """
+        # Every node's id and coordinates are kept in flat arrays (24 bytes a
+        # node) until the ways are read, since ways come after the nodes
+        node_ids, node_lat, node_lon = array("q"), array("d"), array("d")
+        place_points = []
+        way_refs, way_sizes, way_oneway = array("q"), array("q"), array("b")
+        for _, element in ElementTree.iterparse(path, events=("end",)):
+            if element.tag == "node":
+                node_ids.append(int(element.get("id")))
+                node_lat.append(float(element.get("lat")))
+                node_lon.append(float(element.get("lon")))
+                tags = _osm_tags(element)
+                if tags.get("place") in PLACE_TYPES:
+                    names = {tags.get("name"), tags.get("name:en"), tags.get("name:ar")} - {None}
+                    if names:
+                        place_points.append((names, node_lat[-1], node_lon[-1]))
+                element.clear()
+            elif element.tag == "way":
+                tags = _osm_tags(element)
+                if tags.get("highway") in DRIVABLE_HIGHWAYS and tags.get("area") != "yes":
+                    refs = [int(nd.get("ref")) for nd in element.iter("nd")]
+                    oneway = tags.get("oneway", "").lower()
+                    if oneway == "-1":
+                        refs.reverse()
+                    is_oneway = oneway in ("yes", "1", "true", "-1") or tags.get("junction") == "roundabout"
+                    way_refs.extend(refs)
+                    way_sizes.append(len(refs))
+                    way_oneway.append(is_oneway)
+                element.clear()
+        
+        # Resolve way refs to parsed nodes and join consecutive nodes of the
+        # same way; a ref to a node outside the extract splits the way there,
+        # since the road between its neighbours is unknown
+        ids = np.frombuffer(node_ids, dtype=np.int64) if node_ids else np.zeros(0, dtype=np.int64)
+        order = np.argsort(ids, kind="stable")
+        refs = np.frombuffer(way_refs, dtype=np.int64) if way_refs else np.zeros(0, dtype=np.int64)
+        ways = np.repeat(np.arange(len(way_sizes)), np.asarray(way_sizes, dtype=np.int64))
+        sorted_ids = ids[order]
+        positions = np.minimum(np.searchsorted(sorted_ids, refs), max(len(ids) - 1, 0))
+        found = sorted_ids[positions] == refs if len(ids) else np.zeros(len(refs), dtype=bool)
+        rows = order[positions] if len(ids) else positions
+        joined = (ways[:-1] == ways[1:]) & found[:-1] & found[1:]
+        starts, ends = rows[:-1][joined], rows[1:][joined]
+        two_way = ~np.asarray(way_oneway, dtype=bool)[ways[:-1][joined]]
+        
+        # Number the road nodes in order of first appearance
+        endpoints, first, inverse = np.unique(
+            np.column_stack([starts, ends]).ravel(), return_index=True, return_inverse=True
+        )
+        rank = np.empty(len(endpoints), dtype=np.int64)
+        rank[np.argsort(first, kind="stable")] = np.arange(len(endpoints))
+        nodes = rank[inverse.ravel()].reshape(-1, 2)
+        road_rows = endpoints[np.argsort(rank)]
+        
+        sources = np.concatenate([nodes[:, 0], nodes[two_way, 1]])
+        targets = np.concatenate([nodes[:, 1], nodes[two_way, 0]])
+        lat = np.frombuffer(node_lat, dtype=np.float64)[road_rows] if node_lat else np.zeros(0)
+        lon = np.frombuffer(node_lon, dtype=np.float64)[road_rows] if node_lon else np.zeros(0)
+        lengths = haversine_km(lat[sources], lon[sources], lat[targets], lon[targets])
+        graph = cls(sources, targets, lengths, ids[road_rows].astype(str), lat, lon)
+        
+        if place_points and graph.n_nodes:
+            nodes = graph.nearest_nodes([point[1] for point in place_points], [point[2] for point in place_points])
+            for (names, _, _), node in zip(place_points, nodes):
+                for name in names:
+                    graph.places.setdefault(place_key(name), int(node))
+        return graph
+    
+    def place_node(self, name):
+        """
+        Node of a named place, or None.
+        """
+        if name is None:
+            return None
+        return self.places.get(place_key(name))
+    
+    def nearest_nodes(self, lat, lon):
+        """
+        Nearest node to each coordinate (-1 for missing coordinates or nodes
+        without coordinates).
+        """
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        if self._grid is None:
+            self._grid = _GridIndex(self.lat, self.lon)
+        return np.array([self._grid.nearest(a, b) for a, b in zip(lat, lon)], dtype=np.int64)
+    
+    def shortest_paths(self, source: int, reverse: bool = False, targets=None):
+        """
+        Dijkstra distances from `source` to every node (to `source` with `reverse`).
+        
+        Args:
+            source: Start node
+            reverse: Follow edges backwards (distances from every node to `source`)
+            targets: Optional nodes to reach; the search stops once all are settled
+            
+        Returns:
+            float64 array of distances in km (inf for unreachable or unsettled nodes)
+        """
+        indptr, indices, weights = self._adjacency(reverse)
+        distances = [math.inf] * self.n_nodes
+        distances[source] = 0.0
+        remaining = set(targets) if targets is not None else None
+        settled = bytearray(self.n_nodes)
+        heap = [(0.0, source)]
+        while heap:
+            distance, node = heapq.heappop(heap)
+            if settled[node]:
+                continue
+            settled[node] = 1
+            if remaining is not None:
+                remaining.discard(node)
+                if not remaining:
+                    break
+            for edge in range(indptr[node], indptr[node + 1]):
+                neighbor = indices[edge]
+                candidate = distance + weights[edge]
+                if candidate < distances[neighbor]:
+                    distances[neighbor] = candidate
+                    heapq.heappush(heap, (candidate, neighbor))
+        result = np.asarray(distances, dtype=np.float64)
+        if remaining is not None:
+            result[np.frombuffer(bytes(settled), dtype=np.uint8) == 0] = math.inf
+        return result
+    
+    def _adjacency(self, reverse: bool = False):
+        # Plain lists: element access is much faster than on numpy arrays in
+        # the search loops
+        attribute = "_reverse_lists" if reverse else "_forward_lists"
+        lists = self.__dict__.get(attribute)
+        if lists is None:
+            lists = tuple(array.tolist() for array in (self.reverse if reverse else self.forward))
+            setattr(self, attribute, lists)
+        return lists
+
+
+class Router:
+    """
+    Shortest-path distance queries on a RoadGraph.
+    
+    `preprocess()` picks `landmarks` far-apart landmark nodes and stores the
+    distances from and to each of them; by the triangle inequality these give
+    A* a lower bound on the remaining distance that is much tighter than
+    straight-line distance on a road network (ALT).
+    
+    `distances()` answers a whole batch. Pairs of named places (when there
+    are at most `max_places`) are read from an all-pairs table whose row for
+    an origin is filled by one Dijkstra search the first time that origin is
+    used, so only the places actually used cost anything; `save()` keeps the
+    filled rows for later runs. Other origins with at least `hub_min_targets`
+    distinct destinations get one full Dijkstra row (the `max_hub_rows` most
+    recent rows are kept). Origins with several destinations get one Dijkstra
+    search that stops once all of them are settled, and origins with a single
+    destination run A*.
+    """
+    
+    def __init__(self, graph: RoadGraph, landmarks: int = DEFAULT_LANDMARKS,
+                 hub_min_targets: int = DEFAULT_HUB_MIN_TARGETS,
+                 max_hub_rows: int = DEFAULT_MAX_HUB_ROWS, max_places: int = DEFAULT_MAX_PLACES):
+        """
+        Initialize the router (call `preprocess()` or `load_preprocessed()` next).
+        
+        Args:
+            graph: Road network
+            landmarks: Number of ALT landmarks
+            hub_min_targets: Distinct destinations per origin above which a
+                full distance row is computed
+            max_hub_rows: Number of full distance rows kept in memory
+            max_places: Maximum number of named places for the all-pairs
+                table (networks with more get no table)
+        """
+        self.graph = graph
+        self.n_landmarks = landmarks
+        self.hub_min_targets = hub_min_targets
+        self.max_hub_rows = max_hub_rows
+        self.max_places = max_places
+        self._set_landmarks(np.zeros(0, dtype=np.int64), np.zeros((graph.n_nodes, 0)), np.zeros((graph.n_nodes, 0)))
+        self.place_nodes = np.zeros(0, dtype=np.int64)
+        self.place_table = np.zeros((0, 0))
+        self._place_index = np.full(graph.n_nodes, -1, dtype=np.int64)
+        self._hub_rows = OrderedDict()
+        self.counts = {"table": 0, "hub_row": 0, "one_to_many": 0, "astar": 0, "unreachable": 0}
+        self.cache_file = None
+        self._table_changed = False
+    
+    def preprocess(self, seed: int = 0):
+        """
+        Choose landmarks, compute their distances and set up the place table.
+        """
+        graph = self.graph
+        from_landmarks, to_landmarks, landmarks = [], [], []
+        if graph.n_nodes and self.n_landmarks:
+            # Farthest-point selection: each landmark is the node farthest from
+            # the ones chosen so far
+            start = int(np.random.default_rng(seed).integers(graph.n_nodes))
+            closest = graph.shortest_paths(start)
+            for _ in range(min(self.n_landmarks, graph.n_nodes)):
+                landmark = int(np.argmax(np.where(np.isfinite(closest), closest, -1.0)))
+                if landmark in landmarks:
+                    break
+                landmarks.append(landmark)
+                from_landmarks.append(graph.shortest_paths(landmark))
+                to_landmarks.append(graph.shortest_paths(landmark, reverse=True))
+                closest = from_landmarks[0] if len(landmarks) == 1 else np.minimum(closest, from_landmarks[-1])
+        
+        self._set_landmarks(
+            np.asarray(landmarks, dtype=np.int64),
+            np.stack(from_landmarks, axis=1) if landmarks else np.zeros((graph.n_nodes, 0)),
+            np.stack(to_landmarks, axis=1) if landmarks else np.zeros((graph.n_nodes, 0))
+        )
+        
+        place_nodes = np.unique(np.fromiter(graph.places.values(), dtype=np.int64, count=len(graph.places)))
+        if len(place_nodes) > self.max_places:
+            # e.g. an edge list whose numeric node ids all count as names
+            place_nodes = place_nodes[:0]
+        # NaN rows are filled on first use
+        self._set_place_table(place_nodes, np.full((len(place_nodes), len(place_nodes)), np.nan))
+        return self
+    
+    def save(self, path=None):
+        """
+        Write the preprocessing results (landmarks and place table) to an .npz file.
+        
+        Args:
+            path: Output file (defaults to the cache file set by `load_router()`)
+        """
+        path = Path(path or self.cache_file)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Written under a temporary name first, so readers never see a partial file
+        tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+        np.savez(
+            tmp_path,
+            landmarks=self.landmarks,
+            from_landmarks=self._from_landmarks,
+            to_landmarks=self._to_landmarks,
+            place_nodes=self.place_nodes,
+            place_table=self.place_table
+        )
+        os.replace(tmp_path, path)
+        self._table_changed = False
+    
+    def save_if_changed(self):
+        """
+        Write the cache file again if place-table rows were filled since loading.
+        """
+        if self.cache_file is not None and self._table_changed:
+            self.save()
+    
+    def load_preprocessed(self, path):
+        """
+        Read preprocessing results written by `save()` for the same graph.
+        """
+        with np.load(path) as state:
+            self._set_landmarks(state["landmarks"], state["from_landmarks"], state["to_landmarks"])
+            self._set_place_table(state["place_nodes"], state["place_table"])
+        return self
+    
+    def distance(self, source: int, target: int):
+        """
+        Shortest distance in km from node `source` to node `target` (inf if unreachable).
+        """
+        return float(self.distances([source], [target])[0])
+    
+    def distances(self, sources, targets):
+        """
+        Shortest distances for a batch of (source, target) node pairs.
+        
+        Args:
+            sources: Array-like of start nodes (-1 for unresolved)
+            targets: Array-like of end nodes (-1 for unresolved)
+            
+        Returns:
+            float64 array of distances in km: NaN for unresolved pairs, inf
+            for unreachable ones
+        """
+        sources = np.atleast_1d(np.asarray(sources, dtype=np.int64))
+        targets = np.atleast_1d(np.asarray(targets, dtype=np.int64))
+        result = np.full(len(sources), np.nan)
+        valid = (sources >= 0) & (targets >= 0)
+        
+        source_places = np.where(valid, self._place_index[np.maximum(sources, 0)], -1)
+        target_places = np.where(valid, self._place_index[np.maximum(targets, 0)], -1)
+        in_table = (source_places >= 0) & (target_places >= 0)
+        for place in np.unique(source_places[in_table]).tolist():
+            if np.isnan(self.place_table[place, place]):
+                self._fill_place_row(place)
+        result[in_table] = self.place_table[source_places[in_table], target_places[in_table]]
+        self.counts["table"] += int(in_table.sum())
+        
+        pending = valid & ~in_table
+        if pending.any():
+            n_nodes = self.graph.n_nodes
+            pairs, inverse = np.unique(sources[pending] * n_nodes + targets[pending], return_inverse=True)
+            pair_sources, pair_targets = pairs // n_nodes, pairs % n_nodes
+            pair_distances = np.empty(len(pairs))
+            
+            # Pairs are sorted by source, so each origin's destinations are contiguous
+            origins, starts, targets_per_origin = np.unique(
+                pair_sources, return_index=True, return_counts=True
+            )
+            hubs = set(origins[targets_per_origin >= self.hub_min_targets].tolist()) | set(self._hub_rows)
+            for source, start, count in zip(origins.tolist(), starts.tolist(), targets_per_origin.tolist()):
+                group = slice(start, start + count)
+                group_targets = pair_targets[group]
+                if source in hubs:
+                    pair_distances[group] = self._hub_row(source)[group_targets]
+                    self.counts["hub_row"] += count
+                elif count > 1:
+                    # One search, stopped once all of this origin's destinations are settled
+                    distances = self.graph.shortest_paths(source, targets=group_targets.tolist())
+                    pair_distances[group] = distances[group_targets]
+                    self.counts["one_to_many"] += count
+                else:
+                    pair_distances[start] = self._astar(source, int(group_targets[0]))
+                    self.counts["astar"] += 1
+            result[pending] = pair_distances[inverse.ravel()]
+        
+        self.counts["unreachable"] += int(np.isinf(result).sum())
+        return result
+    
+    def stats(self):
+        """
+        Pairs answered by each method so far, and the preprocessing sizes.
+        """
+        return {
+            **self.counts,
+            "nodes": self.graph.n_nodes,
+            "edges": self.graph.n_edges,
+            "landmarks": len(self.landmarks),
+            "places": len(self.place_nodes),
+            "place_rows": int((~np.isnan(np.diag(self.place_table))).sum())
+        }
+    
+    def _set_landmarks(self, landmarks, from_landmarks, to_landmarks):
+        self.landmarks = landmarks
+        self._from_landmarks = from_landmarks
+        self._to_landmarks = to_landmarks
+        # Flat row-major (node, landmark) views for the A* loop: reading single
+        # values is much faster than a NumPy call per expanded node, and unlike
+        # lists the views take no extra memory
+        self._from_flat = memoryview(np.ascontiguousarray(from_landmarks, dtype=np.float64).ravel())
+        self._to_flat = memoryview(np.ascontiguousarray(to_landmarks, dtype=np.float64).ravel())
+    
+    def _set_place_table(self, place_nodes, table):
+        self.place_nodes = np.asarray(place_nodes, dtype=np.int64)
+        self.place_table = np.asarray(table, dtype=np.float64)
+        self._place_index = np.full(self.graph.n_nodes, -1, dtype=np.int64)
+        self._place_index[self.place_nodes] = np.arange(len(self.place_nodes))
+    
+    def _fill_place_row(self, place: int):
+        distances = self.graph.shortest_paths(int(self.place_nodes[place]), targets=self.place_nodes.tolist())
+        self.place_table[place] = distances[self.place_nodes]
+        self._table_changed = True
+    
+    def _hub_row(self, source: int):
+        row = self._hub_rows.get(source)
+        if row is None:
+            row = self._hub_rows[source] = self.graph.shortest_paths(source)
+            while len(self._hub_rows) > self.max_hub_rows:
+                self._hub_rows.popitem(last=False)
+        else:
+            self._hub_rows.move_to_end(source)
+        return row
+    
+    def _astar(self, source: int, target: int):
+        if source == target:
+            return 0.0
+        indptr, indices, weights = self.graph._adjacency()
+        from_landmarks, to_landmarks = self._from_flat, self._to_flat
+        n_landmarks = len(self.landmarks)
+        offset = target * n_landmarks
+        target_rows = list(zip(
+            from_landmarks[offset:offset + n_landmarks].tolist(),
+            to_landmarks[offset:offset + n_landmarks].tolist()
+        ))
+        bounds = {}
+        
+        def bound(node):
+            # d(v, t) >= d(L, t) - d(L, v) and d(v, t) >= d(v, L) - d(t, L);
+            # NaN (inf - inf) fails both comparisons and carries no information
+            estimate = bounds.get(node)
+            if estimate is None:
+                estimate = 0.0
+                row = node * n_landmarks
+                for landmark, (from_target, to_target) in enumerate(target_rows):
+                    forward = from_target - from_landmarks[row + landmark]
+                    backward = to_landmarks[row + landmark] - to_target
+                    if forward > estimate:
+                        estimate = forward
+                    if backward > estimate:
+                        estimate = backward
+                bounds[node] = estimate
+            return estimate
+        
+        distances = {source: 0.0}
+        settled = set()
+        heap = [(bound(source), 0.0, source)]
+        while heap:
+            _, distance, node = heapq.heappop(heap)
+            if node == target:
+                return distance
+            if node in settled:
+                continue
+            settled.add(node)
+            for edge in range(indptr[node], indptr[node + 1]):
+                neighbor = indices[edge]
+                candidate = distance + weights[edge]
+                if candidate < distances.get(neighbor, math.inf):
+                    estimate = bound(neighbor)
+                    if estimate != math.inf:
+                        distances[neighbor] = candidate
+                        heapq.heappush(heap, (candidate + estimate, candidate, neighbor))
+        return math.inf
+
+
+def load_router(graph_file, nodes_file=None, cache_dir=".cache/routing",
+                landmarks: int = DEFAULT_LANDMARKS, **kwargs):
+    """
+    Load a road network and its preprocessing, reusing cached preprocessing.
+    
+    Files ending in .osm are read as OpenStreetMap XML, anything else as a
+    CSV edge list (see `RoadGraph.from_csv()`). Preprocessing is cached in
+    `cache_dir` under a hash of the network files' content and the landmark
+    count, so it only runs again when the network changes; call
+    `Router.save_if_changed()` after querying to keep new place-table rows.
+    
+    Args:
+        graph_file: Road network file
+        nodes_file: Optional nodes CSV for an edge list
+        cache_dir: Directory of cached preprocessing results (None disables caching)
+        landmarks: Number of ALT landmarks
+        **kwargs: Other Router settings
+        
+    Returns:
+        Preprocessed Router
+    """
+    if str(graph_file).lower().endswith(".osm"):
+        graph = RoadGraph.from_osm(graph_file)
+    else:
+        graph = RoadGraph.from_csv(graph_file, nodes_file)
+    router = Router(graph, landmarks=landmarks, **kwargs)
+    
+    if cache_dir is None:
+        return router.preprocess()
+    digest = hashlib.sha256(f"v{CACHE_VERSION}:{landmarks}:{router.max_places}".encode())
+    for path in (graph_file, nodes_file):
+        if path is not None:
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+    router.cache_file = Path(cache_dir) / f"{digest.hexdigest()[:32]}.npz"
+    if router.cache_file.exists():
+        return router.load_preprocessed(router.cache_file)
+    
+    router.preprocess()
+    router.save()
+    return router
+
+
+def fill_route_distances(data, output_file, router: Router, overwrite: bool = False,
+                         chunk_rows: int = 100_000):
+    """
+    Copy a route JSONL file, filling `optimal_route_distance_km` from the road network.
+    
+    Rows are located by their `origin`/`destination` place names, or by
+    `origin_lat`/`origin_lon` and `destination_lat`/`destination_lon`
+    coordinates (snapped to the nearest road node) when present. Each chunk
+    is answered with one `Router.distances()` batch.
+    
+    Args:
+        data: Path to the route optimization JSONL file
+        output_file: Where to write the completed rows
+        router: Preprocessed Router
+        overwrite: Replace distances already present in the data
+        chunk_rows: Rows routed per batch
+        
+    Returns:
+        Dictionary with the number of rows, rows filled, rows that kept their
+        own distance and rows that could not be routed
+    """
+    graph = router.graph
+    place_nodes = {}
+    
+    def resolve(row, prefix):
+        lat, lon = row.get(f"{prefix}_lat"), row.get(f"{prefix}_lon")
+        if lat is not None and lon is not None:
+            return int(graph.nearest_nodes(lat, lon)[0])
+        name = row.get(prefix)
+        if name not in place_nodes:
+            node = graph.place_node(name)
+            place_nodes[name] = -1 if node is None else node
+        return place_nodes[name]
+    
+    stats = {"rows": 0, "filled": 0, "kept": 0, "unresolved": 0}
+    with open(output_file, "w", encoding="utf-8") as out:
+        for chunk in iter_jsonl_chunks(data, chunk_rows=chunk_rows):
+            needs_route = [
+                overwrite or not isinstance(row.get("optimal_route_distance_km"), (int, float))
+                for row in chunk
+            ]
+            routed = [row for row, needed in zip(chunk, needs_route) if needed]
+            distances = router.distances(
+                [resolve(row, "origin") for row in routed],
+                [resolve(row, "destination") for row in routed]
+            )
+            for row, distance in zip(routed, distances.tolist()):
+                if math.isfinite(distance):
+                    row["optimal_route_distance_km"] = round(distance, 1)
+                    stats["filled"] += 1
+                else:
+                    stats["unresolved"] += 1
+            stats["rows"] += len(chunk)
+            stats["kept"] += len(chunk) - len(routed)
+            out.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in chunk)
+    router.save_if_changed()
+    return stats
+
+
+class _GridIndex:
+    """
+    Nodes bucketed by latitude/longitude cell for nearest-node lookups.
+    """
+    
+    def __init__(self, lat, lon):
+        self.lat, self.lon = lat, lon
+        located = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+        cells = self._cells(lat[located], lon[located])
+        order = np.argsort(cells, kind="stable")
+        self._nodes = located[order]
+        self._keys, self._starts = np.unique(cells[order], return_index=True)
+        self._ends = np.append(self._starts[1:], len(order))
+    
+    @staticmethod
+    def _cells(lat, lon):
+        return (np.floor(lat / _GRID_DEGREES).astype(np.int64) * 100_000
+                + np.floor(lon / _GRID_DEGREES).astype(np.int64))
+    
+    def nearest(self, lat: float, lon: float):
+        if not len(self._nodes) or not (math.isfinite(lat) and math.isfinite(lon)):
+            return -1
+        row, column = math.floor(lat / _GRID_DEGREES), math.floor(lon / _GRID_DEGREES)
+        # Grow the searched square until it holds a node, then search one ring
+        # further since a node in a neighbouring cell can be closer
+        for radius in range(_MAX_GRID_RADIUS):
+            if len(self._square(row, column, radius)):
+                candidates = self._square(row, column, radius + 1)
+                break
+        else:
+            candidates = self._nodes
+        distances = haversine_km(lat, lon, self.lat[candidates], self.lon[candidates])
+        return int(candidates[np.argmin(distances)])
+    
+    def _square(self, row: int, column: int, radius: int):
+        keys = np.array([
+            (row + d_row) * 100_000 + column + d_column
+            for d_row in range(-radius, radius + 1)
+            for d_column in range(-radius, radius + 1)
+        ], dtype=np.int64)
+        positions = np.searchsorted(self._keys, keys)
+        found = positions < len(self._keys)
+        found[found] = self._keys[positions[found]] == keys[found]
+        if not found.any():
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([
+            self._nodes[self._starts[position]:self._ends[position]] for position in positions[found]
+        ])
+
+
+def _csr(sources, targets, lengths, n_nodes: int):
+    order = np.argsort(sources, kind="stable")
+    indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n_nodes), out=indptr[1:])
+    return indptr, targets[order], lengths[order]
+
+
+def _osm_tags(element):
+    return {tag.get("k"): tag.get("v") for tag in element.iter("tag")}
@@ -0,0 +1,340 @@
+"""
+Stratified Sampling
+===================
+
+Selects a stratified random sample of a dataset for the expensive LLM-judged
+evaluators and estimates their population means with confidence intervals.
+The sample size is derived from a target margin of error, and the sample is
+spread over strata (e.g. agent, day and query category) in proportion to
+their size, so every segment of the traffic is represented.
+"""
+
+import json
+import math
+from array import array
+from statistics import NormalDist
+
+import numpy as np
+
+from streaming import iter_jsonl_chunks
+
+DEFAULT_STRATA = ("agent_id", "day", "query_category")
+DEFAULT_CONFIDENCE = 0.95
+# Worst-case standard deviation of a score on a 1-5 scale (half the range)
+DEFAULT_SCORE_STD = 2.0
+
+# Keyword rules for rows without a `query_category`, checked in order
+QUERY_CATEGORY_KEYWORDS = (
+    ("complaint", ("تأخر", "اتأخر", "متأخر", "شكوى", "مشكلة", "تالف", "مكسور", "السبب")),
+    ("refrigeration", ("مبرد", "تبريد", "مثلج")),
+    ("storage", ("تخزين", "مستودع", "مخزن")),
+    ("tracking", ("أين", "فين", "تتبع", "شحنتي", "وصلت", "موعد الوصول")),
+    ("pricing", ("تكلفة", "سعر", "أسعار", "كم", "عرض")),
+)
+
+
+def classify_query(text: str):
+    """
+    Heuristic query category of a customer message (for exports that do not
+    carry one): "complaint", "refrigeration", "storage", "tracking",
+    "pricing" or "other".
+    """
+    text = text or ""
+    for category, keywords in QUERY_CATEGORY_KEYWORDS:
+        if any(keyword in text for keyword in keywords):
+            return category
+    return "other"
+
+
+def _day(row: dict):
+    timestamp = row.get("timestamp")
+    return str(timestamp)[:10] if timestamp else None
+
+
+def _query_category(row: dict):
+    return row.get("query_category") or classify_query(row.get("customer_query"))
+
+
+# Stratum fields computed from other row fields
+DERIVED_FIELDS = {"day": _day, "query_category": _query_category}
+
+
+def stratum_key(row: dict, strata=DEFAULT_STRATA):
+    """
+    Stratum of a row: the values of the stratum fields, with missing values
+    grouped under "unknown".
+    """
+    key = []
+    for field in strata:
+        value = DERIVED_FIELDS[field](row) if field in DERIVED_FIELDS else row.get(field)
+        key.append("unknown" if value is None or value == "" else str(value))
+    return tuple(key)
+
+
+def required_sample_size(margin: float, confidence: float = DEFAULT_CONFIDENCE,
+                         std: float = DEFAULT_SCORE_STD, population: int = None):
+    """
+    Rows needed to estimate a mean within ±`margin` at the given confidence.
+    
+    Uses n0 = (z * std / margin)^2 with a finite population correction.
+    Proportional stratified sampling is at least as precise as simple random
+    sampling, so the result is an upper bound for the stratified design.
+    
+    Args:
+        margin: Target half-width of the confidence interval (score points)
+        confidence: Confidence level, e.g. 0.95
+        std: Expected standard deviation of the scores (defaults to the worst
+            case of a 1-5 scale)
+        population: Number of rows in the dataset, if known
+        
+    Returns:
+        Sample size (at most `population`)
+    """
+    if margin <= 0:
+        raise ValueError("margin must be positive")
+    if not 0 < confidence < 1:
+        raise ValueError("confidence must be between 0 and 1")
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    n0 = (z * std / margin) ** 2
+    if population is None:
+        return math.ceil(n0)
+    return min(population, math.ceil(n0 / (1 + (n0 - 1) / max(population, 1))))
+
+
+def allocate_sample(stratum_sizes, sample_size: int):
+    """
+    Split a sample over strata in proportion to their size.
+    
+    Shares are rounded by largest remainder. When there are at most
+    `sample_size` strata, each stratum gets at least one row.
+    
+    Args:
+        stratum_sizes: Array of rows per stratum
+        sample_size: Total number of rows to sample
+        
+    Returns:
+        Array of sampled rows per stratum
+    """
+    sizes = np.asarray(stratum_sizes, dtype=np.int64)
+    sample_size = min(int(sample_size), int(sizes.sum()))
+    if sample_size <= 0:
+        return np.zeros_like(sizes)
+    
+    minimum = np.ones_like(sizes) if len(sizes) <= sample_size else np.zeros_like(sizes)
+    minimum = np.minimum(minimum, sizes)
+    exact = (sample_size - minimum.sum()) * (sizes - minimum) / max((sizes - minimum).sum(), 1)
+    allocation = minimum + np.floor(exact).astype(np.int64)
+    
+    # Hand out the rows lost to rounding, largest remainders first
+    remainders = exact - np.floor(exact)
+    for index in np.argsort(-remainders, kind="stable"):
+        if allocation.sum() >= sample_size:
+            break
+        if allocation[index] < sizes[index]:
+            allocation[index] += 1
+    return allocation
+
+
+class StratifiedSample:
+    """
+    A drawn sample: population and sample size of every stratum, and the
+    stratum of each sampled row (in the order of the sample file).
+    """
+    
+    def __init__(self, strata, keys, population_sizes, sample_sizes, row_strata):
+        self.strata = tuple(strata)
+        self.keys = list(keys)
+        self.population_sizes = np.asarray(population_sizes, dtype=np.int64)
+        self.sample_sizes = np.asarray(sample_sizes, dtype=np.int64)
+        self.row_strata = np.asarray(row_strata, dtype=np.int64)
+    
+    @classmethod
+    def unstratified(cls, rows: int):
+        """
+        Every row of a dataset, as one stratum.
+        """
+        return cls((), [()], [rows], [rows], np.zeros(rows, dtype=np.int64))
+    
+    def take(self, indices):
+        """
+        The sub-sample made of the sampled rows at `indices` (in that order).
+        """
+        row_strata = self.row_strata[np.asarray(indices, dtype=np.int64)]
+        return StratifiedSample(
+            self.strata, self.keys, self.population_sizes,
+            np.bincount(row_strata, minlength=len(self.keys)), row_strata
+        )
+    
+    @property
+    def population(self):
+        return int(self.population_sizes.sum())
+    
+    @property
+    def size(self):
+        return int(self.sample_sizes.sum())
+    
+    def to_dict(self):
+        return {
+            "strata": list(self.strata),
+            "population": self.population,
+            "sample_size": self.size,
+            "stratum_count": len(self.keys),
+            "sampled_strata": int((self.sample_sizes > 0).sum()),
+            "allocation": [
+                {"stratum": list(key), "population": int(population), "sampled": int(sampled)}
+                for key, population, sampled in zip(self.keys, self.population_sizes, self.sample_sizes)
+            ]
+        }
+
+
+def draw_stratified_sample(data, output_file, sample_size: int, strata=DEFAULT_STRATA,
+                           seed: int = 42, chunk_rows: int = 10_000):
+    """
+    Write a stratified random sample of a JSONL dataset to a new JSONL file.
+    
+    The file is read twice: once to size the strata and once to copy the
+    selected rows, which keep their original order. Only one stratum id per
+    row is held in memory. The same data, size and seed give the same sample.
+    
+    Args:
+        data: Path to the JSONL dataset
+        output_file: Where to write the sampled rows
+        sample_size: Total number of rows to sample, or a function of the
+            number of rows in the dataset returning it
+        strata: Stratum fields (see `stratum_key()`)
+        seed: Random seed
+        chunk_rows: Number of rows read per chunk
+        
+    Returns:
+        StratifiedSample describing the sample
+    """
+    ids = {}
+    row_ids = array("q")
+    for chunk in iter_jsonl_chunks(data, chunk_rows=chunk_rows):
+        row_ids.extend(ids.setdefault(stratum_key(row, strata), len(ids)) for row in chunk)
+    row_ids = np.frombuffer(row_ids, dtype=np.int64) if row_ids else np.zeros(0, dtype=np.int64)
+    keys = list(ids)
+    population_sizes = np.bincount(row_ids, minlength=len(keys))
+    if callable(sample_size):
+        sample_size = sample_size(len(row_ids))
+    allocation = allocate_sample(population_sizes, sample_size)
+    
+    rng = np.random.default_rng(seed)
+    selected = np.zeros(len(row_ids), dtype=bool)
+    order = np.argsort(row_ids, kind="stable")
+    bounds = np.concatenate([[0], np.cumsum(population_sizes)])
+    for stratum, count in enumerate(allocation):
+        if count:
+            members = order[bounds[stratum]:bounds[stratum + 1]]
+            selected[rng.choice(members, size=int(count), replace=False)] = True
+    
+    position = 0
+    with open(output_file, "w", encoding="utf-8") as out:
+        for chunk in iter_jsonl_chunks(data, chunk_rows=chunk_rows):
+            for row, keep in zip(chunk, selected[position:position + len(chunk)]):
+                if keep:
+                    out.write(json.dumps(row, ensure_ascii=False) + "\n")
+            position += len(chunk)
+    
+    return StratifiedSample(strata, keys, population_sizes, allocation, row_ids[selected])
+
+
+def stratified_estimate(values, row_strata, population_sizes, confidence: float = DEFAULT_CONFIDENCE):
+    """
+    Stratified estimate of a population mean with a confidence interval.
+    
+    The mean is the population-weighted mean of the stratum means; its
+    variance is sum(W_h^2 * (1 - n_h / N_h) * s_h^2 / n_h). Strata with a
+    single scored row borrow the pooled within-stratum variance. Rows without
+    a score (None or NaN, e.g. failed judge calls) are left out, and strata
+    without any scored row are left out of the weights; `coverage` is the
+    population share of the strata that remain.
+    
+    Args:
+        values: Scores of the sampled rows
+        row_strata: Stratum id of each sampled row
+        population_sizes: Rows per stratum in the population
+        confidence: Confidence level of the interval
+        
+    Returns:
+        Dictionary with "mean", "stderr", "ci_lower", "ci_upper", "margin",
+        "n" and "coverage" (None values when nothing was scored)
+    """
+    values = np.asarray([np.nan if value is None else value for value in values], dtype=np.float64)
+    row_strata = np.asarray(row_strata, dtype=np.int64)
+    population_sizes = np.asarray(population_sizes, dtype=np.float64)
+    scored = ~np.isnan(values)
+    values, row_strata = values[scored], row_strata[scored]
+    
+    strata = len(population_sizes)
+    n = np.bincount(row_strata, minlength=strata).astype(np.float64)
+    sums = np.bincount(row_strata, weights=values, minlength=strata)
+    squares = np.bincount(row_strata, weights=values * values, minlength=strata)
+    covered = n > 0
+    if not covered.any():
+        return {"mean": None, "stderr": None, "ci_lower": None, "ci_upper": None,
+                "margin": None, "n": 0, "coverage": 0.0}
+    
+    means = np.divide(sums, n, out=np.zeros(strata), where=covered)
+    variances = np.divide(squares - n * means * means, n - 1, out=np.full(strata, np.nan), where=n > 1)
+    variances = np.maximum(variances, 0.0)
+    
+    replicated = n > 1
+    if replicated.any():
+        pooled = float(np.sum((n[replicated] - 1) * variances[replicated]) / np.sum(n[replicated] - 1))
+    else:
+        pooled = float(np.var(values, ddof=1)) if len(values) > 1 else 0.0
+    variances = np.where(covered & ~replicated, pooled, variances)
+    
+    weights = np.where(covered, population_sizes, 0.0)
+    weights /= weights.sum()
+    sampling_fraction = np.divide(n, population_sizes, out=np.ones(strata), where=population_sizes > 0)
+    mean = float(np.sum(weights * means))
+    variance = float(np.sum(np.where(
+        covered, weights ** 2 * (1 - np.minimum(sampling_fraction, 1.0)) * variances / np.maximum(n, 1), 0.0
+    )))
+    stderr = math.sqrt(variance)
+    margin = NormalDist().inv_cdf(0.5 + confidence / 2) * stderr
+    return {
+        "mean": mean,
+        "stderr": stderr,
+        "ci_lower": mean - margin,
+        "ci_upper": mean + margin,
+        "margin": margin,
+        "n": int(n.sum()),
+        "coverage": float(population_sizes[covered].sum() / population_sizes.sum())
+    }
+
+
+def estimate_sampled_metrics(records, sample: StratifiedSample, evaluator_names,
+                             confidence: float = DEFAULT_CONFIDENCE):
+    """
+    Stratified estimates of every numeric output of the sampled evaluators.
+    
+    Args:
+        records: Row records of the sample run ("outputs.<evaluator>.<metric>"),
+            in sample file order
+        sample: The StratifiedSample the records were evaluated on
+        evaluator_names: Names of the evaluators that ran on the sample
+        confidence: Confidence level of the intervals
+        
+    Returns:
+        Dictionary mapping "<evaluator>.<metric>" to its `stratified_estimate()`
+    """
+    if len(records) != len(sample.row_strata):
+        raise ValueError(
+            f"Sample run returned {len(records)} rows for a sample of {len(sample.row_strata)}"
+        )
+    prefixes = tuple(f"outputs.{name}." for name in evaluator_names)
+    columns = {}
+    for index, record in enumerate(records):
+        for key, value in record.items():
+            if key.startswith(prefixes) and isinstance(value, (int, float)) and not isinstance(value, bool):
+                columns.setdefault(key, [None] * len(records))[index] = value
+    
+    return {
+        key[len("outputs."):]: stratified_estimate(
+            values, sample.row_strata, sample.population_sizes, confidence
+        )
+        for key, values in columns.items()
+    }
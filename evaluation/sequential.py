@@ -0,0 +1,194 @@
+"""
+Sequential Early Stopping
+=========================
+
+Feeds rows to the LLM evaluators in a random order and stops as soon as the
+tracked metrics are known well enough: every confidence interval is narrower
+than a target width, or the mean is confidently above or below its release
+gate. The rows judged so far are a simple random sample of the pool, so their
+mean is an unbiased estimate of the pool's mean.
+"""
+
+import math
+from array import array
+from statistics import NormalDist
+
+import numpy as np
+
+DEFAULT_MIN_ROWS = 50
+# Rows judged between stopping checks grow geometrically by this factor
+LOOK_GROWTH = 1.5
+
+
+def write_shuffled(data, output_file, seed: int = 42):
+    """
+    Copy the rows of a JSONL file to a new file in a seeded random order.
+    
+    Only the byte offset of each row is held in memory; rows are copied
+    without parsing them.
+    
+    Args:
+        data: Path to the JSONL dataset
+        output_file: Where to write the shuffled rows
+        seed: Random seed
+        
+    Returns:
+        Permutation array: row i of the output is row `permutation[i]` of the input
+    """
+    offsets = array("q")
+    with open(data, "rb") as f:
+        position = 0
+        for line in f:
+            if line.strip():
+                offsets.append(position)
+            position += len(line)
+    
+    permutation = np.random.default_rng(seed).permutation(len(offsets))
+    with open(data, "rb") as source, open(output_file, "wb") as out:
+        for index in permutation:
+            source.seek(offsets[index])
+            line = source.readline()
+            out.write(line if line.endswith(b"\n") else line + b"\n")
+    return permutation
+
+
+class SequentialStopper:
+    """
+    Stopping rule for an evaluation fed rows in random order.
+    
+    Called with the row records of each evaluated chunk, it keeps running
+    means and variances of the tracked metrics ("outputs.<metric>" in the
+    records) and returns True once every metric is decided:
+    
+    - "precise": its confidence interval is narrower than `ci_width`, or
+    - "above_gate" / "below_gate": its interval lies entirely above or below
+      the metric's release gate.
+    
+    Checks happen after `min_rows` rows and then each time the row count has
+    grown by LOOK_GROWTH. Gate decisions use a Bonferroni-adjusted z over the
+    planned checks, so peeking repeatedly does not raise the chance of a wrong
+    pass/fail call above 1 - `confidence`. Variances include the finite
+    population correction for `population` rows.
+    """
+    
+    def __init__(self, metrics, population: int, ci_width: float = None, gates: dict = None,
+                 confidence: float = 0.95, min_rows: int = DEFAULT_MIN_ROWS, pool_rows: int = None):
+        """
+        Initialize the stopper.
+        
+        Args:
+            metrics: Tracked metric names, e.g. "relevance.relevance"
+            population: Number of rows the estimates refer to
+            ci_width: Target full width of each metric's confidence interval
+            gates: Release gate per metric name (metrics without one only use
+                `ci_width`)
+            confidence: Confidence level of the intervals and gate decisions
+            min_rows: Rows judged before the first check
+            pool_rows: Rows available to judge, when they are themselves a
+                sample of the population (defaults to `population`)
+        """
+        gates = gates or {}
+        self.metrics = [
+            metric for metric in metrics if ci_width is not None or metric in gates
+        ]
+        self.population = population
+        self.pool_rows = population if pool_rows is None else pool_rows
+        self.ci_width = ci_width
+        self.gates = {metric: gates[metric] for metric in self.metrics if metric in gates}
+        self.confidence = confidence
+        self.min_rows = min_rows
+        self.rows = 0
+        self.next_look = min_rows
+        self.looks = 0
+        self.decisions = {metric: None for metric in self.metrics}
+        self._moments = {metric: [0, 0.0, 0.0] for metric in self.metrics}
+        
+        planned_looks = 1
+        if self.pool_rows > min_rows:
+            planned_looks += math.ceil(math.log(self.pool_rows / min_rows, LOOK_GROWTH))
+        alpha = 1 - confidence
+        self.z = NormalDist().inv_cdf(1 - alpha / 2)
+        self.gate_z = NormalDist().inv_cdf(1 - alpha / (2 * planned_looks))
+    
+    def __call__(self, records: list):
+        """
+        Add the records of an evaluated chunk.
+        
+        Returns:
+            True when the evaluation can stop
+        """
+        for record in records:
+            for metric in self.metrics:
+                value = record.get(f"outputs.{metric}")
+                if isinstance(value, (int, float)) and not isinstance(value, bool) and not math.isnan(value):
+                    # Welford's running mean and sum of squared deviations
+                    moments = self._moments[metric]
+                    moments[0] += 1
+                    delta = value - moments[1]
+                    moments[1] += delta / moments[0]
+                    moments[2] += delta * (value - moments[1])
+        self.rows += len(records)
+        
+        if not self.metrics or self.rows < self.next_look:
+            return False
+        while self.next_look <= self.rows:
+            self.next_look = max(self.next_look + 1, math.ceil(self.next_look * LOOK_GROWTH))
+        self.looks += 1
+        for metric in self.metrics:
+            self.decisions[metric] = self._decide(metric)
+        return all(self.decisions.values())
+    
+    def interval(self, metric: str, z: float = None):
+        """
+        (mean, lower, upper) of a metric, or None before it has two values.
+        """
+        count, mean, squares = self._moments[metric]
+        if count < 2:
+            return None
+        fpc = max(0.0, 1 - count / self.population) if self.population else 1.0
+        margin = (z or self.z) * math.sqrt(squares / (count - 1) / count * fpc)
+        return mean, mean - margin, mean + margin
+    
+    def _decide(self, metric: str):
+        interval = self.interval(metric)
+        if interval is None:
+            return None
+        if metric in self.gates:
+            _, lower, upper = self.interval(metric, self.gate_z)
+            if lower > self.gates[metric]:
+                return "above_gate"
+            if upper < self.gates[metric]:
+                return "below_gate"
+        if self.ci_width is not None and interval[2] - interval[1] <= self.ci_width:
+            return "precise"
+        return None
+    
+    def report(self, llm_evaluators: int = 1):
+        """
+        Summary of the run: rows judged, calls saved and each metric's decision.
+        
+        Args:
+            llm_evaluators: Number of LLM evaluators judging each row
+        """
+        metrics = {}
+        for metric in self.metrics:
+            interval = self.interval(metric)
+            metrics[metric] = {
+                "decision": self.decisions[metric],
+                "gate": self.gates.get(metric),
+                "rows": self._moments[metric][0],
+                "mean": interval[0] if interval else None,
+                "ci_lower": interval[1] if interval else None,
+                "ci_upper": interval[2] if interval else None
+            }
+        return {
+            "stopped_early": self.rows < self.pool_rows,
+            "rows_judged": self.rows,
+            "rows_available": self.pool_rows,
+            "looks": self.looks,
+            "ci_width": self.ci_width,
+            "confidence": self.confidence,
+            "calls_made": self.rows * llm_evaluators,
+            "calls_saved": (self.pool_rows - self.rows) * llm_evaluators,
+            "metrics": metrics
+        }
@@ -0,0 +1,330 @@
+"""
+Streaming JSONL Ingestion
+=========================
+
+Reads evaluation datasets in bounded-size chunks so peak memory depends on
+the chunk size, not on the size of the file. Used by the fused engine and
+to feed the Azure SDK one chunk at a time.
+"""
+
+import hashlib
+import json
+import math
+import os
+import tempfile
+from pathlib import Path
+
+from prescreen import PrescreenedEvaluator
+from telemetry import InstrumentedEvaluator, get_telemetry
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # orjson is optional; the standard library is slower but equivalent
+    _loads = json.loads
+
+DEFAULT_CHUNK_ROWS = 10_000
+DEFAULT_CHUNK_BYTES = 64 * 1024 * 1024
+
+
+def iter_jsonl_chunks(path, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                      chunk_bytes: int = DEFAULT_CHUNK_BYTES, skip_rows: int = 0):
+    """
+    Parse a JSONL file into chunks of rows.
+    
+    A chunk is emitted as soon as it reaches `chunk_rows` rows or
+    `chunk_bytes` bytes of raw JSON, whichever comes first, so very wide rows
+    cannot blow up memory either.
+    
+    Args:
+        path: Path to the JSONL file
+        chunk_rows: Maximum number of rows per chunk
+        chunk_bytes: Maximum raw size of a chunk in bytes
+        skip_rows: Number of leading rows to skip without parsing them
+        
+    Yields:
+        Lists of row dictionaries
+    """
+    chunk = []
+    size = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            if skip_rows:
+                skip_rows -= 1
+                continue
+            chunk.append(_loads(line))
+            size += len(line)
+            if len(chunk) >= chunk_rows or size >= chunk_bytes:
+                yield chunk
+                chunk = []
+                size = 0
+    if chunk:
+        yield chunk
+
+
+def evaluate_streaming(data, evaluators: dict, evaluator_config: dict, output_path=None,
+                       chunk_rows: int = DEFAULT_CHUNK_ROWS, resume: bool = False,
+                       results_format: str = "jsonl", stop_when=None):
+    """
+    Run `azure.ai.evaluation.evaluate` over a large JSONL file chunk by chunk.
+    
+    The SDK loads its whole input into a DataFrame, so the dataset is split
+    into temporary chunk files that are evaluated one after another. Row
+    results are appended to `eval_results.jsonl` and the mean metrics of all
+    chunks are combined (weighted by rows) into `metrics.json`.
+    
+    After every chunk a `checkpoint.json` with the completed rows, partial
+    aggregates and evaluator states is written to the output directory. With
+    `resume=True` a matching checkpoint is picked up: finished rows are
+    skipped and the final outputs are identical to an uninterrupted run.
+    
+    With `results_format` "parquet" or "arrow", the JSONL results are converted
+    to a columnar file once every chunk is done (the JSONL file is what
+    checkpoints refer to, so it is only removed after the conversion).
+    
+    Evaluators with a `pack_size` above 1 (the packed prompt-based judges)
+    and pre-screened judges get each chunk's rows through `prefetch()` first,
+    so the SDK's row-by-row calls reuse judgements made several rows per LLM
+    call and screening decisions made for the whole chunk at once.
+    
+    Accumulated statistics of code-based evaluators (latency sketches,
+    missing-field counts) are rebuilt from the returned row outputs after
+    every chunk through their `update_from_results()`, so they are right
+    wherever the SDK ran the evaluators. Evaluators with a `prefetch()` (the
+    prompt-based judges and their dedup/pre-screen wrappers) keep prefetched
+    judgements and counters in this process. When the SDK called them fewer
+    times than there were rows (it ran them elsewhere), a warning is printed
+    and they are evaluated without `prefetch()` from then on; their results
+    stay correct, but their printed statistics are incomplete.
+    
+    `stop_when` is called with the row records of every evaluated chunk (on
+    resume, first with the rows restored from the results file); when it
+    returns True the remaining rows are skipped.
+    
+    Args:
+        data: Path to the JSONL dataset
+        evaluators: Mapping of evaluator name to evaluator instance
+        evaluator_config: Per-evaluator config with "column_mapping"
+        output_path: Optional output directory
+        chunk_rows: Number of rows handed to the SDK at a time
+        resume: Continue from the checkpoint in `output_path`, if any
+        results_format: "jsonl", "parquet" or "arrow"
+        stop_when: Optional callable deciding, after each chunk, whether to stop
+        
+    Returns:
+        Dictionary with "metrics", "rows_evaluated", "stopped_early" and "output_path"
+    """
+    from azure.ai.evaluation import evaluate
+    
+    metrics = _WeightedMetrics()
+    rows_evaluated = 0
+    stopped_early = False
+    results_file = None
+    checkpoint = None
+    if output_path is not None:
+        output_path = Path(output_path)
+        output_path.mkdir(parents=True, exist_ok=True)
+        checkpoint = Checkpoint(output_path / "checkpoint.json", data, chunk_rows)
+        results_path = output_path / "eval_results.jsonl"
+        
+        state = checkpoint.load() if resume else None
+        if state is not None:
+            rows_evaluated = state["rows_evaluated"]
+            metrics.totals = state["metrics"]
+            for name, evaluator_state in state["evaluator_states"].items():
+                evaluators[name].load_state_dict(evaluator_state)
+            
+            # Drop rows of a chunk that was interrupted after the last checkpoint
+            results_file = open(results_path, "r+b")
+            results_file.truncate(state["results_bytes"])
+            results_file.seek(0, 2)
+            print(f"⏩ Resuming after {rows_evaluated} completed row(s)")
+            if stop_when is not None:
+                for chunk in iter_jsonl_chunks(results_path, chunk_rows=chunk_rows):
+                    stopped_early = stop_when(chunk)
+        else:
+            results_file = open(results_path, "wb")
+    
+    # The SDK calls evaluators row by row; time every call per evaluator
+    telemetry = get_telemetry()
+    instrumented = {name: InstrumentedEvaluator(evaluator) for name, evaluator in evaluators.items()}
+    
+    # Statistics rebuilt from the row outputs after every chunk
+    stateful = {
+        name: evaluator for name, evaluator in evaluators.items()
+        if hasattr(evaluator, "update_from_results")
+    }
+    # Evaluators whose state only exists in this process
+    in_process = [name for name, evaluator in evaluators.items() if hasattr(evaluator, "prefetch")]
+    
+    packed = {}
+    for name, evaluator in evaluators.items():
+        if getattr(evaluator, "pack_size", 1) > 1 or isinstance(evaluator, PrescreenedEvaluator):
+            from engine import compile_column_mapping
+            
+            packed[evaluator] = compile_column_mapping(
+                evaluator, (evaluator_config or {}).get(name, {}).get("column_mapping", {})
+            )
+    
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            chunk_file = Path(tmp) / "chunk.jsonl"
+            for chunk in iter_jsonl_chunks(data, chunk_rows=chunk_rows, skip_rows=rows_evaluated):
+                if stopped_early:
+                    break
+                with open(chunk_file, "w", encoding="utf-8") as f:
+                    f.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in chunk)
+                
+                with telemetry.span("evaluation.chunk", rows=len(chunk), first_row=rows_evaluated):
+                    for evaluator, getters in packed.items():
+                        evaluator.prefetch([
+                            {param: get(row) for param, get in getters.items()} for row in chunk
+                        ])
+                    snapshots = {name: evaluator.state_dict() for name, evaluator in stateful.items()}
+                    calls = {name: instrumented[name].calls for name in in_process}
+                    result = evaluate(
+                        data=str(chunk_file),
+                        evaluators=instrumented,
+                        evaluator_config=evaluator_config
+                    )
+                
+                missed = [name for name in in_process if instrumented[name].calls - calls[name] < len(chunk)]
+                if missed:
+                    # Copies in other processes never see prefetched judgements,
+                    # so prefetching would only pay for them twice
+                    print(f"⚠️  {', '.join(missed)} evaluated outside this process; continuing "
+                          f"without prefetch (their statistics are incomplete)")
+                    for name in missed:
+                        packed.pop(evaluators[name], None)
+                    in_process = [name for name in in_process if name not in missed]
+                for name, evaluator in stateful.items():
+                    evaluator.reset()
+                    evaluator.load_state_dict(snapshots[name])
+                    evaluator.update_from_results(_output_columns(result.get("rows", []), name))
+                rows_evaluated += len(chunk)
+                metrics.add(result.get("metrics", {}), len(chunk))
+                if stop_when is not None:
+                    stopped_early = bool(stop_when(result.get("rows", [])))
+                
+                if results_file is not None:
+                    results_file.writelines(
+                        (json.dumps(row, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+                        for row in result.get("rows", [])
+                    )
+                    results_file.flush()
+                    os.fsync(results_file.fileno())
+                    checkpoint.save({
+                        "rows_evaluated": rows_evaluated,
+                        "results_bytes": results_file.tell(),
+                        "metrics": metrics.totals,
+                        "evaluator_states": {
+                            name: evaluator.state_dict()
+                            for name, evaluator in evaluators.items()
+                            if hasattr(evaluator, "state_dict")
+                        }
+                    })
+    finally:
+        if results_file is not None:
+            results_file.close()
+    
+    final_metrics = metrics.result()
+    if output_path is not None:
+        if results_format != "jsonl":
+            from columnar import convert_jsonl_results, results_file_name
+            
+            convert_jsonl_results(
+                results_path, output_path / results_file_name(results_format), results_format
+            )
+        with open(output_path / "metrics.json", "w", encoding="utf-8") as f:
+            json.dump(final_metrics, f, ensure_ascii=False, indent=2)
+        checkpoint.clear()
+        if results_format != "jsonl":
+            results_path.unlink()
+    
+    return {
+        "metrics": final_metrics,
+        "rows_evaluated": rows_evaluated,
+        "stopped_early": stopped_early,
+        "output_path": str(output_path) if output_path is not None else None
+    }
+
+
+class Checkpoint:
+    """
+    Progress file of a chunked evaluation run.
+    
+    A checkpoint only applies to the same dataset (identified by its size and
+    a hash of its first and last megabyte) evaluated with the same chunk size,
+    so resumed runs chunk the data exactly like an uninterrupted one.
+    """
+    
+    def __init__(self, path, data, chunk_rows: int):
+        self.path = Path(path)
+        self._identity = {"data": _fingerprint(data), "chunk_rows": chunk_rows}
+    
+    def load(self):
+        """
+        Saved progress for this dataset and chunk size, or None.
+        """
+        if not self.path.exists():
+            return None
+        with open(self.path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("identity") != self._identity:
+            print("⚠️  Checkpoint belongs to different data or settings; starting over")
+            return None
+        return state
+    
+    def save(self, state: dict):
+        """
+        Atomically replace the checkpoint with `state`.
+        """
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"identity": self._identity, **state}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+    
+    def clear(self):
+        """
+        Remove the checkpoint once the run has completed.
+        """
+        self.path.unlink(missing_ok=True)
+
+
+def _fingerprint(path, sample_bytes: int = 1024 * 1024):
+    size = os.path.getsize(path)
+    digest = hashlib.sha256(str(size).encode())
+    with open(path, "rb") as f:
+        digest.update(f.read(sample_bytes))
+        if size > sample_bytes:
+            f.seek(max(sample_bytes, size - sample_bytes))
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _output_columns(rows, name: str):
+    # {"outputs.<name>.<key>": value} row records -> {key: [value per row]}
+    prefix = f"outputs.{name}."
+    keys = {key[len(prefix):] for row in rows for key in row if key.startswith(prefix)}
+    return {key: [row.get(prefix + key) for row in rows] for key in keys}
+
+
+class _WeightedMetrics:
+    """
+    Combines per-chunk mean metrics into dataset-wide means.
+    """
+    
+    def __init__(self):
+        self.totals = {}
+    
+    def add(self, metrics: dict, rows: int):
+        for name, value in metrics.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or math.isnan(value):
+                continue
+            total, weight = self.totals.get(name, (0.0, 0))
+            self.totals[name] = (total + value * rows, weight + rows)
+    
+    def result(self):
+        return {name: total / weight for name, (total, weight) in self.totals.items() if weight}
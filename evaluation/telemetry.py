@@ -0,0 +1,521 @@
+"""
+Evaluation Telemetry
+====================
+
+Per-evaluator instrumentation: call counts, latency histograms, errors,
+retries and LLM token usage, plus spans for runs, suites, evaluator batches
+and LLM calls.
+
+Exported over OTLP/HTTP to the same collector as the backend (see
+TRACING.md: OTEL_EXPORTER_OTLP_ENDPOINT, OTEL_SERVICE_NAME) when the
+OpenTelemetry SDK is installed, otherwise spans are written to a local JSONL
+file. A per-evaluator summary is always written next to the results. A W3C
+`TRACEPARENT` environment variable (e.g. set by the backend job that starts
+the run) makes the evaluation spans part of that trace.
+"""
+
+import contextlib
+import contextvars
+import inspect
+import json
+import os
+import secrets
+import threading
+import time
+from pathlib import Path
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+DEFAULT_OTLP_ENDPOINT = "http://localhost:4318/v1/traces"
+DEFAULT_SERVICE_NAME = "nakl-logistics-evaluation"
+
+_current_file_span = contextvars.ContextVar("current_file_span", default=None)
+
+
+class EvaluatorStats:
+    """
+    Counters and latency histogram of one (evaluator, operation) pair.
+    """
+    
+    def __init__(self):
+        self.calls = 0
+        self.rows = 0
+        self.errors = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+    
+    def record(self, seconds: float, rows: int = 1, error: bool = False):
+        milliseconds = seconds * 1000
+        self.calls += 1
+        self.rows += rows
+        self.errors += int(error)
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        for index, bound in enumerate(LATENCY_BUCKETS_MS):
+            if milliseconds <= bound:
+                self.buckets[index] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+    
+    def percentile_ms(self, q: float):
+        """
+        Upper bound (ms) of the histogram bucket holding the q-th percentile.
+        """
+        if not self.calls:
+            return None
+        rank = q / 100 * self.calls
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else self.max_seconds * 1000
+        return self.max_seconds * 1000
+    
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "rows": self.rows,
+            "errors": self.errors,
+            "retries": self.retries,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_seconds": self.total_seconds,
+            "max_seconds": self.max_seconds,
+            "latency_buckets_ms": list(LATENCY_BUCKETS_MS),
+            "latency_bucket_counts": list(self.buckets)
+        }
+    
+    def merge(self, state: dict):
+        self.calls += state["calls"]
+        self.rows += state["rows"]
+        self.errors += state["errors"]
+        self.retries += state["retries"]
+        self.prompt_tokens += state["prompt_tokens"]
+        self.completion_tokens += state["completion_tokens"]
+        self.total_seconds += state["total_seconds"]
+        self.max_seconds = max(self.max_seconds, state["max_seconds"])
+        self.buckets = [a + b for a, b in zip(self.buckets, state["latency_bucket_counts"])]
+
+
+class Telemetry:
+    """
+    Process-wide collector of evaluator statistics and spans.
+    
+    Modes:
+        "otlp": OpenTelemetry spans and metrics over OTLP/HTTP
+        "file": spans appended to `<output_dir>/spans.jsonl`
+        "off": statistics only
+    """
+    
+    def __init__(self, mode: str = "file", output_dir=None, service_name: str = DEFAULT_SERVICE_NAME,
+                 endpoint: str = DEFAULT_OTLP_ENDPOINT):
+        """
+        Initialize telemetry.
+        
+        Args:
+            mode: "otlp", "file" or "off"
+            output_dir: Directory of the local span file and summary
+            service_name: OpenTelemetry service name
+            endpoint: OTLP/HTTP traces endpoint (metrics go to the matching /v1/metrics)
+        """
+        self.mode = mode
+        self.output_dir = Path(output_dir) if output_dir is not None else None
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._remote_parent = _parse_traceparent(os.getenv("TRACEPARENT"))
+        self._tracer = None
+        self._instruments = None
+        self._providers = ()
+        
+        if mode == "otlp":
+            self._setup_otlp(service_name, endpoint)
+        elif mode == "file" and self.output_dir is not None:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+    
+    def _setup_otlp(self, service_name: str, endpoint: str):
+        from opentelemetry import metrics, trace
+        from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.metrics import MeterProvider
+        from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        
+        resource = Resource.create({
+            "service.name": service_name,
+            "service.version": "1.0.0",
+            "deployment.environment": os.getenv("NODE_ENV", "development")
+        })
+        metrics_endpoint = os.getenv(
+            "OTEL_EXPORTER_OTLP_METRICS_ENDPOINT",
+            endpoint[:-len("/v1/traces")] + "/v1/metrics" if endpoint.endswith("/v1/traces") else endpoint
+        )
+        
+        tracer_provider = TracerProvider(resource=resource)
+        tracer_provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=endpoint)))
+        meter_provider = MeterProvider(
+            resource=resource,
+            metric_readers=[PeriodicExportingMetricReader(OTLPMetricExporter(endpoint=metrics_endpoint))]
+        )
+        # Global, so spans emitted by the Azure SDK and promptflow join the same traces
+        trace.set_tracer_provider(tracer_provider)
+        metrics.set_meter_provider(meter_provider)
+        self._providers = (tracer_provider, meter_provider)
+        
+        self._tracer = tracer_provider.get_tracer("nakl.evaluation")
+        meter = meter_provider.get_meter("nakl.evaluation")
+        self._instruments = {
+            "calls": meter.create_counter("evaluation.evaluator.calls", unit="{call}"),
+            "rows": meter.create_counter("evaluation.evaluator.rows", unit="{row}"),
+            "errors": meter.create_counter("evaluation.evaluator.errors", unit="{error}"),
+            "retries": meter.create_counter("evaluation.evaluator.retries", unit="{retry}"),
+            "tokens": meter.create_counter("evaluation.llm.tokens", unit="{token}"),
+            "duration": meter.create_histogram(
+                "evaluation.evaluator.duration", unit="ms",
+                description="Duration of evaluator calls and batches"
+            )
+        }
+    
+    def _get_stats(self, evaluator: str, operation: str):
+        key = (evaluator, operation)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = EvaluatorStats()
+        return stats
+    
+    def record(self, evaluator: str, operation: str, seconds: float, rows: int = 1, error=None):
+        """
+        Record one call (or one batch of `rows` rows) of an evaluator.
+        
+        Args:
+            evaluator: Evaluator class name (e.g. "CoherenceEvaluator")
+            operation: "call", "batch", "llm" or "parse"
+            seconds: Duration
+            rows: Rows covered by the call
+            error: Exception (or truthy value) when the call failed
+        """
+        with self._lock:
+            self._get_stats(evaluator, operation).record(seconds, rows, bool(error))
+        if self._instruments is not None:
+            attributes = {"evaluator": evaluator, "operation": operation}
+            self._instruments["calls"].add(1, attributes)
+            self._instruments["rows"].add(rows, attributes)
+            self._instruments["duration"].record(seconds * 1000, attributes)
+            if error:
+                self._instruments["errors"].add(
+                    1, {**attributes, "error.type": type(error).__name__}
+                )
+    
+    def record_retry(self, evaluator: str, operation: str = "llm"):
+        """
+        Record a retried call.
+        """
+        with self._lock:
+            self._get_stats(evaluator, operation).retries += 1
+        if self._instruments is not None:
+            self._instruments["retries"].add(1, {"evaluator": evaluator, "operation": operation})
+    
+    def record_tokens(self, evaluator: str, prompt_tokens: int = 0, completion_tokens: int = 0):
+        """
+        Record LLM token usage of an evaluator.
+        """
+        with self._lock:
+            stats = self._get_stats(evaluator, "llm")
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+        if self._instruments is not None:
+            self._instruments["tokens"].add(prompt_tokens, {"evaluator": evaluator, "token.type": "prompt"})
+            self._instruments["tokens"].add(completion_tokens, {"evaluator": evaluator, "token.type": "completion"})
+    
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes):
+        """
+        Context manager creating a span (child of the current one, or of
+        TRACEPARENT for the outermost span). Yields an object with
+        `set_attribute(key, value)`.
+        """
+        if self._tracer is not None:
+            from opentelemetry import trace
+            
+            context = None
+            if not trace.get_current_span().get_span_context().is_valid:
+                context = self._otlp_remote_parent()
+            with self._tracer.start_as_current_span(name, context=context, attributes=attributes) as span:
+                yield span
+        elif self.mode == "file" and self.output_dir is not None:
+            parent = _current_file_span.get()
+            if parent is not None:
+                trace_id, parent_id = parent.trace_id, parent.span_id
+            elif self._remote_parent is not None:
+                trace_id, parent_id = self._remote_parent
+            else:
+                trace_id, parent_id = secrets.token_hex(16), None
+            span = _FileSpan(name, trace_id, parent_id, attributes)
+            token = _current_file_span.set(span)
+            try:
+                yield span
+            except BaseException as error:
+                span.status = {"code": "ERROR", "message": f"{type(error).__name__}: {error}"}
+                raise
+            finally:
+                _current_file_span.reset(token)
+                span.end_time = time.time_ns()
+                self._write_span(span)
+        else:
+            yield _NULL_SPAN
+    
+    def _otlp_remote_parent(self):
+        if self._remote_parent is None:
+            return None
+        from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+        
+        return TraceContextTextMapPropagator().extract({"traceparent": os.environ["TRACEPARENT"]})
+    
+    def _write_span(self, span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n"
+        # One append per span, so processes can share the file
+        with open(self.output_dir / "spans.jsonl", "a", encoding="utf-8") as f:
+            f.write(line)
+    
+    def current_traceparent(self):
+        """
+        W3C traceparent of the current span, to hand to child processes.
+        """
+        if self._tracer is not None:
+            from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+            
+            carrier = {}
+            TraceContextTextMapPropagator().inject(carrier)
+            return carrier.get("traceparent")
+        span = _current_file_span.get()
+        if span is not None:
+            return f"00-{span.trace_id}-{span.span_id}-01"
+        return os.getenv("TRACEPARENT")
+    
+    def snapshot(self, reset: bool = False):
+        """
+        Statistics as a JSON-serializable dictionary keyed "<evaluator>/<operation>".
+        """
+        with self._lock:
+            state = {f"{evaluator}/{operation}": stats.to_dict()
+                     for (evaluator, operation), stats in self._stats.items()}
+            if reset:
+                self._stats = {}
+        return state
+    
+    def merge(self, state: dict):
+        """
+        Merge statistics recorded elsewhere (e.g. in a worker process).
+        """
+        with self._lock:
+            for key, values in state.items():
+                evaluator, operation = key.rsplit("/", 1)
+                self._get_stats(evaluator, operation).merge(values)
+    
+    def summary_rows(self):
+        """
+        Per-evaluator summary rows, slowest total time first.
+        """
+        with self._lock:
+            rows = [
+                {
+                    "evaluator": evaluator,
+                    "operation": operation,
+                    "calls": stats.calls,
+                    "rows": stats.rows,
+                    "errors": stats.errors,
+                    "retries": stats.retries,
+                    "total_seconds": stats.total_seconds,
+                    "p50_ms": stats.percentile_ms(50),
+                    "p95_ms": stats.percentile_ms(95),
+                    "prompt_tokens": stats.prompt_tokens,
+                    "completion_tokens": stats.completion_tokens
+                }
+                for (evaluator, operation), stats in self._stats.items()
+            ]
+        return sorted(rows, key=lambda row: row["total_seconds"], reverse=True)
+    
+    def write_summary(self, path=None):
+        """
+        Write the statistics to `<output_dir>/summary.json` (or `path`).
+        """
+        path = Path(path) if path is not None else (self.output_dir / "summary.json" if self.output_dir else None)
+        if path is None:
+            return None
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        return path
+    
+    def flush(self):
+        """
+        Push pending spans and metrics to the exporters.
+        """
+        for provider in self._providers:
+            provider.force_flush()
+    
+    def shutdown(self):
+        """
+        Flush and stop the exporters.
+        """
+        for provider in self._providers:
+            provider.shutdown()
+
+
+class InstrumentedEvaluator:
+    """
+    Transparent wrapper timing every call of an evaluator we do not own
+    (e.g. the SDK's CoherenceEvaluator) and picking up the token counts it
+    reports (`<metric>_prompt_tokens` / `<metric>_completion_tokens`).
+    
+    `calls` counts the calls made through this instance, i.e. in this
+    process (copies sent to worker processes count their own).
+    
+    `inspect.signature()` follows `__wrapped__`, so the SDK still sees the
+    evaluator's own parameters; other attributes are forwarded.
+    """
+    
+    def __init__(self, evaluator):
+        self._evaluator = evaluator
+        self._label = type(inspect.unwrap(evaluator)).__name__
+        self.__wrapped__ = evaluator
+        self.calls = 0
+        self._lock = threading.Lock()
+    
+    def __call__(self, *args, **kwargs):
+        with self._lock:
+            self.calls += 1
+        telemetry = get_telemetry()
+        started = time.perf_counter()
+        try:
+            result = self._evaluator(*args, **kwargs)
+        except Exception as error:
+            telemetry.record(self._label, "call", time.perf_counter() - started, error=error)
+            raise
+        telemetry.record(self._label, "call", time.perf_counter() - started)
+        
+        if isinstance(result, dict):
+            prompt_tokens = sum(v for k, v in result.items()
+                                if k.endswith("_prompt_tokens") and isinstance(v, int))
+            completion_tokens = sum(v for k, v in result.items()
+                                    if k.endswith("_completion_tokens") and isinstance(v, int))
+            if prompt_tokens or completion_tokens:
+                telemetry.record_tokens(self._label, prompt_tokens, completion_tokens)
+        return result
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+    
+    def __getattr__(self, name):
+        evaluator = self.__dict__.get("_evaluator")
+        if evaluator is None or name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(evaluator, name)
+
+
+class _FileSpan:
+
+    def __init__(self, name: str, trace_id: str, parent_id, attributes: dict):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.status = {"code": "OK"}
+        self.start_time = time.time_ns()
+        self.end_time = None
+    
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+    
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "start_time_unix_nano": self.start_time,
+            "end_time_unix_nano": self.end_time,
+            "duration_ms": (self.end_time - self.start_time) / 1e6,
+            "attributes": self.attributes,
+            "status": self.status,
+            "pid": os.getpid()
+        }
+
+
+class _NullSpan:
+
+    def set_attribute(self, key: str, value):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def _parse_traceparent(value):
+    # "00-<32 hex trace id>-<16 hex parent id>-<flags>" -> (trace id, parent id)
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+_telemetry = None
+_telemetry_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    # Forked workers report their own statistics, which the parent merges
+    global _telemetry_lock
+    _telemetry_lock = threading.Lock()
+    if _telemetry is not None:
+        _telemetry._lock = threading.Lock()
+        _telemetry._stats = {}
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_telemetry():
+    """
+    Process-wide Telemetry configured from the environment.
+    
+    EVALUATION_TELEMETRY selects the mode: "auto" (default; OTLP when the
+    OpenTelemetry SDK and OTLP exporter are installed, local files otherwise),
+    "otlp", "file" or "off". Local files go to
+    `<EVALUATION_OUTPUT_PATH>/telemetry/`.
+    """
+    global _telemetry
+    with _telemetry_lock:
+        if _telemetry is None:
+            mode = os.getenv("EVALUATION_TELEMETRY", "auto")
+            if mode == "auto":
+                try:
+                    import opentelemetry.exporter.otlp.proto.http  # noqa: F401
+                    import opentelemetry.sdk  # noqa: F401
+                    mode = "otlp"
+                except ImportError:
+                    mode = "file"
+            _telemetry = Telemetry(
+                mode=mode,
+                output_dir=Path(os.getenv("EVALUATION_OUTPUT_PATH", "./evaluation_results")) / "telemetry",
+                service_name=os.getenv("OTEL_SERVICE_NAME", DEFAULT_SERVICE_NAME),
+                endpoint=os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", DEFAULT_OTLP_ENDPOINT)
+            )
+        return _telemetry
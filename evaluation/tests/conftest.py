@@ -0,0 +1,166 @@
+"""
+The evaluation modules import each other as top-level modules (they are run
+from this directory), so the tests do the same.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+EVALUATION_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(EVALUATION_DIR))
+# Keep test runs from writing spans into ./evaluation_results
+os.environ.setdefault("EVALUATION_TELEMETRY", "off")
+
+from evaluators import registry  # noqa: E402 (needs the path above)
+from evaluators.prompt_based import CustomerServiceQualityEvaluator, PricingJustificationEvaluator  # noqa: E402
+
+
+class StubLLMServer(ThreadingHTTPServer):
+    """
+    Local OpenAI-compatible chat completions endpoint answering every prompt
+    with a fixed judgement.
+    
+    Prompts containing "FAIL" get an HTTP 500 and prompts containing
+    "GARBLED" get a completion that is not JSON. Packed prompts (a JSON
+    message with a "rows" list) get one entry per row in reverse order,
+    scored 1 + len(response) % 5, leaving out rows whose query contains
+    "SKIP". `max_in_flight` records the highest number of requests handled
+    at the same time.
+    """
+    
+    daemon_threads = True
+    
+    def __init__(self, delay_seconds: float = 0.02):
+        super().__init__(("127.0.0.1", 0), _StubLLMHandler)
+        self.delay_seconds = delay_seconds
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+    
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class _StubLLMHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            time.sleep(server.delay_seconds)
+            if "FAIL" in prompt:
+                self._reply(500, {"error": {"message": "stub failure", "type": "server_error"}})
+                return
+            rows = _packed_rows(prompt)
+            if rows is not None:
+                content = json.dumps({"results": [
+                    {"index": row["index"], "score": 1 + len(row.get("response", "")) % 5,
+                     "reasoning": f"packed stub judgement of row {row['index']}"}
+                    for row in reversed(rows) if "SKIP" not in row.get("query", "")
+                ]})
+            else:
+                content = "not json" if "GARBLED" in prompt else json.dumps(
+                    {"score": 4, "reasoning": f"stub judgement of {len(prompt)} characters"}
+                )
+            self._reply(200, {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": len(prompt) // 3, "completion_tokens": 10, "total_tokens": len(prompt) // 3 + 10}
+            })
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+    
+    def _reply(self, status: int, payload: dict):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+def _packed_rows(prompt: str):
+    try:
+        inputs = json.loads(prompt)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(inputs, dict) or "rows" not in inputs:
+        return None
+    return json.loads(inputs["rows"])
+
+
+@pytest.fixture
+def stub_llm():
+    server = StubLLMServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class ChatCompletionsFlow:
+    """
+    Minimal stand-in for a loaded prompty flow: sends the inputs to an
+    OpenAI-compatible /chat/completions endpoint and returns the completion.
+    """
+    
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+    
+    def __call__(self, **inputs):
+        request = urllib.request.Request(
+            f"{self.base_url}/chat/completions",
+            data=json.dumps({
+                "model": "stub",
+                "messages": [{"role": "user", "content": json.dumps(inputs, ensure_ascii=False)}]
+            }).encode("utf-8"),
+            headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())["choices"][0]["message"]["content"]
+
+
+@pytest.fixture
+def stub_model_config(stub_llm, monkeypatch):
+    # Prompty sources are relative to the evaluation directory
+    monkeypatch.chdir(EVALUATION_DIR)
+    monkeypatch.setattr(CustomerServiceQualityEvaluator, "RETRY_BACKOFF_SECONDS", 0.0)
+    monkeypatch.setattr(PricingJustificationEvaluator, "RETRY_BACKOFF_SECONDS", 0.0)
+    model_config = {"type": "openai", "model": "gpt-4", "base_url": stub_llm.base_url, "api_key": "stub"}
+    yield model_config
+    registry.clear()
+
+
+def register_stub_flows(model_config, base_url):
+    for evaluator in (CustomerServiceQualityEvaluator, PricingJustificationEvaluator):
+        registry.register_flow(evaluator.PROMPTY_SOURCE, model_config, ChatCompletionsFlow(base_url))
+        registry.register_flow(evaluator.PACKED_PROMPTY_SOURCE, model_config, ChatCompletionsFlow(base_url))
@@ -0,0 +1,122 @@
+import math
+
+import numpy as np
+
+from evaluators.code_based import (
+    DataCompletenessEvaluator,
+    PriceAccuracyEvaluator,
+    ResponseTimeEvaluator,
+    RouteOptimalityEvaluator
+)
+
+
+def test_missing_response_time_scores_like_a_slow_response():
+    evaluator = ResponseTimeEvaluator(max_response_time=2.0)
+    
+    result = evaluator(response_time=float("nan"))
+    evaluator(response_time=1.0)
+    
+    assert result["response_time_score"] == 0.0
+    assert not result["is_acceptable"]
+    assert math.isnan(result["response_time_ms"])
+    latency = evaluator.aggregate()
+    assert latency["rows_evaluated"] == 1
+    assert latency["pass_rate"] == 1.0
+
+
+def test_batch_skips_non_finite_latencies():
+    evaluator = ResponseTimeEvaluator(max_response_time=2.0)
+    
+    result = evaluator.evaluate_batch(response_time=[0.5, np.nan, np.inf, 3.0])
+    
+    assert result["response_time_score"].tolist() == [1.0, 0.0, 0.0, 0.0]
+    latency = evaluator.aggregate()
+    assert latency["rows_evaluated"] == 2
+    assert latency["max_ms"] == 3000.0
+
+
+def test_non_finite_latencies_are_left_out_of_the_pass_rate():
+    values = [float("-inf"), 1.0, float("nan"), float("inf"), 3.0]
+    batch = ResponseTimeEvaluator(max_response_time=2.0)
+    scalar = ResponseTimeEvaluator(max_response_time=2.0)
+    
+    result = batch.evaluate_batch(response_time=values)
+    scores = [scalar(response_time=value)["response_time_score"] for value in values]
+    
+    assert result["response_time_score"].tolist() == scores == [0.0, 1.0, 0.0, 0.0, 0.0]
+    for evaluator in (batch, scalar):
+        latency = evaluator.aggregate()
+        assert latency["rows_evaluated"] == 2
+        assert latency["pass_rate"] == 0.5
+    
+    rebuilt = ResponseTimeEvaluator(max_response_time=2.0)
+    rebuilt.update_from_results({
+        "response_time_ms": [value * 1000 for value in values],
+        "is_acceptable": [True, True, False, True, False]
+    })
+    assert rebuilt.aggregate()["pass_rate"] == 0.5
+
+
+def _assert_batch_matches_rows(batch: dict, rows: list):
+    # Every key of the scalar result holds the same value in the batch column
+    for i, row in enumerate(rows):
+        for key, value in row.items():
+            got = batch[key][i]
+            if isinstance(value, float) and math.isnan(value):
+                assert math.isnan(got), (i, key)
+            else:
+                assert got == value, (i, key, got, value)
+
+
+def test_price_batch_matches_scalar_calls():
+    evaluator = PriceAccuracyEvaluator(margin_percent=5.0)
+    nan = float("nan")
+    calculated = [100.0, 104.0, 90.0, 300.0, -50.0, 5.0, 0.0, nan, 100.0]
+    ground_truth = [100.0, 100.0, 100.0, 100.0, 100.0, 0.0, 0.0, 100.0, nan]
+    
+    batch = evaluator.evaluate_batch(calculated_price=calculated, ground_truth_price=ground_truth)
+    
+    rows = [
+        evaluator(calculated_price=price, ground_truth_price=truth)
+        for price, truth in zip(calculated, ground_truth)
+    ]
+    _assert_batch_matches_rows(batch, rows)
+    assert batch["price_accuracy_score"].tolist() == [1.0, 0.96, 0.9, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
+    assert batch["error_message"].tolist() == [None] * 5 + ["Ground truth price is zero"] * 2 + [None] * 2
+
+
+def test_route_batch_matches_scalar_calls():
+    evaluator = RouteOptimalityEvaluator(max_deviation_percent=10.0)
+    nan = float("nan")
+    suggested = [100.0, 104.0, 90.0, 300.0, 5.0, nan, 100.0]
+    optimal = [100.0, 100.0, 100.0, 100.0, 0.0, 100.0, nan]
+    
+    batch = evaluator.evaluate_batch(suggested_distance=suggested, optimal_distance=optimal)
+    
+    rows = [
+        evaluator(suggested_distance=distance, optimal_distance=best)
+        for distance, best in zip(suggested, optimal)
+    ]
+    _assert_batch_matches_rows(batch, rows)
+    assert batch["route_optimality_score"].tolist() == [1.0, 0.96, 1.0, 0.0, 0.0, 0.0, 0.0]
+
+
+def test_completeness_batch_matches_scalar_calls():
+    fields = ["agent_id", "customer.id", "items[0].sku", "items[*].qty", "meta.tags"]
+    rows = [
+        {"agent_id": "A1", "customer": {"id": 7}, "items": [{"sku": "S1", "qty": 1}], "meta": {"tags": []}},
+        {"agent_id": None, "customer": {}, "items": [{"sku": "S1"}, {"qty": 2}]},
+        {"customer": "C9", "items": [], "meta.tags": ["flat key with a dot"]},
+        {},
+    ]
+    batch_evaluator = DataCompletenessEvaluator(required_fields=fields)
+    scalar_evaluator = DataCompletenessEvaluator(required_fields=fields)
+    
+    batch = batch_evaluator.evaluate_batch(response_data=rows)
+    
+    _assert_batch_matches_rows(batch, [scalar_evaluator(response_data=row) for row in rows])
+    assert batch["missing_fields"][1] == ["agent_id", "customer.id", "items[*].qty", "meta.tags"]
+    assert batch_evaluator.aggregate() == scalar_evaluator.aggregate() == {
+        "rows_evaluated": 4,
+        "missing_counts": {"agent_id": 3, "customer.id": 3, "items[0].sku": 2, "items[*].qty": 3, "meta.tags": 2}
+    }
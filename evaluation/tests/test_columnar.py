@@ -0,0 +1,37 @@
+import pytest
+
+from columnar import ColumnarResultWriter, read_results
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.mark.parametrize("results_format", ["parquet", "arrow"])
+def test_later_row_groups_widen_the_schema(tmp_path, results_format):
+    path = tmp_path / f"eval_results.{results_format}"
+    with ColumnarResultWriter(path, results_format, row_group_rows=2) as writer:
+        writer.write([
+            {"score": 1, "reasoning": None, "label": 1},
+            {"score": 2, "reasoning": None, "label": 2},
+            {"score": 2.5, "reasoning": None, "label": "high"},
+            {"score": 3, "reasoning": 2.5, "label": 3, "extra": True},
+        ])
+    
+    table = read_results(path)
+    assert table.column("score").to_pylist() == [1.0, 2.0, 2.5, 3.0]
+    assert table.column("reasoning").to_pylist() == [None, None, None, 2.5]
+    assert table.column("label").to_pylist() == ["1", "2", "high", "3"]
+    assert table.column("extra").to_pylist() == [None, None, None, True]
+    assert not list(tmp_path.glob(".*.part*"))
+
+
+def test_unchanged_schema_writes_row_groups_directly(tmp_path):
+    import pyarrow.parquet as pq
+    
+    path = tmp_path / "eval_results.parquet"
+    with ColumnarResultWriter(path, "parquet", row_group_rows=2) as writer:
+        writer.write([{"score": float(i), "tags": [i]} for i in range(5)])
+    
+    assert pq.ParquetFile(path).num_row_groups == 3
+    table = read_results(path)
+    assert table.column("score").to_pylist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert table.column("tags").to_pylist() == ["[0]", "[1]", "[2]", "[3]", "[4]"]
@@ -0,0 +1,66 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from db_export import EXPORTS, build_query, connect, create_sqlite_standin, export_dataset, sqlite_timestamp
+from generate_test_data import generate_synthetic_chunk
+
+START = datetime(2024, 1, 1)
+
+
+@pytest.fixture(scope="module")
+def standin(tmp_path_factory):
+    path = tmp_path_factory.mktemp("db") / "standin.db"
+    create_sqlite_standin(path, rows=300, seed=3, start=START, interval_seconds=60.0)
+    return path
+
+
+def _expected_rows(dataset: str):
+    # Synthetic rows as the stand-in stored them, keyed like the export;
+    # the exported timestamp is the row's created_at
+    rows = generate_synthetic_chunk(dataset, 0, 300, seed=3, chunk_rows=10_000)
+    fields = [column.split(" AS ")[-1] for column in EXPORTS[dataset][2]]
+    return [
+        {
+            field: (START + timedelta(minutes=i)).isoformat(sep=" ") if field == "timestamp" else row.get(field)
+            for field in fields
+        }
+        for i, row in enumerate(rows)
+    ]
+
+
+@pytest.mark.parametrize("dataset", list(EXPORTS))
+@pytest.mark.parametrize("workers", [1, 3])
+def test_export_round_trips_the_standin(tmp_path, standin, dataset, workers):
+    output_file = tmp_path / f"{dataset}.jsonl"
+    
+    # The range ends inside the data: rows at or after the end are left out
+    rows = export_dataset(
+        f"sqlite:///{standin}", dataset, output_file, START, START + timedelta(minutes=250),
+        workers=workers, batch_size=40
+    )
+    
+    with open(output_file, encoding="utf-8") as f:
+        exported = [json.loads(line) for line in f]
+    assert rows == len(exported) == 250
+    assert exported == _expected_rows(dataset)[:250]
+    assert not list(tmp_path.glob(".*.part*"))
+
+
+@pytest.mark.parametrize("dataset", list(EXPORTS))
+def test_time_slices_use_the_created_at_index(standin, dataset):
+    connection, dialect = connect(f"sqlite:///{standin}")
+    try:
+        plan = " ".join(
+            row[-1] for row in connection.execute(
+                "EXPLAIN QUERY PLAN " + build_query(dataset, dialect),
+                (sqlite_timestamp(START), sqlite_timestamp(START + timedelta(hours=1)))
+            )
+        )
+    finally:
+        connection.close()
+    
+    # A range search on the index, not a full scan, and no separate sort
+    assert f"SEARCH {EXPORTS[dataset][0]} USING INDEX" in plan and "created_at>?" in plan
+    assert "TEMP B-TREE" not in plan
@@ -0,0 +1,87 @@
+import pickle
+import threading
+import time
+
+from dedup import DeduplicatingEvaluator, dedup_key
+
+
+class _Judge:
+    def __init__(self, delay_seconds: float = 0.0):
+        self.delay_seconds = delay_seconds
+        self.calls = []
+        self.prefetched = []
+    
+    def __call__(self, *, query: str, response: str, **kwargs):
+        self.calls.append(response)
+        time.sleep(self.delay_seconds)
+        return {"judge_score": len(self.calls), "judge_total_tokens": 120}
+    
+    def prefetch(self, rows, **kwargs):
+        self.prefetched.append([row["response"] for row in rows])
+
+
+def test_cosmetic_variants_share_a_key():
+    plain = dedup_key({"query": "متى يصل الطلب", "response": "يصل خلال 3 ساعات"})
+    
+    assert dedup_key({"query": "مَتَى يَصِل الطـلب", "response": "يصل  خلال ٣ ساعات "}) == plain
+    assert dedup_key({"query": "متى يصل الطلب", "response": "يصل خلال 4 ساعات"}) != plain
+
+
+def test_groups_are_judged_once_and_copies_cost_no_tokens():
+    judge = _Judge()
+    evaluator = DeduplicatingEvaluator(judge)
+    
+    first = evaluator(query="أين طلبي", response="في الطريق", conversation_id=1)
+    # Extra columns do not split groups
+    copy = evaluator(query="أين طلبى", response="فى الطريق", conversation_id=2)
+    other = evaluator(query="أين طلبي", response="تم التسليم")
+    
+    assert first == {"judge_score": 1, "judge_total_tokens": 120}
+    assert copy == {"judge_score": 1, "judge_total_tokens": 0}
+    assert other["judge_score"] == 2
+    assert evaluator.stats() == {"rows": 3, "judged": 2, "reused": 1, "dedup_ratio": 1 / 3}
+
+
+def test_concurrent_calls_wait_for_one_judgement():
+    judge = _Judge(delay_seconds=0.05)
+    evaluator = DeduplicatingEvaluator(judge)
+    results = []
+    
+    threads = [
+        threading.Thread(target=lambda: results.append(evaluator(query="سؤال", response="رد")))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert judge.calls == ["رد"]
+    assert [result["judge_score"] for result in results] == [1] * 8
+
+
+def test_prefetch_forwards_one_representative_per_new_group():
+    judge = _Judge()
+    evaluator = DeduplicatingEvaluator(judge)
+    evaluator(query="سؤال", response="رد أول")
+    
+    evaluator.prefetch([
+        {"query": "سؤال", "response": "رد أول"},
+        {"query": "سؤال", "response": "رد ثان"},
+        {"query": "سؤال", "response": "رَدّ ثانٍ"},
+    ])
+    
+    assert judge.prefetched == [["رد ثان"]]
+    # The group is judged with its representative's inputs
+    evaluator(query="سؤال", response="رَدّ ثانٍ")
+    assert judge.calls == ["رد أول", "رد ثان"]
+
+
+def test_wrapper_pickles_with_its_results():
+    evaluator = DeduplicatingEvaluator(_Judge())
+    evaluator(query="سؤال", response="رد")
+    
+    copy = pickle.loads(pickle.dumps(evaluator))
+    
+    assert copy(query="سؤال", response="رد")["judge_score"] == 1
+    assert copy.delay_seconds == 0.0
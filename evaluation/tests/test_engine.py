@@ -0,0 +1,98 @@
+import json
+import math
+
+import pytest
+
+from engine import evaluate_code_only
+from evaluators.code_based import (
+    DataCompletenessEvaluator,
+    PriceAccuracyEvaluator,
+    ResponseTimeEvaluator,
+    RouteOptimalityEvaluator
+)
+
+
+def _evaluators():
+    return {
+        "response_time": ResponseTimeEvaluator(max_response_time=2.0),
+        "price_accuracy": PriceAccuracyEvaluator(margin_percent=5.0),
+        "route_optimality": RouteOptimalityEvaluator(max_deviation_percent=10.0),
+        "data_completeness": DataCompletenessEvaluator(required_fields=["order_id", "route.origin"])
+    }
+
+
+EVALUATOR_CONFIG = {
+    "response_time": {"column_mapping": {"response_time": "${data.latency}"}},
+    "price_accuracy": {"column_mapping": {
+        "calculated_price": "${data.price}", "ground_truth_price": "${data.expected.price}"
+    }},
+    "route_optimality": {"column_mapping": {
+        "suggested_distance": "${data.route.km}", "optimal_distance": "${data.route.optimal_km}"
+    }},
+    "data_completeness": {"column_mapping": {"response_data": "${data}"}}
+}
+
+
+ROWS = [
+    {"order_id": "WO-1", "latency": 0.4, "price": 1000, "expected": {"price": 1000},
+     "route": {"origin": "Cairo", "km": 120.0, "optimal_km": 100.0}},
+    {"order_id": "WO-2", "latency": 2.5, "price": 1040, "expected": {"price": 1000},
+     "route": {"origin": "Giza", "km": 95.0, "optimal_km": 100.0}},
+    # Zero ground truth price and optimal distance
+    {"order_id": "WO-3", "latency": 1.0, "price": 50, "expected": {"price": 0},
+     "route": {"origin": "Tanta", "km": 10.0, "optimal_km": 0}},
+    # Missing fields
+    {"latency": 1.5, "price": 900, "route": {"km": 40.0}},
+]
+
+
+def _scalar_rows(evaluators):
+    # What the SDK computes row by row; missing numbers reach it as NaN
+    getters = {
+        "response_time": lambda row: {"response_time": row.get("latency", math.nan)},
+        "price_accuracy": lambda row: {
+            "calculated_price": row.get("price", math.nan),
+            "ground_truth_price": row.get("expected", {}).get("price", math.nan)
+        },
+        "route_optimality": lambda row: {
+            "suggested_distance": row["route"].get("km", math.nan),
+            "optimal_distance": row["route"].get("optimal_km", math.nan)
+        },
+        "data_completeness": lambda row: {"response_data": row}
+    }
+    return [
+        {name: evaluator(**getters[name](row)) for name, evaluator in evaluators.items()}
+        for row in ROWS
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 10])
+def test_fused_engine_matches_scalar_calls(tmp_path, chunk_size):
+    data = tmp_path / "rows.jsonl"
+    data.write_text("".join(json.dumps(row) + "\n" for row in ROWS), encoding="utf-8")
+    evaluators = _evaluators()
+    
+    result = evaluate_code_only(
+        str(data), evaluators, EVALUATOR_CONFIG, output_path=tmp_path / "out", chunk_size=chunk_size
+    )
+    
+    with open(tmp_path / "out" / "eval_results.jsonl", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    expected = _scalar_rows(_evaluators())
+    assert len(records) == len(ROWS)
+    for record, row, scalar in zip(records, ROWS, expected):
+        assert record.get("inputs.order_id") == row.get("order_id")
+        for name, outputs in scalar.items():
+            for key, value in outputs.items():
+                got = record[f"outputs.{name}.{key}"]
+                if isinstance(value, float) and math.isnan(value):
+                    assert got is None or math.isnan(got), (name, key)
+                else:
+                    assert got == pytest.approx(value), (name, key)
+    
+    metrics = result["metrics"]
+    scores = [scalar["price_accuracy"]["price_accuracy_score"] for scalar in expected]
+    assert metrics["price_accuracy.price_accuracy_score"] == pytest.approx(sum(scores) / len(scores))
+    assert metrics["response_time.rows_evaluated"] == 4
+    assert metrics["response_time.pass_rate"] == 0.75
+    assert metrics["data_completeness.missing_counts.route.origin"] == 1
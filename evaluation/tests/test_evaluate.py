@@ -0,0 +1,96 @@
+import json
+import time
+
+import pytest
+
+import evaluate
+from evaluators.code_based import RouteOptimalityEvaluator
+
+
+def passing_suite():
+    return {"metrics": {"score": 1.0}}
+
+
+def failing_suite():
+    time.sleep(0.1)
+    raise RuntimeError("suite exploded")
+
+
+@pytest.mark.parametrize("workers", ["1", "3"])
+def test_failed_suite_fails_the_run_after_the_others(tmp_path, monkeypatch, capsys, workers):
+    data_file = tmp_path / "rows.jsonl"
+    data_file.write_text("{}\n")
+    monkeypatch.setenv("EVALUATION_DATA_DIR", str(tmp_path))
+    monkeypatch.setenv("EVALUATION_OUTPUT_PATH", str(tmp_path / "results"))
+    monkeypatch.setattr(evaluate, "SUITES", [
+        ("broken", "rows.jsonl", failing_suite, False),
+        ("working", "rows.jsonl", passing_suite, False),
+    ])
+    
+    with pytest.raises(RuntimeError, match="suite exploded"):
+        evaluate.main(["--workers", workers])
+    
+    summary = capsys.readouterr().out
+    failure = next(line for line in summary.splitlines() if "❌ broken" in line)
+    assert "failed after 0.0s" not in failure
+    assert failure.endswith("(suite exploded)")
+    assert "✅ working:" in summary
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+@pytest.mark.parametrize("needs_llm", [False, True])
+def test_failed_suite_records_its_elapsed_time(parallel, needs_llm):
+    suites = [("broken", failing_suite, needs_llm), ("working", passing_suite, needs_llm)]
+    
+    outcomes = evaluate.run_suites_parallel(suites) if parallel else evaluate.run_suites_serial(suites)
+    
+    error, seconds = outcomes["broken"]
+    assert isinstance(error, RuntimeError)
+    assert 0.1 <= seconds < 5
+    assert outcomes["working"][0] == {"metrics": {"score": 1.0}}
+
+
+def _write_routes(path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+
+
+def test_lane_report_matches_whole_file_aggregation(tmp_path):
+    rows = [
+        {"origin": "Cairo", "destination": ["Giza", "Tanta"][i % 2], "route_name": f"R{i % 3}",
+         "suggested_route_distance_km": 100.0 + i, "optimal_route_distance_km": 100.0}
+        for i in range(25)
+    ]
+    _write_routes(tmp_path / "routes.jsonl", rows)
+    evaluator = RouteOptimalityEvaluator(max_deviation_percent=10.0)
+    
+    report = evaluate.write_route_lane_report(
+        tmp_path / "routes.jsonl", evaluator, tmp_path / "lanes.json", chunk_rows=4
+    )
+    
+    expected = evaluator.aggregate_by_group(
+        suggested_distance=[row["suggested_route_distance_km"] for row in rows],
+        optimal_distance=[row["optimal_route_distance_km"] for row in rows],
+        group_by={
+            "lane": ([row["origin"] for row in rows], [row["destination"] for row in rows]),
+            "route_name": [row["route_name"] for row in rows]
+        }
+    )
+    assert report == expected
+    assert json.loads((tmp_path / "lanes.json").read_text(encoding="utf-8"))["route_name"] == [
+        {**group, "group": list(group["group"])} for group in expected["route_name"]
+    ]
+
+
+def test_lane_report_skips_missing_columns(tmp_path, capsys):
+    rows = [{"route_name": "R1", "suggested_route_distance_km": 12.0, "optimal_route_distance_km": 10.0}]
+    _write_routes(tmp_path / "routes.jsonl", rows)
+    evaluator = RouteOptimalityEvaluator(max_deviation_percent=10.0)
+    
+    report = evaluate.write_route_lane_report(tmp_path / "routes.jsonl", evaluator, tmp_path / "lanes.json")
+    assert list(report) == ["route_name"]
+    
+    _write_routes(tmp_path / "routes.jsonl", [{"origin": "Cairo", "suggested_route_distance_km": 12.0}])
+    assert evaluate.write_route_lane_report(tmp_path / "routes.jsonl", evaluator, tmp_path / "skipped.json") is None
+    assert not (tmp_path / "skipped.json").exists()
+    assert "Lane report skipped" in capsys.readouterr().out
@@ -0,0 +1,30 @@
+import json
+
+import pytest
+
+from generate_test_data import DATASETS, generate_synthetic_chunk, generate_synthetic_dataset
+
+
+@pytest.mark.parametrize("dataset", DATASETS)
+def test_output_does_not_depend_on_workers(tmp_path, dataset):
+    for workers in (1, 4):
+        generate_synthetic_dataset(
+            dataset, rows=1_050, output_file=tmp_path / f"{workers}.jsonl", seed=7,
+            workers=workers, chunk_rows=200
+        )
+    
+    serial = (tmp_path / "1.jsonl").read_bytes()
+    assert (tmp_path / "4.jsonl").read_bytes() == serial
+    assert len(serial.splitlines()) == 1_050
+    assert not list(tmp_path.glob(".*.part*"))
+    
+    # Any chunk can be regenerated on its own
+    rows = [json.loads(line) for line in serial.splitlines()[600:800]]
+    assert generate_synthetic_chunk(dataset, 3, 200, seed=7, chunk_rows=200) == rows
+
+
+def test_seed_changes_the_output(tmp_path):
+    for seed in (1, 2):
+        generate_synthetic_dataset("pricing", rows=50, output_file=tmp_path / f"{seed}.jsonl", seed=seed)
+    
+    assert (tmp_path / "1.jsonl").read_bytes() != (tmp_path / "2.jsonl").read_bytes()
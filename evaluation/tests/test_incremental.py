@@ -0,0 +1,108 @@
+import json
+
+import evaluate
+from evaluators.code_based import DataCompletenessEvaluator
+from incremental import merge_metrics, select_new_rows, totals_to_means
+
+
+def test_counts_are_summed_and_means_weighted():
+    counts = ["data_completeness.rows_evaluated", "data_completeness.missing_counts"]
+    totals = merge_metrics({}, {
+        "data_completeness.data_completeness_score": 1.0,
+        "data_completeness.rows_evaluated": 10,
+        "data_completeness.missing_counts.agent_id": 0,
+    }, rows=10, count_metrics=counts)
+    totals = merge_metrics(totals, {
+        "data_completeness.data_completeness_score": 0.5,
+        "data_completeness.rows_evaluated": 30,
+        "data_completeness.missing_counts.agent_id": 30,
+    }, rows=30, count_metrics=counts)
+    
+    assert totals_to_means(totals) == {
+        "data_completeness.data_completeness_score": 0.625,
+        "data_completeness.rows_evaluated": 40,
+        "data_completeness.missing_counts.agent_id": 30,
+    }
+
+
+def test_incremental_runs_report_cumulative_counts(tmp_path, monkeypatch):
+    monkeypatch.setenv("EVALUATION_INCREMENTAL", "1")
+    data = tmp_path / "rows.jsonl"
+    output_path = tmp_path / "results" / "suite"
+    
+    def run(rows):
+        with open(data, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(row) + "\n" for row in rows)
+        return evaluate.run_evaluation(
+            str(data),
+            {"data_completeness": DataCompletenessEvaluator(required_fields=["response", "agent_id"])},
+            {"data_completeness": {"column_mapping": {"response_data": "${data}"}}},
+            output_path,
+            suite="suite"
+        )["metrics"]
+    
+    run([{"response": "ok", "agent_id": 1}] * 10)
+    metrics = run([{"response": "ok"}] * 30)
+    
+    assert metrics["data_completeness.rows_evaluated"] == 40
+    assert metrics["data_completeness.missing_counts.agent_id"] == 30
+    assert metrics["data_completeness.data_completeness_score"] == 0.625
+    stored = json.loads((output_path.parent / "watermarks.json").read_text())["suite"]["metrics"]
+    assert stored["data_completeness.missing_counts.agent_id"] == [30, None]
+
+
+def _select(tmp_path, rows, state, key_fields):
+    data = tmp_path / "rows.jsonl"
+    data.write_text("".join(json.dumps(row) + "\n" for row in rows), encoding="utf-8")
+    new_rows, watermark, watermark_rows, lines_seen = select_new_rows(
+        data, tmp_path / "new.jsonl", state, key_fields
+    )
+    with open(tmp_path / "new.jsonl", encoding="utf-8") as f:
+        selected = [json.loads(line) for line in f]
+    assert len(selected) == new_rows
+    state = {"key_fields": list(key_fields), "watermark": watermark,
+             "watermark_rows": watermark_rows, "lines_seen": lines_seen}
+    return selected, state
+
+
+def test_watermark_keys_compare_by_type(tmp_path):
+    rows = [{"order_id": f"WO-2024-{i}"} for i in (8, 9)]
+    _, state = _select(tmp_path, rows, {}, ("order_id",))
+    assert state["watermark"] == ["WO-2024-9"]
+    
+    selected, state = _select(tmp_path, rows + [{"order_id": "WO-2024-10"}], state, ("order_id",))
+    assert selected == [{"order_id": "WO-2024-10"}]
+    assert state["watermark"] == ["WO-2024-10"]
+    
+    _, state = _select(tmp_path, [{"seq": 9}], {}, ("seq",))
+    selected, _ = _select(tmp_path, [{"seq": 9}, {"seq": 10}, {"seq": "11"}], state, ("seq",))
+    assert selected == [{"seq": 10}, {"seq": "11"}]
+    
+    # An earlier instant written with an offset is not newer
+    _, state = _select(tmp_path, [{"timestamp": "2024-01-15T14:20:00"}], {}, ("timestamp",))
+    selected, _ = _select(tmp_path, [
+        {"timestamp": "2024-01-15T16:19:59+02:00"}, {"timestamp": "2024-01-15T14:20:01"}
+    ], state, ("timestamp",))
+    assert selected == [{"timestamp": "2024-01-15T14:20:01"}]
+
+
+def test_rows_arriving_at_the_watermark_are_picked_up(tmp_path):
+    first = [{"timestamp": "2024-01-15T14:20:00", "id": 1}, {"timestamp": "2024-01-15T14:20:00", "id": 2}]
+    _, state = _select(tmp_path, first, {}, ("timestamp",))
+    
+    late = {"timestamp": "2024-01-15T14:20:00", "id": 3}
+    selected, state = _select(tmp_path, first + [late], state, ("timestamp",))
+    assert selected == [late]
+    
+    selected, _ = _select(tmp_path, first + [late], state, ("timestamp",))
+    assert selected == []
+
+
+def test_keyless_rows_are_picked_up_by_line_offset(tmp_path):
+    rows = [{"timestamp": "2024-01-15T14:20:00"}, {"response": "no timestamp"}]
+    selected, state = _select(tmp_path, rows, {}, ("timestamp",))
+    assert len(selected) == 2
+    
+    appended = [{"response": "also no timestamp"}, {"timestamp": "2024-01-15T14:21:00"}]
+    selected, _ = _select(tmp_path, rows + appended, state, ("timestamp",))
+    assert selected == appended
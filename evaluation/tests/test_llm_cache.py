@@ -0,0 +1,69 @@
+import pickle
+
+from evaluators.llm_cache import JudgementCache
+from evaluators.prompt_based import CustomerServiceQualityEvaluator
+
+from conftest import register_stub_flows
+
+
+def test_cached_judgements_survive_new_evaluators(stub_llm, stub_model_config, tmp_path):
+    register_stub_flows(stub_model_config, stub_llm.base_url)
+    path = str(tmp_path / "cache.sqlite")
+    row = {"query": "أين طلبي؟", "response": "طلبك في الطريق"}
+    
+    first = CustomerServiceQualityEvaluator(model_config=stub_model_config, cache=JudgementCache(path))(**row)
+    cache = JudgementCache(path)
+    second = CustomerServiceQualityEvaluator(model_config=stub_model_config, cache=cache)(**row)
+    
+    assert second == first
+    assert stub_llm.requests == 1
+    assert (cache.hits, cache.misses) == (1, 0)
+    # Another model is another judgement
+    other_model = {**stub_model_config, "model": "gpt-4o"}
+    assert cache.make_key(CustomerServiceQualityEvaluator.PROMPTY_SOURCE, other_model, row) != (
+        cache.make_key(CustomerServiceQualityEvaluator.PROMPTY_SOURCE, stub_model_config, row)
+    )
+
+
+def test_parse_failures_are_not_cached(stub_llm, stub_model_config, tmp_path):
+    register_stub_flows(stub_model_config, stub_llm.base_url)
+    cache = JudgementCache(str(tmp_path / "cache.sqlite"))
+    evaluator = CustomerServiceQualityEvaluator(model_config=stub_model_config, cache=cache)
+    
+    for _ in range(2):
+        result = evaluator(query="GARBLED", response="...")
+    
+    assert result["customer_service_quality_score"] is None
+    assert stub_llm.requests == 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_expiry_and_lru_eviction(tmp_path, monkeypatch):
+    cache = JudgementCache(str(tmp_path / "cache.sqlite"), max_entries=2, max_age_seconds=60, evict_every=1)
+    clock = [1000.0]
+    monkeypatch.setattr("evaluators.llm_cache.time.time", lambda: clock[0])
+    
+    cache.put("a", "1")
+    clock[0] += 1
+    cache.put("b", "2")
+    clock[0] += 1
+    assert cache.get("a") == "1"  # "a" is now more recently used than "b"
+    clock[0] += 1
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("1", "3")
+    
+    clock[0] += 120
+    assert cache.get("a", "c") is None
+    assert cache.evict() == 2
+
+
+def test_cache_pickles_for_worker_processes(tmp_path):
+    cache = JudgementCache(str(tmp_path / "cache.sqlite"))
+    cache.put("key", "value")
+    
+    copy = pickle.loads(pickle.dumps(cache))
+    
+    assert copy.get("key") == "value"
+    copy.put("other", "value")
+    assert cache.get("other") == "value"
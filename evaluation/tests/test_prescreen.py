@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from prescreen import PrescreenedEvaluator, screen_texts
+
+
+@pytest.mark.parametrize("text, stage", [
+    (None, "empty"),
+    ("   ", "empty"),
+    ("Your shipment is on the way to Tanta", "not_arabic"),
+    ("12345 67890", "not_arabic"),
+    ("شحنتك في الطريق الآن وستصل خلال ساعتين، ثم", "truncated"),
+    ("السعر يشمل الوقود والرسوم وتكلفة التحميل إلى", "truncated"),
+    ("السعر يشمل الوقود والرسوم (التحميل والتفريغ", "truncated"),
+    ("شحنتك في الطريق الآن وستصل خلال ساعتين:", "truncated"),
+    ("تم", "too_short"),
+    ("شحنتك رقم WO-2024-001234 في الطريق الآن وستصل خلال ساعتين.", None),
+    ("شحنتك في الطريق الآن (رقم التتبع 5521) وستصل اليوم", None),
+])
+def test_each_stage_and_pass_through(text, stage):
+    assert screen_texts([text]).tolist() == [stage]
+
+
+def test_earlier_stages_win():
+    # Short and Latin: not_arabic is checked before too_short
+    assert screen_texts(["ok", "", "مرحبا و"]).tolist() == ["not_arabic", "empty", "truncated"]
+
+
+class _Judge:
+    METRIC_PREFIX = "stub"
+    
+    def __call__(self, *, response: str, **kwargs):
+        return {"stub_score": 5, "stub_reasoning": "judged"}
+    
+    async def aevaluate_batch(self, rows, **kwargs):
+        return [self(**row) for row in rows]
+
+
+def test_results_flag_screened_rows():
+    evaluator = PrescreenedEvaluator(_Judge(), field="response")
+    answer = "شحنتك في الطريق الآن وستصل خلال ساعتين."
+    
+    assert evaluator(response="") == {
+        "stub_score": 1, "stub_reasoning": "Pre-screen: the response is empty.", "stub_prescreened": 1.0
+    }
+    assert evaluator(response=answer) == {"stub_score": 5, "stub_reasoning": "judged", "stub_prescreened": 0.0}
+    
+    results = asyncio.run(evaluator.aevaluate_batch([{"response": "hi"}, {"response": answer}]))
+    assert [result["stub_prescreened"] for result in results] == [1.0, 0.0]
+    assert evaluator.stats()["calls_avoided"] == 2
@@ -0,0 +1,49 @@
+import pytest
+
+from evaluators import registry
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    registry.clear()
+    yield
+    registry.clear()
+
+
+class _Judge:
+    instances = 0
+    
+    def __init__(self, *, model_config, threshold=3):
+        type(self).instances += 1
+        self.model_config = model_config
+        self.threshold = threshold
+
+
+def test_shared_evaluators_are_keyed_by_config_and_arguments():
+    config = {"model": "gpt-4", "base_url": "http://localhost"}
+    
+    first = registry.get_shared_evaluator(_Judge, config)
+    # Same configuration in another dict (and key order) is the same evaluator
+    assert registry.get_shared_evaluator(_Judge, dict(reversed(list(config.items())))) is first
+    assert registry.get_shared_evaluator(_Judge, config, threshold=4) is not first
+    assert registry.get_shared_evaluator(_Judge, {**config, "model": "gpt-4o"}) is not first
+    assert _Judge.instances == 3
+    
+    stub = object()
+    registry.register_evaluator(_Judge, config, stub, threshold=5)
+    assert registry.get_shared_evaluator(_Judge, config, threshold=5) is stub
+
+
+def test_prompties_are_parsed_once_and_flows_registered_per_config(tmp_path):
+    source = tmp_path / "judge.prompty"
+    source.write_text("---\nmodel:\n  parameters:\n    max_tokens: 120\n---\nJudge {{response}}\n")
+    
+    spec = registry.get_prompty(str(source))
+    source.write_text("changed")
+    
+    assert registry.get_prompty(str(source)) is spec
+    assert spec.max_tokens == 120
+    
+    flow = object()
+    registry.register_flow(str(source), {"model": "gpt-4"}, flow)
+    assert registry.get_flow(str(source), {"model": "gpt-4"}) is flow
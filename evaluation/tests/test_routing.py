@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from routing import RoadGraph, Router, haversine_km
+
+
+@pytest.fixture
+def graph():
+    # Each node joined to its three nearest neighbours, like a sparse road grid
+    rng = np.random.default_rng(7)
+    n_nodes = 400
+    lat, lon = 30 + rng.random(n_nodes), 31 + rng.random(n_nodes)
+    sources, targets = [], []
+    for node in range(n_nodes):
+        for neighbor in np.argsort((lat - lat[node]) ** 2 + (lon - lon[node]) ** 2)[1:4].tolist():
+            sources += [node, neighbor]
+            targets += [neighbor, node]
+    sources, targets = np.array(sources), np.array(targets)
+    lengths = haversine_km(lat[sources], lon[sources], lat[targets], lon[targets])
+    return RoadGraph(sources, targets, lengths, [str(node) for node in range(n_nodes)], lat, lon)
+
+
+def test_batched_origins_match_full_dijkstra(graph):
+    router = Router(graph, hub_min_targets=16).preprocess()
+    rng = np.random.default_rng(1)
+    sources = np.concatenate([np.repeat([3, 50, 77], 5), rng.integers(graph.n_nodes, size=10)])
+    targets = rng.integers(graph.n_nodes, size=len(sources))
+    
+    distances = router.distances(sources, targets)
+    
+    expected = [
+        graph.shortest_paths(source)[target] for source, target in zip(sources.tolist(), targets.tolist())
+    ]
+    assert np.allclose(distances, expected)
+    counts = router.stats()
+    assert counts["one_to_many"] == 15
+    assert counts["astar"] == 10
+
+
+OSM = """<?xml version="1.0"?>
+<osm version="0.6">
+  <node id="1" lat="30.00" lon="31.00"><tag k="place" v="town"/><tag k="name" v="Banha"/></node>
+  <node id="2" lat="30.01" lon="31.00"/>
+  <node id="3" lat="30.02" lon="31.00"/>
+  <node id="4" lat="30.02" lon="31.01"/>
+  <node id="5" lat="30.03" lon="31.01"/>
+  <way id="10"><nd ref="1"/><nd ref="2"/><nd ref="99"/><nd ref="3"/><tag k="highway" v="primary"/></way>
+  <way id="11"><nd ref="4"/><nd ref="3"/><tag k="highway" v="residential"/><tag k="oneway" v="-1"/></way>
+  <way id="12"><nd ref="4"/><nd ref="5"/><tag k="highway" v="footway"/></way>
+</osm>
+"""
+
+
+def test_from_osm_splits_ways_at_missing_nodes(tmp_path):
+    path = tmp_path / "roads.osm"
+    path.write_text(OSM, encoding="utf-8")
+    
+    graph = RoadGraph.from_osm(path)
+    
+    assert graph.node_ids.tolist() == ["1", "2", "3", "4"]
+    assert graph.n_edges == 3
+    assert graph.place_node("banha") == 0
+    # The missing node 99 splits its way, so 2 and 3 are not joined; "oneway=-1" runs 3 -> 4
+    assert graph.shortest_paths(0)[1] == pytest.approx(haversine_km(30.0, 31.0, 30.01, 31.0))
+    assert np.isinf(graph.shortest_paths(0)[2:]).all()
+    assert graph.shortest_paths(2)[3] == pytest.approx(haversine_km(30.02, 31.0, 30.02, 31.01))
+    assert np.isinf(Router(graph).preprocess().distance(0, 3))
+    assert np.isinf(graph.shortest_paths(3)[0])
@@ -0,0 +1,70 @@
+import json
+
+import numpy as np
+import pytest
+
+from sampling import (
+    allocate_sample,
+    draw_stratified_sample,
+    required_sample_size,
+    stratified_estimate,
+    stratum_key
+)
+
+
+def test_allocation_is_proportional_and_covers_every_stratum():
+    allocation = allocate_sample([700, 200, 95, 5], 100)
+    
+    assert allocation.sum() == 100
+    assert allocation.tolist() == [68, 20, 10, 2]
+    assert allocate_sample([3, 2], 10).tolist() == [3, 2]
+
+
+def test_sample_size_shrinks_for_small_populations():
+    assert required_sample_size(0.1, confidence=0.95, std=1.0) == 385
+    assert required_sample_size(0.1, confidence=0.95, std=1.0, population=500) == 218
+    with pytest.raises(ValueError):
+        required_sample_size(0)
+
+
+def test_sample_is_reproducible_and_keeps_row_order(tmp_path):
+    data = tmp_path / "rows.jsonl"
+    with open(data, "w", encoding="utf-8") as f:
+        for i in range(1_000):
+            f.write(json.dumps({"id": i, "agent_id": f"AGT{i % 4}" if i % 10 else None}) + "\n")
+    
+    samples = [
+        draw_stratified_sample(data, tmp_path / f"sample{n}.jsonl", 80, strata=("agent_id",), seed=9, chunk_rows=64)
+        for n in (1, 2)
+    ]
+    
+    assert (tmp_path / "sample1.jsonl").read_bytes() == (tmp_path / "sample2.jsonl").read_bytes()
+    with open(tmp_path / "sample1.jsonl", encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    assert [row["id"] for row in rows] == sorted(row["id"] for row in rows)
+    sample = samples[0]
+    assert sample.size == len(rows) == 80
+    assert [sample.keys[stratum] for stratum in sample.row_strata] == [
+        stratum_key(row, ("agent_id",)) for row in rows
+    ]
+    assert dict(zip(sample.keys, sample.sample_sizes.tolist()))[("unknown",)] == 8
+
+
+def test_estimate_matches_the_full_census_mean():
+    rng = np.random.default_rng(0)
+    population_sizes = np.array([600, 300, 100])
+    scores = [rng.integers(1, 6, size) + offset for size, offset in zip(population_sizes, (0, 1, -1))]
+    
+    full = stratified_estimate(np.concatenate(scores), np.repeat([0, 1, 2], population_sizes), population_sizes)
+    assert full["mean"] == pytest.approx(np.concatenate(scores).mean())
+    assert full["margin"] == pytest.approx(0.0)
+    
+    sampled = [rng.choice(values, count, replace=False) for values, count in zip(scores, (60, 30, 10))]
+    estimate = stratified_estimate(
+        [*np.concatenate(sampled).tolist(), None, float("nan")],
+        [*np.repeat([0, 1, 2], [60, 30, 10]), 0, 1],
+        population_sizes
+    )
+    assert estimate["n"] == 100
+    assert estimate["ci_lower"] < full["mean"] < estimate["ci_upper"]
+    assert estimate["coverage"] == 1.0
@@ -0,0 +1,53 @@
+import json
+
+import numpy as np
+import pytest
+
+from sequential import SequentialStopper, write_shuffled
+
+
+def test_shuffle_is_a_seeded_permutation(tmp_path):
+    data = tmp_path / "rows.jsonl"
+    data.write_text("".join(json.dumps({"id": i}) + "\n" for i in range(100)) + "\n" + '{"id": 100}')
+    
+    permutation = write_shuffled(data, tmp_path / "a.jsonl", seed=5)
+    write_shuffled(data, tmp_path / "b.jsonl", seed=5)
+    
+    assert (tmp_path / "a.jsonl").read_bytes() == (tmp_path / "b.jsonl").read_bytes()
+    with open(tmp_path / "a.jsonl", encoding="utf-8") as f:
+        ids = [json.loads(line)["id"] for line in f]
+    assert ids == permutation.tolist()
+    assert sorted(ids) == list(range(101))
+
+
+def _records(values, metric="judge.score"):
+    return [{f"outputs.{metric}": value} for value in values]
+
+
+def test_running_moments_match_numpy_and_skip_missing_scores():
+    values = np.random.default_rng(3).integers(1, 6, 200).astype(float)
+    stopper = SequentialStopper(["judge.score"], population=10_000, ci_width=0.01)
+    
+    for start in range(0, 200, 40):
+        assert not stopper(_records(values[start:start + 40].tolist() + [None, float("nan"), True]))
+    
+    mean, lower, upper = stopper.interval("judge.score")
+    assert mean == pytest.approx(values.mean())
+    stderr = values.std(ddof=1) / np.sqrt(200) * np.sqrt(1 - 200 / 10_000)
+    assert upper - mean == pytest.approx(stopper.z * stderr)
+
+
+def test_stops_once_the_gate_is_decided():
+    stopper = SequentialStopper(["judge.score"], population=5_000, gates={"judge.score": 3.0}, min_rows=20)
+    rng = np.random.default_rng(1)
+    
+    chunks = 0
+    while not stopper(_records(rng.choice([4.0, 5.0], 10).tolist())):
+        chunks += 1
+    
+    report = stopper.report(llm_evaluators=2)
+    assert report["metrics"]["judge.score"]["decision"] == "above_gate"
+    assert report["rows_judged"] == 20 and chunks == 1
+    assert report["calls_saved"] == (5_000 - 20) * 2
+    # Metrics with neither a gate nor a target width are not tracked
+    assert SequentialStopper(["other"], population=10).metrics == []
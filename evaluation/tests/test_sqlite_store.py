@@ -0,0 +1,24 @@
+import pickle
+import threading
+
+import pytest
+
+from evaluators.llm_cache import JudgementCache
+from evaluators.near_duplicates import NearDuplicateIndex
+
+
+@pytest.mark.parametrize("store_class", [JudgementCache, NearDuplicateIndex])
+def test_connections_are_per_thread_and_rebuilt_after_pickling(tmp_path, store_class):
+    store = store_class(path=str(tmp_path / "nested" / "store.sqlite"))
+    connections = [store._connection()]
+    thread = threading.Thread(target=lambda: connections.append(store._connection()))
+    thread.start()
+    thread.join()
+    
+    assert store._connection() is connections[0]
+    assert connections[1] is not connections[0]
+    assert store._connection().execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    
+    copy = pickle.loads(pickle.dumps(store))
+    assert copy.path == store.path
+    assert copy._connection() is not connections[0]
@@ -0,0 +1,181 @@
+import json
+import pickle
+import re
+import sys
+import types
+
+import pytest
+
+from dedup import DeduplicatingEvaluator
+from prescreen import PrescreenedEvaluator
+from streaming import evaluate_streaming, iter_jsonl_chunks
+from evaluators.code_based import DataCompletenessEvaluator, ResponseTimeEvaluator
+
+
+class _JudgeStub:
+    """
+    Minimal prompt-based judge: a `prefetch()` and a METRIC_PREFIX.
+    """
+    
+    METRIC_PREFIX = "stub"
+    
+    def __call__(self, *, response: str, **kwargs):
+        return {"stub_score": 4, "stub_reasoning": "ok"}
+    
+    def prefetch(self, rows, **kwargs):
+        if hasattr(self, "prefetched"):
+            self.prefetched.append(len(rows))
+
+
+def _install_sdk(monkeypatch, out_of_process: bool, fail_on_call: int = None):
+    # Stand-in for azure.ai.evaluation.evaluate; out of process, every row is
+    # evaluated by a pickled copy of the evaluators, as a worker process would.
+    # Call number `fail_on_call` raises, like a run killed mid-chunk
+    calls = []
+    
+    def evaluate(data, evaluators, evaluator_config):
+        calls.append(data)
+        if len(calls) == fail_on_call:
+            raise KeyboardInterrupt
+        rows = []
+        with open(data, encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                record = {f"inputs.{key}": value for key, value in row.items()}
+                copies = pickle.loads(pickle.dumps(evaluators)) if out_of_process else evaluators
+                for name, evaluator in copies.items():
+                    inputs = {}
+                    for param, reference in evaluator_config[name]["column_mapping"].items():
+                        field = re.fullmatch(r"\$\{data\.(.+)\}", reference)
+                        inputs[param] = row.get(field.group(1)) if field else row
+                    for key, value in evaluator(**inputs).items():
+                        record[f"outputs.{name}.{key}"] = value
+                rows.append(record)
+        metrics = {}
+        for key in dict.fromkeys(key for row in rows for key in row if key.startswith("outputs.")):
+            values = [row.get(key) for row in rows]
+            if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+                metrics[key[len("outputs."):]] = sum(values) / len(values)
+        return {"rows": rows, "metrics": metrics}
+    
+    module = types.ModuleType("azure.ai.evaluation")
+    module.evaluate = evaluate
+    monkeypatch.setitem(sys.modules, "azure", types.ModuleType("azure"))
+    monkeypatch.setitem(sys.modules, "azure.ai", types.ModuleType("azure.ai"))
+    monkeypatch.setitem(sys.modules, "azure.ai.evaluation", module)
+
+
+def _write_rows(path, count: int):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            row = {"response_time_seconds": 0.5 + i % 4, "response": "تم شحن الطلب بنجاح اليوم"}
+            if i % 3:
+                row["agent_id"] = f"AGT{i}"
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+def test_chunks_are_bounded_by_rows_and_bytes(tmp_path):
+    data = tmp_path / "rows.jsonl"
+    rows = [{"id": i, "text": "ن" * (100 if i == 3 else 1)} for i in range(7)]
+    data.write_text(
+        "\n".join(json.dumps(row, ensure_ascii=False) for row in rows) + "\n\n  \n", encoding="utf-8"
+    )
+    
+    by_rows = list(iter_jsonl_chunks(data, chunk_rows=3))
+    assert [[row["id"] for row in chunk] for chunk in by_rows] == [[0, 1, 2], [3, 4, 5], [6]]
+    # The wide row 3 closes its chunk early
+    by_bytes = list(iter_jsonl_chunks(data, chunk_rows=3, chunk_bytes=150))
+    assert [[row["id"] for row in chunk] for chunk in by_bytes] == [[0, 1, 2], [3], [4, 5, 6]]
+    resumed = list(iter_jsonl_chunks(data, chunk_rows=4, skip_rows=5))
+    assert resumed == [rows[5:]]
+
+
+@pytest.mark.parametrize("out_of_process", [False, True])
+def test_code_based_statistics_come_from_row_outputs(tmp_path, monkeypatch, out_of_process):
+    _install_sdk(monkeypatch, out_of_process)
+    data = tmp_path / "rows.jsonl"
+    _write_rows(data, 25)
+    evaluators = {
+        "response_time": ResponseTimeEvaluator(max_response_time=2.0),
+        "data_completeness": DataCompletenessEvaluator(required_fields=["response", "agent_id"])
+    }
+    evaluator_config = {
+        "response_time": {"column_mapping": {"response_time": "${data.response_time_seconds}"}},
+        "data_completeness": {"column_mapping": {"response_data": "${data}"}}
+    }
+    
+    evaluate_streaming(str(data), evaluators, evaluator_config, tmp_path / "out", chunk_rows=10)
+    
+    latency = evaluators["response_time"].aggregate()
+    assert latency["rows_evaluated"] == 25
+    assert latency["pass_rate"] == pytest.approx(13 / 25)
+    assert latency["max_ms"] == pytest.approx(3500.0)
+    completeness = evaluators["data_completeness"].aggregate()
+    assert completeness == {"rows_evaluated": 25, "missing_counts": {"response": 0, "agent_id": 9}}
+
+
+def test_in_process_evaluators_fall_back_out_of_process(tmp_path, monkeypatch, capsys):
+    _install_sdk(monkeypatch, out_of_process=True)
+    data = tmp_path / "rows.jsonl"
+    _write_rows(data, 5)
+    judge = _JudgeStub()
+    judge.pack_size, judge.prefetched = 2, []
+    evaluators = {"quality": PrescreenedEvaluator(DeduplicatingEvaluator(judge), field="response")}
+    evaluator_config = {"quality": {"column_mapping": {"response": "${data.response}"}}}
+    
+    evaluate_streaming(str(data), evaluators, evaluator_config, tmp_path / "out", chunk_rows=2)
+    
+    assert "quality evaluated outside this process" in capsys.readouterr().out
+    # Only the first chunk (one distinct row after dedup) was prefetched
+    assert judge.prefetched == [1]
+    with open(tmp_path / "out" / "eval_results.jsonl", encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    assert [row["outputs.quality.stub_score"] for row in rows] == [4] * 5
+
+
+def test_in_process_evaluators_count_every_row(tmp_path, monkeypatch):
+    _install_sdk(monkeypatch, out_of_process=False)
+    data = tmp_path / "rows.jsonl"
+    _write_rows(data, 5)
+    evaluators = {"quality": PrescreenedEvaluator(DeduplicatingEvaluator(_JudgeStub()), field="response")}
+    evaluator_config = {"quality": {"column_mapping": {"response": "${data.response}"}}}
+    
+    evaluate_streaming(str(data), evaluators, evaluator_config, tmp_path / "out")
+    
+    assert evaluators["quality"].stats()["rows"] == 5
+    assert evaluators["quality"].__wrapped__.stats() == {
+        "rows": 5, "judged": 1, "reused": 4, "dedup_ratio": 0.8
+    }
+
+
+def test_resumed_run_matches_an_uninterrupted_one(tmp_path, monkeypatch):
+    data = tmp_path / "rows.jsonl"
+    _write_rows(data, 25)
+    evaluator_config = {"response_time": {"column_mapping": {"response_time": "${data.response_time_seconds}"}}}
+    
+    def run(output_path, resume=False):
+        evaluators = {"response_time": ResponseTimeEvaluator(max_response_time=2.0)}
+        result = evaluate_streaming(
+            str(data), evaluators, evaluator_config, output_path, chunk_rows=10, resume=resume
+        )
+        return result, evaluators["response_time"].aggregate()
+    
+    _install_sdk(monkeypatch, out_of_process=False)
+    expected, expected_latency = run(tmp_path / "full")
+    
+    _install_sdk(monkeypatch, out_of_process=False, fail_on_call=2)
+    with pytest.raises(KeyboardInterrupt):
+        run(tmp_path / "resumed")
+    # A torn write after the last checkpoint is dropped on resume
+    with open(tmp_path / "resumed" / "eval_results.jsonl", "ab") as f:
+        f.write(b'{"inputs.response_time_seconds": 0.5, "outp')
+    _install_sdk(monkeypatch, out_of_process=False)
+    resumed, resumed_latency = run(tmp_path / "resumed", resume=True)
+    
+    assert resumed["rows_evaluated"] == expected["rows_evaluated"] == 25
+    assert resumed["metrics"] == pytest.approx(expected["metrics"])
+    assert resumed["metrics"]["response_time.response_time_score"] == pytest.approx(13 / 25)
+    assert resumed_latency == expected_latency
+    for name in ("eval_results.jsonl", "metrics.json"):
+        assert (tmp_path / "resumed" / name).read_bytes() == (tmp_path / "full" / name).read_bytes()
+    assert not (tmp_path / "resumed" / "checkpoint.json").exists()
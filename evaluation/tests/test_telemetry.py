@@ -0,0 +1,30 @@
+from telemetry import EvaluatorStats, Telemetry
+
+
+def test_merge_adds_latency_buckets_once():
+    worker = EvaluatorStats()
+    for milliseconds in range(10):
+        worker.record(milliseconds / 1000)
+    
+    stats = EvaluatorStats()
+    stats.record(0.003)
+    stats.merge(worker.to_dict())
+    
+    assert stats.calls == 11
+    assert sum(stats.buckets) == stats.calls
+    assert stats.max_seconds == 0.009
+
+
+def test_telemetry_merge_of_worker_snapshot():
+    worker = Telemetry(mode="off")
+    for _ in range(10):
+        worker.record("ResponseTimeEvaluator", "batch", 0.02, rows=100)
+    
+    telemetry = Telemetry(mode="off")
+    telemetry.merge(worker.snapshot())
+    
+    (row,) = telemetry.summary_rows()
+    assert row["calls"] == 10
+    assert row["rows"] == 1000
+    state = telemetry.snapshot()["ResponseTimeEvaluator/batch"]
+    assert sum(state["latency_bucket_counts"]) == 10